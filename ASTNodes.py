@@ -1,9 +1,16 @@
+'''
+AST node classes. Every node declares __slots__, so instances carry no
+per-instance __dict__; attribute names and accessors are unchanged.
+Each node also records the source `line` it starts on (None if unknown).
+'''
+
 class Constant():
-	
-	value = 0
-	
-	def __init__(self, value):
+
+	__slots__ = ('value', 'line')
+
+	def __init__(self, value, line=None):
 		self.value = value
+		self.line = line
 
 	def getValue(self):
 		return self.value
@@ -25,10 +32,11 @@ class Constant():
 
 class Return():
 
-	expression = ""
+	__slots__ = ('expression', 'line')
 
-	def __init__(self, expression):
+	def __init__(self, expression, line=None):
 		self.expression = expression
+		self.line = line
 
 	def getExpression(self):
 		return self.expression
@@ -40,17 +48,16 @@ class Return():
 		return self.expression
 
 class Function():
-	name = ""
-	statement = 0
-	return_type = None
-	params = None
 
-	def __init__(self, name, return_type, params, statement):
+	__slots__ = ('name', 'return_type', 'params', 'statement', 'line')
+
+	def __init__(self, name, return_type, params, statement, line=None):
 		self.name = name
 		self.return_type = return_type
 		# params is a list of (type, name) tuples
 		self.params = params or []
 		self.statement = statement
+		self.line = line
 
 	def getName(self):
 		return self.name
@@ -69,10 +76,11 @@ class Function():
 
 class Program():
 
-	function_declaration = 0
+	__slots__ = ('function_declaration', 'line')
 
-	def __init__(self, func):
+	def __init__(self, func, line=None):
 		self.function_declaration = func
+		self.line = line
 
 	def getFunction(self):
 		return self.function_declaration
@@ -85,12 +93,12 @@ class Program():
 
 class UnOp():
 
-	oper = ""
-	inner_exp = ""
+	__slots__ = ('oper', 'inner_exp', 'line')
 
-	def __init__(self, oper, inner_exp):
+	def __init__(self, oper, inner_exp, line=None):
 		self.oper = oper
 		self.inner_exp = inner_exp
+		self.line = line
 
 	def getExpression(self):
 		return self.inner_exp
@@ -111,9 +119,12 @@ class UnOp():
 
 class Identifier:
 
-	def __init__(self, name, symbol_ref=None):
+	__slots__ = ('name', 'symbol_ref', 'line')
+
+	def __init__(self, name, symbol_ref=None, line=None):
 		self.name = name
 		self.symbol_ref = symbol_ref  # Mutable dict reference from token; semantic analyzer populates with {'entry': symbol_entry}
+		self.line = line
 
 	def __repr__(self):
 		return f"Identifier({self.name!r})"
@@ -121,10 +132,13 @@ class Identifier:
 
 class BinOp:
 
-	def __init__(self, left, oper, right):
+	__slots__ = ('left', 'oper', 'right', 'line')
+
+	def __init__(self, left, oper, right, line=None):
 		self.left = left
 		self.oper = oper
 		self.right = right
+		self.line = line
 
 	def __repr__(self):
 		return f"BinOp({repr(self.left)}, {self.oper!r}, {repr(self.right)})"
@@ -132,10 +146,13 @@ class BinOp:
 
 class VarDecl:
 
-	def __init__(self, typ, name, init=None):
+	__slots__ = ('typ', 'name', 'init', 'line')
+
+	def __init__(self, typ, name, init=None, line=None):
 		self.typ = typ
 		self.name = name
 		self.init = init
+		self.line = line
 
 	def __repr__(self):
 		return f"VarDecl(type={self.typ!r}, name={self.name!r}, init={repr(self.init)})"
@@ -143,9 +160,12 @@ class VarDecl:
 
 class Assign:
 
-	def __init__(self, target, expr):
+	__slots__ = ('target', 'expr', 'line')
+
+	def __init__(self, target, expr, line=None):
 		self.target = target
 		self.expr = expr
+		self.line = line
 
 	def __repr__(self):
 		return f"Assign({repr(self.target)}, {repr(self.expr)})"
@@ -153,8 +173,11 @@ class Assign:
 
 class Block:
 
-	def __init__(self, statements=None):
+	__slots__ = ('statements', 'line')
+
+	def __init__(self, statements=None, line=None):
 		self.statements = statements or []
+		self.line = line
 
 	def __repr__(self):
 		return f"Block({repr(self.statements)})"
@@ -162,10 +185,13 @@ class Block:
 
 class IfElse:
 
-	def __init__(self, cond, then_branch, else_branch=None):
+	__slots__ = ('cond', 'then_branch', 'else_branch', 'line')
+
+	def __init__(self, cond, then_branch, else_branch=None, line=None):
 		self.cond = cond
 		self.then_branch = then_branch
 		self.else_branch = else_branch
+		self.line = line
 
 	def __repr__(self):
 		return f"IfElse(cond={repr(self.cond)}, then={repr(self.then_branch)}, else={repr(self.else_branch)})"
@@ -173,9 +199,12 @@ class IfElse:
 
 class While:
 
-	def __init__(self, cond, body):
+	__slots__ = ('cond', 'body', 'line')
+
+	def __init__(self, cond, body, line=None):
 		self.cond = cond
 		self.body = body
+		self.line = line
 
 	def __repr__(self):
 		return f"While(cond={repr(self.cond)}, body={repr(self.body)})"
@@ -183,11 +212,14 @@ class While:
 
 class For:
 
-	def __init__(self, init, cond, step, body):
+	__slots__ = ('init', 'cond', 'step', 'body', 'line')
+
+	def __init__(self, init, cond, step, body, line=None):
 		self.init = init
 		self.cond = cond
 		self.step = step
 		self.body = body
+		self.line = line
 
 	def __repr__(self):
 		return f"For(init={repr(self.init)}, cond={repr(self.cond)}, step={repr(self.step)}, body={repr(self.body)})"
@@ -195,10 +227,13 @@ class For:
 
 class FuncCall:
 
-	def __init__(self, name, args=None, symbol_ref=None):
+	__slots__ = ('name', 'args', 'symbol_ref', 'line')
+
+	def __init__(self, name, args=None, symbol_ref=None, line=None):
 		self.name = name
 		self.args = args or []
 		self.symbol_ref = symbol_ref  # Mutable dict reference from token; semantic analyzer populates with {'entry': symbol_entry}
+		self.line = line
 
 	def __repr__(self):
 		return f"FuncCall({self.name!r}, args={repr(self.args)})"
@@ -206,8 +241,11 @@ class FuncCall:
 
 class Print:
 
-	def __init__(self, expr):
+	__slots__ = ('expr', 'line')
+
+	def __init__(self, expr, line=None):
 		self.expr = expr
+		self.line = line
 
 	def __repr__(self):
 		return f"Print({repr(self.expr)})"
@@ -215,8 +253,11 @@ class Print:
 
 class Read:
 
-	def __init__(self, target):
+	__slots__ = ('target', 'line')
+
+	def __init__(self, target, line=None):
 		self.target = target
+		self.line = line
 
 	def __repr__(self):
 		return f"Read({repr(self.target)})"
@@ -0,0 +1,289 @@
+"""Compact binary encoding of an AST.Program.
+
+Layout (all integers little-endian int32 unless noted):
+
+    header      magic b'MCAB', then uint32 version, root, nodes, list words,
+                strings and string bytes
+    node table  seven words per node: kind, line, end of subtree, four fields
+    list pool   each list is its length followed by its items
+    strings     offsets (strings + 1 words) into the UTF-8 bytes that follow
+
+Nodes are numbered in preorder, so the subtree of node i is the index range
+[i, end), and children always come after their parent.
+A field holds a node index, a string index, a list-pool offset, or part of a
+constant, depending on the node kind (see LAYOUT). None is -1 everywhere.
+Symbol refs are analysis results and are not stored.
+
+BinaryAST reads the tables in place through a memoryview, typically over an
+mmap of the file. It builds nodes only when asked for them, one subtree at a
+time, so a process that needs one function pays only for that function."""
+
+import mmap
+import struct
+import sys
+from array import array
+
+import ASTNodes as AST
+
+MAGIC = b'MCAB'
+VERSION = 1
+HEADER = struct.Struct('<4s6I')
+NODE_WORDS = 7
+
+# field encodings
+NODE, STRING, NODES, PARAMS, VALUE = range(5)
+
+LAYOUT = {
+    AST.Program: (('function_declaration', NODES),),
+    AST.Function: (('name', STRING), ('return_type', STRING), ('params', PARAMS), ('statement', NODE)),
+    AST.Block: (('statements', NODES),),
+    AST.VarDecl: (('typ', STRING), ('name', STRING), ('init', NODE)),
+    AST.Assign: (('target', NODE), ('expr', NODE)),
+    AST.IfElse: (('cond', NODE), ('then_branch', NODE), ('else_branch', NODE)),
+    AST.While: (('cond', NODE), ('body', NODE)),
+    AST.For: (('init', NODE), ('cond', NODE), ('step', NODE), ('body', NODE)),
+    AST.Return: (('expression', NODE),),
+    AST.Print: (('expr', NODE),),
+    AST.Read: (('target', NODE),),
+    AST.BinOp: (('left', NODE), ('oper', STRING), ('right', NODE)),
+    AST.UnOp: (('oper', STRING), ('inner_exp', NODE)),
+    AST.FuncCall: (('name', STRING), ('args', NODES)),
+    AST.Identifier: (('name', STRING),),
+    # a constant takes two words: a tag and the value's string (or the bool)
+    AST.Constant: (('value', VALUE),),
+}
+
+KINDS = tuple(LAYOUT)
+KIND_CODES = {cls: code for code, cls in enumerate(KINDS)}
+
+STR_VALUE, INT_VALUE, FLOAT_VALUE, BOOL_VALUE = range(4)
+
+
+def encode(program):
+    """Return the binary encoding of `program` as bytes."""
+    table = array('i')
+    lists = array('i')
+    strings = {}
+
+    def string(text):
+        index = strings.get(text)
+        if index is None:
+            index = strings[text] = len(strings)
+        return index
+
+    # (node, array, position): where the node's index has to be written;
+    # None marks the end of a subtree
+    stack = [(program, None, 0)]
+    ends = []
+    pop = stack.pop
+    while stack:
+        node, target, position = pop()
+        if node is None:
+            table[ends.pop() + 2] = len(table) // NODE_WORDS
+            continue
+        index = len(table) // NODE_WORDS
+        if target is not None:
+            target[position] = index
+        cls = type(node)
+        row = len(table)
+        table.extend((KIND_CODES[cls], -1 if node.line is None else node.line, 0, -1, -1, -1, -1))
+        ends.append(row)
+        children = []
+        field = row + 3
+        for name, encoding in LAYOUT[cls]:
+            value = getattr(node, name)
+            if encoding == NODE:
+                if value is not None:
+                    children.append((value, table, field))
+            elif encoding == STRING:
+                table[field] = string(value)
+            elif encoding == NODES:
+                table[field] = len(lists)
+                lists.append(len(value))
+                for item in value:
+                    if item is not None:
+                        children.append((item, lists, len(lists)))
+                    lists.append(-1)
+            elif encoding == PARAMS:
+                table[field] = len(lists)
+                lists.append(len(value))
+                for typ, param in value:
+                    lists.append(string(typ))
+                    lists.append(string(param))
+            elif type(value) is bool:
+                table[field] = BOOL_VALUE
+                table[field + 1] = int(value)
+                field += 1
+            else:
+                tag = {int: INT_VALUE, float: FLOAT_VALUE}.get(type(value), STR_VALUE)
+                table[field] = tag
+                table[field + 1] = string(repr(value) if tag == FLOAT_VALUE else str(value))
+                field += 1
+            field += 1
+        # preorder: the first child is numbered next
+        stack.append((None, None, 0))
+        children.reverse()
+        stack.extend(children)
+
+    blobs = [text.encode() for text in strings]
+    offsets = array('i', [0])
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    if sys.byteorder != 'little':
+        for words in (table, lists, offsets):
+            words.byteswap()
+    header = HEADER.pack(MAGIC, VERSION, 0, len(table) // NODE_WORDS, len(lists), len(blobs), offsets[-1])
+    return b''.join([header, table.tobytes(), lists.tobytes(), offsets.tobytes()] + blobs)
+
+
+def dump(program, path):
+    with open(path, 'wb') as f:
+        f.write(encode(program))
+
+
+def load(path):
+    """Open an encoded file through mmap; close() the result when done."""
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return BinaryAST(mapped, mapped)
+
+
+class BinaryAST:
+    """An encoded program, read in place. node(i) builds node i and its
+    subtree on first use; later calls return the same objects."""
+
+    def __init__(self, buffer, owner=None):
+        view = memoryview(buffer)
+        if len(view) < HEADER.size:
+            raise ValueError('Not a binary AST: file too short')
+        magic, version, self.root, nodes, list_words, count, string_bytes = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError('Not a binary AST: bad magic number')
+        if version != VERSION:
+            raise ValueError(f'Unsupported binary AST version {version} (expected {VERSION})')
+        start = HEADER.size
+        sizes = (nodes * NODE_WORDS * 4, list_words * 4, (count + 1) * 4)
+        if len(view) < start + sum(sizes) + string_bytes:
+            raise ValueError('Not a binary AST: file truncated')
+        words = []
+        for size in sizes:
+            part = view[start:start + size]
+            if sys.byteorder == 'little':
+                words.append(part.cast('i'))
+            else:
+                swapped = array('i')
+                swapped.frombytes(part)
+                swapped.byteswap()
+                words.append(swapped)
+            start += size
+        self.table, self.lists, self.offsets = words
+        self.text = view[start:start + string_bytes]
+        self._view = view
+        self._owner = owner
+        self._strings = [None] * count
+        self._nodes = {}
+
+    def __len__(self):
+        return len(self.table) // NODE_WORDS
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the buffer. Nodes built so far stay usable."""
+        for view in (self.table, self.lists, self.offsets, self.text, self._view):
+            if isinstance(view, memoryview):
+                view.release()
+        if self._owner is not None:
+            self._owner.close()
+            self._owner = None
+
+    def kind(self, i):
+        return KINDS[self.table[i * NODE_WORDS]]
+
+    def line(self, i):
+        line = self.table[i * NODE_WORDS + 1]
+        return None if line < 0 else line
+
+    def string(self, i):
+        text = self._strings[i]
+        if text is None:
+            text = self._strings[i] = sys.intern(str(self.text[self.offsets[i]:self.offsets[i + 1]], 'utf-8'))
+        return text
+
+    def children(self, i):
+        """Indices of the child nodes of node i, in source order."""
+        table = self.table
+        lists = self.lists
+        row = i * NODE_WORDS
+        result = []
+        field = row + 3
+        for _, encoding in LAYOUT[KINDS[table[row]]]:
+            if encoding == NODE:
+                if table[field] >= 0:
+                    result.append(table[field])
+            elif encoding == NODES:
+                at = table[field]
+                result.extend(child for child in lists[at + 1:at + 1 + lists[at]] if child >= 0)
+            field += 1
+        return result
+
+    def items(self):
+        """Indices of the program's top-level items."""
+        return self.children(self.root)
+
+    def program(self):
+        return self.node(self.root)
+
+    def node(self, i):
+        built = self._nodes
+        if i in built:
+            return built[i]
+        # build the subtree backwards so every child exists before its
+        # parent; a node built earlier already has its whole subtree
+        build = self._build
+        for j in range(self.table[i * NODE_WORDS + 2] - 1, i - 1, -1):
+            if j not in built:
+                built[j] = build(j)
+        return built[i]
+
+    def _build(self, i):
+        table = self.table
+        lists = self.lists
+        built = self._nodes
+        row = i * NODE_WORDS
+        cls = KINDS[table[row]]
+        node = cls.__new__(cls)
+        field = row + 3
+        for name, encoding in LAYOUT[cls]:
+            word = table[field]
+            if encoding == NODE:
+                value = None if word < 0 else built[word]
+            elif encoding == STRING:
+                value = self.string(word)
+            elif encoding == NODES:
+                value = [None if child < 0 else built[child] for child in lists[word + 1:word + 1 + lists[word]]]
+            elif encoding == PARAMS:
+                pairs = lists[word + 1:word + 1 + 2 * lists[word]]
+                value = [(self.string(pairs[k]), self.string(pairs[k + 1])) for k in range(0, len(pairs), 2)]
+            else:
+                field += 1
+                payload = table[field]
+                if word == BOOL_VALUE:
+                    value = bool(payload)
+                elif word == INT_VALUE:
+                    value = int(self.string(payload))
+                elif word == FLOAT_VALUE:
+                    value = float(self.string(payload))
+                else:
+                    value = self.string(payload)
+            setattr(node, name, value)
+            field += 1
+        if cls is AST.Identifier or cls is AST.FuncCall:
+            node.symbol_ref = None
+        line = table[row + 1]
+        node.line = None if line < 0 else line
+        return node
@@ -0,0 +1,133 @@
+"""Batch mode for main.py: compile many sources on a process pool and stream
+one JSON object per file, in input order, to an output stream.
+
+Each line holds the file name, a status (ok, syntax-error, semantic-error or
+failed), the tokens, the AST as a flat preorder node list (children are
+indices into it), the symbol tables and every diagnostic. Nested JSON would
+overflow the encoder on long expressions, which is why the AST is flat."""
+
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import ast_binary
+import semantic
+from incremental import CompileSession
+
+
+def find_sources(paths):
+    """Expand directories into the .c files below them, sorted."""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for directory, _, names in os.walk(path):
+                found.extend(os.path.join(directory, name) for name in names if name.endswith('.c'))
+            sources.extend(sorted(found))
+        else:
+            sources.append(path)
+    return sources
+
+
+def ast_to_json(program):
+    """Return the AST as a list of node dicts in preorder; node 0 is the root."""
+    nodes = list(semantic.walk_nodes(program))
+    index = {id(node): i for i, node in enumerate(nodes)}
+    result = []
+    for node in nodes:
+        cls = type(node)
+        item = {'kind': cls.__name__, 'line': node.line}
+        for name, encoding in ast_binary.LAYOUT[cls]:
+            value = getattr(node, name)
+            if encoding == ast_binary.NODE:
+                value = None if value is None else index[id(value)]
+            elif encoding == ast_binary.NODES:
+                value = [None if child is None else index[id(child)] for child in value]
+            item[name] = value
+        result.append(item)
+    return result
+
+
+def diagnostics(stage, errors):
+    return [{'stage': stage, 'line': e.line, 'message': e.message} for e in errors]
+
+
+def compile_file(path, use_cache=True):
+    """Run the front end over one file and return its result as a dict."""
+    # imported here: main imports this module lazily, and workers need its
+    # front end and cache
+    import main
+    start = time.perf_counter()
+    result = {'file': path}
+    if not path.rstrip().endswith('.c'):
+        result.update(status='failed', errors=[{'stage': 'input', 'line': None, 'message': 'not a valid .c file'}])
+        return result
+    try:
+        with open(path) as f:
+            contents = f.read()
+        entry = main.compile_cache.load(contents) if use_cache else None
+        result['cached'] = entry is not None
+        if entry is None:
+            # a session of its own: one shared with earlier files would hand
+            # this file their parse trees for identical chunks, and move
+            # their lines and symbol entries to suit it
+            entry = main.front_end(contents, CompileSession())
+            if use_cache and entry.complete():
+                main.compile_cache.store(contents, entry)
+        result['tokens'] = [list(token[:3]) for token in entry.tokens]
+        result['ast'] = ast_to_json(entry.program)
+        if entry.parse_errors:
+            result.update(status='syntax-error', errors=diagnostics('syntax', entry.parse_errors))
+        elif entry.semantic_errors is None:
+            result.update(status='failed', errors=[{'stage': 'semantic', 'line': None,
+                                                    'message': 'Semantic analysis failed'}])
+        else:
+            result['status'] = 'semantic-error' if entry.semantic_errors else 'ok'
+            result['errors'] = diagnostics('semantic', entry.semantic_errors)
+            result['symbols'] = {'globals': entry.global_symbols, 'functions': entry.function_symbols}
+    except Exception as err:
+        result.update(status='failed', errors=[{'stage': 'internal', 'line': None, 'message': repr(err)}])
+    result['seconds'] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def _compile_job(use_cache, path):
+    # encode in the worker, so the parent only writes lines; symbol entries
+    # hold initializer nodes, shown as the symbol tables show them
+    result = compile_file(path, use_cache)
+    return result['status'], json.dumps(result, default=repr)
+
+
+def run(paths, jobs=None, use_cache=True, out=None, err=None):
+    """Compile every source under `paths`, writing one JSON line per file as
+    soon as it and every file before it are done. Returns the number of
+    files that did not compile cleanly."""
+    out = out or sys.stdout
+    err = err or sys.stderr
+    sources = find_sources(paths)
+    job = functools.partial(_compile_job, use_cache)
+    jobs = jobs or os.cpu_count() or 1
+    failed = 0
+    start = time.perf_counter()
+    if jobs == 1 or len(sources) < 2:
+        lines = map(job, sources)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(jobs)
+        lines = pool.map(job, sources, chunksize=max(1, len(sources) // (jobs * 8)))
+    try:
+        for status, line in lines:
+            out.write(line + '\n')
+            out.flush()
+            if status != 'ok':
+                failed += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    elapsed = time.perf_counter() - start
+    rate = len(sources) / elapsed if elapsed else 0.0
+    err.write(f"Compiled {len(sources)} files in {elapsed:.2f}s ({rate:.1f} files/s), {failed} failed\n")
+    return failed
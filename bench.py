@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+"""Front-end benchmarks.
+
+Usage: python bench.py [name ...]    (no names runs every benchmark)
+"""
+
+import contextlib
+import gc
+import io
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import ASTNodes as AST
+import ast_binary
+import bytecode
+import cache
+import closures
+import codegen
+import incremental
+import interpreter
+import lexer
+import lookaheadparser
+import semantic
+import transpile
+
+
+def _functions():
+    """Yield generated MiniC functions, one source chunk each."""
+    i = 0
+    while True:
+        yield f"""
+// generated function {i}
+func int f{i}(int a_{i}, float b_{i}) {{
+    int total_{i} = 0;
+    for (int k = 0; k <= a_{i}; k = k + 1) {{
+        if (k % 3 == 0 && b_{i} >= 1.5) {{
+            total_{i} = total_{i} + k * 2;
+        }} else {{
+            total_{i} = total_{i} - (k - 2);
+        }}
+    }}
+    while (!(total_{i} != 0) || a_{i} < 10) {{
+        a_{i} = a_{i} + 1;
+    }}
+    print(total_{i});
+    return total_{i};
+}}
+"""
+        i += 1
+
+
+def generate_program(size):
+    """Return a synthetic MiniC source of at least `size` bytes."""
+    parts = []
+    total = 0
+    for chunk in _functions():
+        if total >= size:
+            break
+        parts.append(chunk)
+        total += len(chunk)
+    return ''.join(parts)
+
+
+def generate_lines(lines):
+    """Return a synthetic MiniC source of at least `lines` lines."""
+    parts = []
+    total = 0
+    for chunk in _functions():
+        if total >= lines:
+            break
+        parts.append(chunk)
+        total += chunk.count('\n')
+    return ''.join(parts)
+
+
+def _best_of(fn, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def bench_lexer():
+    print('--- lexer: tokens per second ---')
+    print(f"{'Input':>10} {'Tokens':>10} {'Seconds':>10} {'Tokens/s':>12}")
+    for mb in (1, 2, 4):
+        source = generate_program(mb * 1024 * 1024)
+        elapsed, tokens = _best_of(lambda: lexer.lex(source))
+        print(f"{len(source) / 1e6:>8.2f}MB {len(tokens):>10} {elapsed:>10.3f} {len(tokens) / elapsed:>12,.0f}")
+
+
+def bench_lexer_stream():
+    print('--- lexer: streaming from a file (peak traced memory) ---')
+    print(f"{'Input':>10} {'Tokens':>10} {'lex() peak':>12} {'lex_iter() peak':>16}")
+    for mb in (1, 4):
+        source = generate_program(mb * 1024 * 1024)
+        with tempfile.NamedTemporaryFile('w', suffix='.c', delete=False) as f:
+            f.write(source)
+        del source
+        try:
+            tracemalloc.start()
+            with open(f.name) as src:
+                count = len(lexer.lex(src.read()))
+            _, whole_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            tracemalloc.start()
+            with open(f.name) as src:
+                streamed = sum(1 for _ in lexer.lex_iter(src))
+            _, stream_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            os.unlink(f.name)
+        assert streamed == count
+        print(f"{mb:>8}MB {count:>10} {whole_peak / 1e6:>10.1f}MB {stream_peak / 1e6:>14.2f}MB")
+
+
+def _traced_peak(fn):
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, result
+
+
+def bench_token_memory():
+    print('--- lexer: token store memory (100k-line program) ---')
+    source = generate_lines(100_000)
+    legacy_peak, legacy = _traced_peak(lambda: lexer.lex(source))
+    compact_peak, compact = _traced_peak(lambda: lexer.lex_compact(source))
+    assert len(legacy) == len(compact)
+    print(f"lines={source.count(chr(10)):,} tokens={len(compact):,}")
+    print(f"{'Store':12} {'Peak':>10} {'Bytes/token':>12}")
+    for name, peak in (('tuples', legacy_peak), ('TokenArray', compact_peak)):
+        print(f"{name:12} {peak / 1e6:>8.1f}MB {peak / len(compact):>12.1f}")
+    print(f"reduction: {legacy_peak / compact_peak:.1f}x")
+
+
+def _legacy_check(newStr, lineNumber=1):
+    """Word classification as it was before the keyword/type lookup table."""
+    if newStr == '' or newStr == '\n':
+        return None
+    if newStr in lexer.keywords:
+        return (newStr, newStr, lineNumber)
+    if newStr in lexer.types:
+        return (newStr, newStr, lineNumber)
+    if newStr.replace('.', '', 1).isdigit() and newStr.count('.') <= 1 and newStr != '.':
+        try:
+            if '.' in newStr:
+                return ("number", float(newStr), lineNumber)
+            return ("number", int(newStr), lineNumber)
+        except Exception:
+            return ("number", newStr, lineNumber)
+    if len(newStr) > 0 and len(newStr) < 32:
+        return ("identifier", newStr, lineNumber, {})
+    return None
+
+
+def bench_classify():
+    print('--- lexer: word classification (identifier-heavy) ---')
+    source = generate_program(1024 * 1024)
+    words = [w for w in lexer.token_pattern.findall(source) if lexer.is_word(w)]
+    identifiers = sum(1 for w in words if lexer.classify(w)[0] == 'identifier')
+    print(f"words={len(words):,} identifiers={identifiers / len(words):.0%}")
+    def scanner_path(word):
+        # what Lexer.scan does per word: one table lookup, then the literal fast path
+        kind = lexer.token_kinds.get(word)
+        return (kind, word) if kind is not None else lexer.classify_literal(word)
+
+    print(f"{'Classifier':28} {'Seconds':>10} {'Words/s':>12}")
+    results = {}
+    for name, fn in (('before: check()', _legacy_check),
+                     ('after: check()', lexer.check),
+                     ('after: lookup + literal', scanner_path)):
+        elapsed, out = _best_of(lambda: [fn(w) for w in words])
+        results[name] = out
+        print(f"{name:28} {elapsed:>10.3f} {len(words) / elapsed:>12,.0f}")
+    assert results['before: check()'] == results['after: check()']
+
+
+def generate_tokens(count):
+    """Return the token list of whole generated functions, about `count` tokens."""
+    tokens = []
+    for chunk in _functions():
+        chunk_tokens = lexer.lex(chunk)
+        if tokens and len(tokens) + len(chunk_tokens) > count:
+            break
+        tokens.extend(chunk_tokens)
+    return tokens
+
+
+def bench_parser():
+    # The collector is paused while timing: its full passes over the growing
+    # AST add a superlinear term that has nothing to do with the parser.
+    print('--- parser: scaling with input size (gc paused) ---')
+    print(f"{'Tokens':>10} {'Seconds':>10} {'Tokens/s':>12} {'us/token':>10}")
+    for count in (1_000, 10_000, 100_000, 1_000_000):
+        tokens = generate_tokens(count)
+        gc.disable()
+        try:
+            elapsed, _ = _best_of(lambda: lookaheadparser.parse(tokens), repeat=1 if count >= 1_000_000 else 3)
+        finally:
+            gc.enable()
+        print(f"{len(tokens):>10,} {elapsed:>10.3f} {len(tokens) / elapsed:>12,.0f} {elapsed / len(tokens) * 1e6:>10.2f}")
+
+
+def _count_nodes(program):
+    """Count AST nodes reachable from `program` (iteratively; trees can be deep)."""
+    count = 0
+    stack = [program]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+            continue
+        if type(node).__module__ != AST.__name__:
+            continue
+        count += 1
+        names = getattr(type(node), '__slots__', None) or list(vars(node))
+        for name in names:
+            stack.append(getattr(node, name, None))
+    return count
+
+
+def _dict_backed(cls):
+    """A copy of slotted node class `cls` that keeps its attributes in a
+    per-instance __dict__, as the nodes did before they declared __slots__."""
+    namespace = {name: value for name, value in vars(cls).items()
+                 if name != '__slots__' and name not in cls.__slots__}
+    return type(cls.__name__, (), namespace)
+
+
+@contextlib.contextmanager
+def _unslotted_nodes():
+    """Make the parser build dict-backed nodes while the block runs."""
+    originals = {name: cls for name, cls in vars(AST).items()
+                 if isinstance(cls, type) and cls.__module__ == AST.__name__ and '__slots__' in vars(cls)}
+    for name, cls in originals.items():
+        setattr(AST, name, _dict_backed(cls))
+    try:
+        yield
+    finally:
+        for name, cls in originals.items():
+            setattr(AST, name, cls)
+
+
+def bench_ast_memory():
+    print('--- AST: resident bytes per node (100k-line program) ---')
+    tokens = lexer.lex_compact(generate_lines(100_000))
+    print(f"{'Nodes':24} {'Count':>10} {'MB':>8} {'Bytes/node':>11}")
+    for label, nodes_context in (('__dict__ (no slots)', _unslotted_nodes), ('__slots__', contextlib.nullcontext)):
+        with nodes_context():
+            gc.collect()
+            tracemalloc.start()
+            try:
+                before, _ = tracemalloc.get_traced_memory()
+                program = lookaheadparser.parse(tokens)
+                after, _ = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        nodes = _count_nodes(program)
+        del program
+        print(f"{label:24} {nodes:>10,} {(after - before) / 1e6:>8.1f} {(after - before) / nodes:>11.1f}")
+
+
+def bench_semantic():
+    print('--- semantic: analyze() scaling (gc paused) ---')
+    print(f"{'Lines':>10} {'Nodes':>10} {'Seconds':>10} {'Nodes/s':>12}")
+    for lines in (1_000, 10_000, 100_000):
+        program = lookaheadparser.parse(lexer.lex_compact(generate_lines(lines)))
+        nodes = _count_nodes(program)
+        gc.disable()
+        try:
+            elapsed, _ = _best_of(lambda: _quiet(semantic.SemanticAnalyzer().analyze, program))
+        finally:
+            gc.enable()
+        print(f"{lines:>10,} {nodes:>10,} {elapsed:>10.3f} {nodes / elapsed:>12,.0f}")
+
+
+def generate_nested_program(depth, locals_per_block, uses):
+    """Return one MiniC function with blocks nested `depth` deep, each declaring
+    `locals_per_block` locals; the innermost block reads an outermost local `uses` times."""
+    lines = ['func int main() {', '    int acc = 0;']
+    for d in range(depth):
+        lines.append('if (acc >= 0) {')
+        lines.extend(f'int v{d}_{k} = {k};' for k in range(locals_per_block))
+    lines.extend(f'acc = acc + v0_{u % locals_per_block};' for u in range(uses))
+    lines.append('}' * depth)
+    lines.extend(['    return acc;', '}'])
+    return '\n'.join(lines) + '\n'
+
+
+class _ScanningAnalyzer(semantic.SemanticAnalyzer):
+    """Lookup as it was before the bindings map: walk the scope stack outwards."""
+
+    def lookup_symbol(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return self.global_symbols.get(name)
+
+
+def bench_semantic_scopes():
+    print('--- semantic: name lookup under deep nesting (20 locals per block, 20k uses) ---')
+    print(f"{'Depth':>6} {'Locals':>8} {'scan':>10} {'bindings':>10} {'speedup':>8}")
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(20_000)
+    try:
+        for depth in (1, 10, 100, 400):
+            program = lookaheadparser.parse(lexer.lex_compact(generate_nested_program(depth, 20, 20_000)))
+            scan, _ = _best_of(lambda: _quiet(_ScanningAnalyzer().analyze, program))
+            bindings, _ = _best_of(lambda: _quiet(semantic.SemanticAnalyzer().analyze, program))
+            print(f"{depth:>6} {depth * 20 + 1:>8,} {scan:>10.3f} {bindings:>10.3f} {scan / bindings:>7.1f}x")
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def bench_semantic_parallel():
+    # Worker processes check function bodies; the parent still walks each
+    # function once to merge symbol refs and expression types, so that walk
+    # is the serial fraction that bounds the speedup.
+    print(f'--- semantic: parallel function checking ({os.cpu_count()} cores) ---')
+    program = lookaheadparser.parse(lexer.lex_compact(generate_lines(100_000)))
+    functions = sum(1 for item in program.getFunction() if isinstance(item, AST.Function))
+    print(f"functions={functions:,}")
+    print(f"{'Workers':>8} {'Seconds':>10} {'Speedup':>8}")
+    serial = None
+    for workers in (1, 2, 4, 8):
+        elapsed, _ = _best_of(lambda: _quiet(semantic.SemanticAnalyzer().analyze, program, workers), repeat=1)
+        serial = serial or elapsed
+        print(f"{workers:>8} {elapsed:>10.3f} {serial / elapsed:>7.2f}x")
+
+
+def generate_arithmetic_program(functions):
+    """Return MiniC functions made of long mixed int/float arithmetic expressions."""
+    parts = []
+    for i in range(functions):
+        terms = ' + '.join(f'(a * {k} - b / {k + 1}) * (a % {k + 2} + {k}.5)' for k in range(1, 9))
+        parts.append(f'func float g{i}(int a, float b) {{\n'
+                     f'    float x = {terms};\n'
+                     f'    if (x > a && -x < b || !(a == 0)) {{ x = x - {terms}; }}\n'
+                     f'    return x * ~a;\n'
+                     f'}}\n')
+    return ''.join(parts)
+
+
+def bench_semantic_arith():
+    print('--- semantic: arithmetic-heavy checking (gc paused) ---')
+    print(f"{'Functions':>10} {'Nodes':>10} {'Seconds':>10} {'Nodes/s':>12}")
+    for functions in (100, 1_000, 5_000):
+        program = lookaheadparser.parse(lexer.lex_compact(generate_arithmetic_program(functions)))
+        nodes = _count_nodes(program)
+        gc.disable()
+        try:
+            elapsed, _ = _best_of(lambda: _quiet(semantic.SemanticAnalyzer().analyze, program))
+        finally:
+            gc.enable()
+        print(f"{functions:>10,} {nodes:>10,} {elapsed:>10.3f} {nodes / elapsed:>12,.0f}")
+
+
+def generate_call_program(functions, depth):
+    """Return a MiniC source whose functions each use calls nested `depth` deep."""
+    parts = ['int seed = 1;\nfunc int g(int a, int b) {\n    return a + b;\n}\n']
+    for i in range(functions):
+        expr = 'seed'
+        for d in range(depth):
+            expr = f'g({expr}, {d})'
+        parts.append(f'func int f{i}(int a_{i}) {{\n    int r_{i} = {expr};\n    return {expr};\n}}\n')
+    return ''.join(parts)
+
+
+class _NoMemo(dict):
+    """An expr_types table that forgets everything: every query recomputes."""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+def _call_nodes(program):
+    stack = [program]
+    calls = []
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+        elif type(node).__module__ == AST.__name__:
+            if type(node) is AST.FuncCall:
+                calls.append(node)
+            stack.extend(getattr(node, name) for name in type(node).__slots__)
+    return calls
+
+
+def bench_semantic_calls():
+    # Type every call node of a call-heavy program, as a back end asking for
+    # operand types does. Without the memo table each query re-walks the
+    # whole nested call below it, so the cost grows with depth squared.
+    print('--- semantic: typing nested calls (200 functions) ---')
+    print(f"{'Depth':>6} {'Calls':>8} {'analyze()':>10} {'uncached':>10} {'memoized':>10} {'speedup':>8}")
+    for depth in (5, 20, 80):
+        program = lookaheadparser.parse(lexer.lex_compact(generate_call_program(200, depth)))
+        calls = _call_nodes(program)
+        analyzer = semantic.SemanticAnalyzer()
+        analyze_time, _ = _best_of(lambda: _quiet(analyzer.analyze, program), repeat=1)
+        types = analyzer.expr_types
+
+        def query_all():
+            return [analyzer.type_of(c) for c in calls]
+
+        analyzer.expr_types = _NoMemo()
+        uncached, expected = _best_of(query_all)
+        analyzer.expr_types = types
+        memoized, result = _best_of(query_all)
+        assert result == expected
+        print(f"{depth:>6} {len(calls):>8,} {analyze_time:>10.3f} {uncached:>10.3f} {memoized:>10.4f} {uncached / memoized:>7.0f}x")
+
+
+def bench_incremental():
+    # Lexing stays whole-file (chunk boundaries come from the tokens), so it
+    # is part of every timing below.
+    print('--- incremental: CompileSession recompiles (100k lines) ---')
+    source = generate_lines(100_000)
+    edits = [
+        ('cold', source),
+        ('unchanged', source),
+        ('one body edit', source.replace('total_500 = total_500 + k * 2;', 'total_500 = total_500 + k * 4;')),
+        ('lines shifted', '// header\n' + source),
+    ]
+    session = incremental.CompileSession()
+
+    def compile(text):
+        program, errors = session.parse(lexer.lex_compact(text))
+        assert errors == []
+        return session.analyze(program)
+
+    start = time.perf_counter()
+    _quiet(semantic.analyze_with_diagnostics, lookaheadparser.parse(lexer.lex_compact(source)))
+    print(f"fresh front end: {time.perf_counter() - start:.3f}s")
+    print(f"{'Compile':>14} {'Seconds':>10} {'Parsed':>8} {'Analyzed':>9}")
+    for label, text in edits:
+        parsed, analyzed = session.parsed, session.analyzed
+        start = time.perf_counter()
+        _quiet(compile, text)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>14} {elapsed:>10.3f} {session.parsed - parsed:>8,} {session.analyzed - analyzed:>9,}")
+
+
+def bench_cache():
+    print('--- cache: front end vs on-disk cache hit ---')
+    print(f"{'Lines':>10} {'Front end':>10} {'Store':>8} {'Hit':>8} {'Entry MB':>9} {'Speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        compile_cache = cache.CompileCache(directory, max_bytes=1 << 30)
+        for lines in (1_000, 10_000, 100_000):
+            source = generate_lines(lines)
+
+            def front_end():
+                tokens = lexer.lex_compact(source)
+                program = lookaheadparser.parse(tokens)
+                analyzer, errors = semantic.analyze_with_diagnostics(program)
+                return cache.Entry(tokens, program, [], analyzer, errors)
+
+            cold, entry = _best_of(lambda: _quiet(front_end), repeat=1)
+            store, _ = _best_of(lambda: compile_cache.store(source, entry), repeat=1)
+            hit, loaded = _best_of(lambda: compile_cache.load(source))
+            assert loaded is not None
+            size = os.path.getsize(compile_cache.path(source)) / 1e6
+            print(f"{lines:>10,} {cold:>10.3f} {store:>8.3f} {hit:>8.3f} {size:>9.1f} {cold / hit:>7.1f}x")
+
+
+def bench_ast_binary():
+    print('--- ast-binary: binary AST vs pickle (100k lines, gc paused) ---')
+    program = lookaheadparser.parse(lexer.lex_compact(generate_lines(100_000)))
+    gc.disable()
+    try:
+        encode, data = _best_of(lambda: ast_binary.encode(program), repeat=1)
+        dumps, pickled = _best_of(lambda: pickle.dumps(program, pickle.HIGHEST_PROTOCOL), repeat=1)
+        print(f"{'':>10} {'MB':>8} {'Encode':>8} {'Load all':>9} {'Load one':>9}")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'program.ast')
+            with open(path, 'wb') as f:
+                f.write(data)
+
+            def load_all():
+                with ast_binary.load(path) as tree:
+                    return tree.program()
+
+            def load_one():
+                with ast_binary.load(path) as tree:
+                    return tree.node(tree.items()[len(tree.items()) // 2])
+
+            full, loaded = _best_of(load_all)
+            one, _ = _best_of(load_one)
+        assert repr(loaded) == repr(program)
+        unpickle, _ = _best_of(lambda: pickle.loads(pickled))
+    finally:
+        gc.enable()
+    print(f"{'binary':>10} {len(data) / 1e6:>8.1f} {encode:>8.3f} {full:>9.3f} {one:>9.4f}")
+    print(f"{'pickle':>10} {len(pickled) / 1e6:>8.1f} {dumps:>8.3f} {unpickle:>9.3f} {unpickle:>9.4f}")
+
+
+# MiniC programs for the execution benchmarks
+RUN_PROGRAMS = {
+    # Test Programs/control_structures.c with longer loops
+    'control': """func int main() {
+    int i = 0;
+    int s = 0;
+    for (int i = 0; i < 200000; i = i + 1) {
+        s = s + i;
+    }
+    if (s > 5) {
+        print(s);
+    } else {
+        print(0);
+    }
+    while (i < 200000) {
+        i = i + 1;
+    }
+    return 0;
+}
+""",
+    'fib(22)': """func int fib(int n) {
+    if (n < 2) { return n; }
+    return fib(n - 1) + fib(n - 2);
+}
+func int main() { return fib(22) % 256; }
+""",
+    'loops': """int total = 0;
+func int main() {
+    for (int i = 0; i < 300; i = i + 1) {
+        int j = 0;
+        while (j < 1000) {
+            if (j % 3 == 0 || i > j) { total = total + j; } else { total = total - 1; }
+            j = j + 1;
+        }
+    }
+    print(total);
+    return 0;
+}
+""",
+    'float math': """func float step(float x, float dt) {
+    return x + dt * (1.0 - x * x / 3.0);
+}
+func int main() {
+    float x = 0.5;
+    for (int i = 0; i < 100000; i = i + 1) { x = step(x, 0.001); }
+    print(x);
+    return 0;
+}
+""",
+}
+
+# execution engines: name -> fn(program, analyzer, stdout) returning main's result
+ENGINES = {
+    'tree': lambda program, analyzer, out: interpreter.run(program, analyzer, stdout=out),
+    'vm': lambda program, analyzer, out: bytecode.run(program, analyzer, stdout=out),
+    'closures': lambda program, analyzer, out: closures.run(program, analyzer, stdout=out),
+    'python': lambda program, analyzer, out: transpile.run(program, analyzer, stdout=out),
+}
+
+
+def bench_run():
+    print('--- run: execution engines ---')
+    # the native engine is timed apart from its gcc build; it needs gcc
+    native = shutil.which('gcc') is not None
+    print(f"{'Program':>12} " + ' '.join(f"{name:>10}" for name in ENGINES) + f" {'VM instr/s':>12}"
+          + (f" {'native':>10} {'gcc build':>10}" if native else ''))
+    for label, source in RUN_PROGRAMS.items():
+        program = lookaheadparser.parse(lexer.lex_compact(source))
+        analyzer, errors = _quiet(semantic.analyze_with_diagnostics, program)
+        assert errors == []
+        times = []
+        expected = None
+        for engine in ENGINES.values():
+            out = io.StringIO()
+            elapsed, result = _best_of(lambda: engine(program, analyzer, out), repeat=1)
+            output = (result, out.getvalue())
+            expected = expected or output
+            assert output == expected, (label, output, expected)
+            times.append(elapsed)
+        vm = bytecode.VM(bytecode.compile_program(program, analyzer), stdout=io.StringIO())
+        vm.run()
+        line = f"{label:>12} " + ' '.join(f"{t:>10.3f}" for t in times) + f" {vm.rate() / 1e6:>11.1f}M"
+        if native:
+            with tempfile.TemporaryDirectory() as directory:
+                build, executable = _best_of(lambda: codegen.build(codegen.generate(program, analyzer),
+                                                                   os.path.join(directory, 'program')), repeat=1)
+                elapsed, proc = _best_of(lambda: subprocess.run([executable], capture_output=True, text=True))
+            assert (proc.returncode, proc.stdout) == (int(expected[0]) & 0xFF, expected[1]), label
+            line += f" {elapsed:>10.4f} {build:>10.3f}"
+        print(line)
+
+
+def _quiet(fn, *args):
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        return fn(*args)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+BENCHMARKS = {
+    'lexer': bench_lexer,
+    'lexer-stream': bench_lexer_stream,
+    'token-memory': bench_token_memory,
+    'classify': bench_classify,
+    'parser': bench_parser,
+    'ast-memory': bench_ast_memory,
+    'semantic': bench_semantic,
+    'semantic-scopes': bench_semantic_scopes,
+    'semantic-parallel': bench_semantic_parallel,
+    'semantic-arith': bench_semantic_arith,
+    'semantic-calls': bench_semantic_calls,
+    'incremental': bench_incremental,
+    'cache': bench_cache,
+    'ast-binary': bench_ast_binary,
+    'run': bench_run,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark {name!r}; choose from: {', '.join(BENCHMARKS)}")
+            sys.exit(2)
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,563 @@
+"""Bytecode compiler and stack VM for analyzed MiniC programs.
+
+compile_program() turns a program into a Code object. Every instruction is
+four int32 words (opcode, a, b, c) in one array('i'); constants sit in a
+pool. Arithmetic opcodes are typed: the int or float variant is chosen from
+the type the analyzer recorded, and integer operands of float arithmetic
+are converted explicitly (I2F). Variables use the slots of
+interpreter.Layout; run-time behaviour is the interpreter's.
+
+Conditions compile to jumps, so && and || in an if or loop never build a
+bool. A few superinstructions cover the sequences loops are made of:
+pushing two operands at once, `x = x + c` and compare-and-branch.
+
+The VM keeps its own call stack, so MiniC recursion does not use Python
+frames, and counts the instructions it executes."""
+
+import operator
+import sys
+import time
+from array import array
+
+import ASTNodes as AST
+import semantic
+from interpreter import MAX_CALL_DEPTH, ExecutionError, InputReader, Layout, format_value, parse_input, remainder, zero
+
+OPCODES = [
+    'CONST', 'LOAD_LOCAL', 'STORE_LOCAL', 'LOAD_GLOBAL', 'STORE_GLOBAL', 'POP',
+    'IADD', 'ISUB', 'IMUL', 'IMOD', 'INEG', 'INVERT',
+    'FADD', 'FSUB', 'FMUL', 'FDIV', 'FMOD', 'FNEG', 'I2F',
+    'EQ', 'NE', 'LT', 'GT', 'LE', 'GE', 'NOT', 'BOOL',
+    'JUMP', 'JUMP_IF_FALSE', 'JUMP_IF_TRUE', 'JUMP_IF_FALSE_OR_POP', 'JUMP_IF_TRUE_OR_POP',
+    'CALL', 'RETURN', 'PRINT', 'READ_LOCAL', 'READ_GLOBAL', 'HALT',
+    'LOAD_LOCAL_CONST', 'LOAD_LOCAL_LOCAL', 'IADD_LOCAL_CONST', 'INC_LOCAL',
+]
+(CONST, LOAD_LOCAL, STORE_LOCAL, LOAD_GLOBAL, STORE_GLOBAL, POP,
+ IADD, ISUB, IMUL, IMOD, INEG, INVERT,
+ FADD, FSUB, FMUL, FDIV, FMOD, FNEG, I2F,
+ EQ, NE, LT, GT, LE, GE, NOT, BOOL,
+ JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP,
+ CALL, RETURN, PRINT, READ_LOCAL, READ_GLOBAL, HALT,
+ LOAD_LOCAL_CONST, LOAD_LOCAL_LOCAL, IADD_LOCAL_CONST, INC_LOCAL) = range(len(OPCODES))
+
+INT_OPS = {'+': IADD, '-': ISUB, '*': IMUL, '%': IMOD}
+FLOAT_OPS = {'+': FADD, '-': FSUB, '*': FMUL, '/': FDIV, '%': FMOD}
+COMPARISONS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt,
+               '>': operator.gt, '<=': operator.le, '>=': operator.ge}
+COMPARE_OPS = dict(zip(COMPARISONS, (EQ, NE, LT, GT, LE, GE)))
+
+# Compare-and-branch: one opcode per comparison, sense (jump if the
+# comparison holds or unless it does) and operands (both on the stack, a
+# local and a constant, two locals). BRANCHES[op - FIRST_BRANCH] describes
+# an opcode as (operands, when, comparison function).
+OPERANDS = ('', '_LOCAL_CONST', '_LOCAL_LOCAL')
+STACK_OPERANDS, LOCAL_CONST, LOCAL_LOCAL = range(len(OPERANDS))
+FIRST_BRANCH = len(OPCODES)
+BRANCHES = []
+BRANCH_OPS = {}
+for _operands, _suffix in enumerate(OPERANDS):
+    for _when in (False, True):
+        for _name, _fn in zip(('EQ', 'NE', 'LT', 'GT', 'LE', 'GE'), COMPARISONS.items()):
+            BRANCH_OPS[_fn[0], _when, _operands] = len(OPCODES)
+            OPCODES.append(('JUMP_IF_' if _when else 'JUMP_UNLESS_') + _name + _suffix)
+            BRANCHES.append((_operands, _when, _fn[1]))
+# the test at the bottom of most loops gets its own case in the VM
+JUMP_IF_LT_LOCAL_CONST = BRANCH_OPS['<', True, LOCAL_CONST]
+
+JUMPS = {JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP}
+
+WORDS = 4
+
+
+class Function:
+    __slots__ = ('name', 'entry', 'params', 'frame_size')
+
+    def __init__(self, name, entry, params, frame_size):
+        self.name = name
+        self.entry = entry
+        self.params = params
+        self.frame_size = frame_size
+
+
+class Code:
+    """A compiled program: instructions, constants, functions and the size
+    of the globals area. Execution starts at instruction 0."""
+
+    def __init__(self, code, constants, functions, global_count):
+        self.code = code
+        self.constants = constants
+        self.functions = functions
+        self.global_count = global_count
+
+    def instructions(self):
+        """The instructions as (op, a, b, c) tuples."""
+        words = self.code
+        return [tuple(words[i:i + WORDS]) for i in range(0, len(words), WORDS)]
+
+
+def disassemble(code):
+    lines = []
+    entries = {f.entry: f.name for f in code.functions}
+    constants = code.constants
+    for pc, (op, a, b, c) in enumerate(code.instructions()):
+        if pc in entries:
+            lines.append(f'{entries[pc]}:')
+        if op == CONST:
+            operands = repr(constants[a])
+        elif op == CALL:
+            operands = f'{code.functions[a].name} ({b} args)'
+        elif op in JUMPS:
+            operands = f'-> {c}'
+        elif op >= FIRST_BRANCH:
+            kind = BRANCHES[op - FIRST_BRANCH][0]
+            operands = '' if kind == STACK_OPERANDS else f'{a} {constants[b]!r} ' if kind == LOCAL_CONST else f'{a} {b} '
+            operands += f'-> {c}'
+        elif op in (LOAD_LOCAL_CONST, IADD_LOCAL_CONST, INC_LOCAL):
+            operands = f'{a} {constants[b]!r}'
+        else:
+            operands = f'{a} {b}'
+        lines.append(f'{pc:>6}  {OPCODES[op]:<28}{operands}')
+    return '\n'.join(lines)
+
+
+class Compiler:
+    def __init__(self, program, analyzer):
+        if analyzer.errors:
+            raise ExecutionError('Cannot run a program with semantic errors')
+        self.program = program
+        self.types = analyzer.expr_types
+        self.layout = Layout(program, analyzer)
+        self.slots = self.layout.slots
+        self.code = []
+        self.constants = []
+        self.constant_index = {}
+        self.functions = []
+        self.function_index = {}
+
+    def compile(self):
+        items = self.program.getFunction()
+        for item in items:
+            if type(item) is AST.Function:
+                self.function_index[item.getName()] = len(self.functions)
+                self.functions.append(Function(item.getName(), -1, len(item.getParams()),
+                                               self.layout.frame_sizes[item]))
+        if 'main' not in self.function_index:
+            raise ExecutionError("No main() function")
+        # startup: initialize the globals, then run main
+        for item in items:
+            if type(item) is AST.VarDecl:
+                self.store_value(item.typ, item.init)
+                self.emit(STORE_GLOBAL, ~self.slots[item])
+        self.emit(CALL, self.function_index['main'], 0)
+        self.emit(HALT)
+        for item in items:
+            if type(item) is AST.Function:
+                self.compile_function(item)
+        return Code(array('i', self.code), self.constants, self.functions, self.layout.global_count)
+
+    def emit(self, op, a=0, b=0, c=0):
+        self.code.extend((op, a, b, c))
+        return len(self.code) // WORDS - 1
+
+    def here(self):
+        return len(self.code) // WORDS
+
+    def patch(self, jumps, target=None):
+        """Point the jumps (instruction numbers) at `target`, by default
+        the next instruction."""
+        for at in jumps:
+            self.code[at * WORDS + 3] = self.here() if target is None else target
+
+    def constant(self, value):
+        key = (type(value), value)
+        index = self.constant_index.get(key)
+        if index is None:
+            index = self.constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def local(self, expr):
+        """The frame slot of a local variable reference, else None."""
+        if type(expr) is AST.Identifier and self.slots[expr] >= 0:
+            return self.slots[expr]
+        return None
+
+    def compile_function(self, func):
+        self.functions[self.function_index[func.getName()]].entry = self.here()
+        self.return_type = func.getReturnType()
+        self.statements(func.getStatement().statements)
+        # falling off the end returns the zero of the return type
+        self.emit(CONST, self.constant(zero(self.return_type)))
+        self.emit(RETURN)
+
+    def statements(self, statements):
+        for stmt in statements:
+            self.statement(stmt)
+
+    def statement(self, stmt):
+        t = type(stmt)
+        if t is AST.VarDecl:
+            self.store_value(stmt.typ, stmt.init)
+            self.emit(STORE_LOCAL, self.slots[stmt])
+        elif t is AST.Assign:
+            self.assign(stmt)
+        elif t is AST.Return:
+            self.store_value(self.return_type, stmt.getExpression())
+            self.emit(RETURN)
+        elif t is AST.IfElse:
+            skip_then = []
+            self.branch(stmt.cond, False, skip_then)
+            self.statements(stmt.then_branch.statements)
+            if stmt.else_branch is not None:
+                skip_else = [self.emit(JUMP)]
+                self.patch(skip_then)
+                self.statements(stmt.else_branch.statements)
+                self.patch(skip_else)
+            else:
+                self.patch(skip_then)
+        elif t is AST.While:
+            self.loop(stmt.cond, stmt.body, None)
+        elif t is AST.For:
+            if stmt.init is not None:
+                self.statement(stmt.init)
+            self.loop(stmt.cond, stmt.body, stmt.step)
+        elif t is AST.Block:
+            self.statements(stmt.statements)
+        elif t is AST.Print:
+            self.expression(stmt.expr)
+            self.emit(PRINT)
+        elif t is AST.Read:
+            target = stmt.target
+            slot = self.slots[target]
+            type_code = semantic.TYPE_CODES[target.symbol_ref['entry']['type']]
+            if slot >= 0:
+                self.emit(READ_LOCAL, slot, type_code)
+            else:
+                self.emit(READ_GLOBAL, ~slot, type_code)
+        elif t is AST.FuncCall or t is AST.Identifier:
+            self.expression(stmt)
+            self.emit(POP)
+        else:
+            raise ExecutionError(f'Cannot compile {t.__name__}')
+
+    def loop(self, cond, body, step):
+        # the test sits after the body, so each pass takes one branch
+        enter = [self.emit(JUMP)]
+        top = self.here()
+        self.statements(body.statements)
+        if step is not None:
+            self.statement(step)
+        self.patch(enter)
+        if cond is None:
+            self.emit(JUMP, c=top)
+        else:
+            back = []
+            self.branch(cond, True, back)
+            self.patch(back, top)
+
+    def assign(self, stmt):
+        target = stmt.target
+        slot = self.slots[target]
+        expr = stmt.expr
+        if (slot >= 0 and type(expr) is AST.BinOp and expr.oper == '+' and self.local(expr.left) == slot
+                and type(expr.right) is AST.Constant and self.types[expr] in semantic.INTEGER_TYPES):
+            self.emit(INC_LOCAL, slot, self.constant(expr.right.value))
+            return
+        self.store_value(target.symbol_ref['entry']['type'], expr)
+        if slot >= 0:
+            self.emit(STORE_LOCAL, slot)
+        else:
+            self.emit(STORE_GLOBAL, ~slot)
+
+    def store_value(self, type_name, expr):
+        """Push `expr` converted for a variable (or result) of `type_name`."""
+        if expr is None:
+            self.emit(CONST, self.constant(zero(type_name)))
+            return
+        self.expression(expr)
+        if type_name in ('float', 'double') and self.types[expr] in semantic.INTEGER_TYPES:
+            self.emit(I2F)
+
+    def branch(self, cond, when, jumps):
+        """Jump if the truth of `cond` is `when`, else fall through. The
+        jumps are appended to `jumps`, for the caller to patch."""
+        t = type(cond)
+        if t is AST.UnOp and cond.oper == '!':
+            self.branch(cond.inner_exp, not when, jumps)
+            return
+        if t is AST.BinOp:
+            op = cond.oper
+            if op in ('&&', '||'):
+                if (op == '&&') != when:
+                    # either operand alone can decide it
+                    self.branch(cond.left, when, jumps)
+                    self.branch(cond.right, when, jumps)
+                else:
+                    skip = []
+                    self.branch(cond.left, not when, skip)
+                    self.branch(cond.right, when, jumps)
+                    self.patch(skip)
+                return
+            if op in COMPARE_OPS:
+                left, right = cond.left, cond.right
+                slot = self.local(left)
+                if slot is not None and type(right) is AST.Constant:
+                    jumps.append(self.emit(BRANCH_OPS[op, when, LOCAL_CONST], slot, self.constant(right.value)))
+                elif slot is not None and self.local(right) is not None:
+                    jumps.append(self.emit(BRANCH_OPS[op, when, LOCAL_LOCAL], slot, self.local(right)))
+                else:
+                    self.expression(left)
+                    self.expression(right)
+                    jumps.append(self.emit(BRANCH_OPS[op, when, STACK_OPERANDS]))
+                return
+        self.expression(cond)
+        jumps.append(self.emit(JUMP_IF_TRUE if when else JUMP_IF_FALSE))
+
+    def operands(self, left, right):
+        """Push two operands, with one instruction when they are simple."""
+        slot = self.local(left)
+        if slot is not None:
+            if type(right) is AST.Constant:
+                self.emit(LOAD_LOCAL_CONST, slot, self.constant(right.value))
+                return
+            other = self.local(right)
+            if other is not None:
+                self.emit(LOAD_LOCAL_LOCAL, slot, other)
+                return
+        self.expression(left)
+        self.expression(right)
+
+    def expression(self, expr):
+        t = type(expr)
+        if t is AST.Constant:
+            self.emit(CONST, self.constant(expr.value))
+        elif t is AST.Identifier:
+            slot = self.slots[expr]
+            if slot >= 0:
+                self.emit(LOAD_LOCAL, slot)
+            else:
+                self.emit(LOAD_GLOBAL, ~slot)
+        elif t is AST.BinOp:
+            self.binop(expr)
+        elif t is AST.UnOp:
+            self.expression(expr.inner_exp)
+            if expr.oper == '!':
+                self.emit(NOT)
+            elif expr.oper == '~':
+                self.emit(INVERT)
+            elif self.types[expr] in semantic.FLOATING_TYPES:
+                self.emit(FNEG)
+            else:
+                self.emit(INEG)
+        elif t is AST.FuncCall:
+            params = expr.symbol_ref['entry']['additional']['params']
+            for (typ, _), arg in zip(params, expr.args):
+                self.store_value(typ, arg)
+            self.emit(CALL, self.function_index[expr.name], len(expr.args))
+        else:
+            raise ExecutionError(f'Cannot compile {t.__name__}')
+
+    def binop(self, expr):
+        op = expr.oper
+        if op in ('&&', '||'):
+            self.expression(expr.left)
+            jump = self.emit(JUMP_IF_FALSE_OR_POP if op == '&&' else JUMP_IF_TRUE_OR_POP)
+            self.expression(expr.right)
+            self.patch([jump])
+            self.emit(BOOL)
+        elif op in COMPARE_OPS:
+            self.operands(expr.left, expr.right)
+            self.emit(COMPARE_OPS[op])
+        elif self.types[expr] in semantic.FLOATING_TYPES:
+            for operand in (expr.left, expr.right):
+                if type(operand) is AST.Constant:
+                    self.emit(CONST, self.constant(float(operand.value)))
+                    continue
+                self.expression(operand)
+                if self.types[operand] in semantic.INTEGER_TYPES:
+                    self.emit(I2F)
+            self.emit(FLOAT_OPS[op])
+        elif op == '+' and type(expr.right) is AST.Constant and self.local(expr.left) is not None:
+            self.emit(IADD_LOCAL_CONST, self.slots[expr.left], self.constant(expr.right.value))
+        else:
+            self.operands(expr.left, expr.right)
+            self.emit(INT_OPS[op])
+
+
+def compile_program(program, analyzer):
+    """Compile an analyzed program to a Code object."""
+    return Compiler(program, analyzer).compile()
+
+
+class VM:
+    def __init__(self, code, stdin=None, stdout=None):
+        self.code = code
+        self.input = InputReader(stdin or sys.stdin)
+        self.stdout = stdout or sys.stdout
+        self.executed = 0
+        self.seconds = 0.0
+
+    def run(self):
+        """Execute from word 0 and return main's result."""
+        start = time.perf_counter()
+        try:
+            return self.loop()
+        finally:
+            self.seconds = time.perf_counter() - start
+
+    def rate(self):
+        """Instructions executed per second in the last run."""
+        return self.executed / self.seconds if self.seconds else 0.0
+
+    def loop(self):
+        code = self.code.instructions()
+        constants = self.code.constants
+        functions = self.code.functions
+        globals_ = [0] * self.code.global_count
+        write = self.stdout.write
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        calls = []
+        frame = []
+        pc = 0
+        executed = 0
+        # the most frequent instructions are tested first
+        try:
+            while True:
+                op, a, b, c = code[pc]
+                pc += 1
+                executed += 1
+                if op == LOAD_LOCAL:
+                    push(frame[a])
+                elif op == JUMP_IF_LT_LOCAL_CONST:
+                    if frame[a] < constants[b]:
+                        pc = c
+                elif op == INC_LOCAL:
+                    frame[a] += constants[b]
+                elif op == STORE_LOCAL:
+                    frame[a] = pop()
+                elif op == LOAD_LOCAL_CONST:
+                    push(frame[a])
+                    push(constants[b])
+                elif op == CONST:
+                    push(constants[a])
+                elif op == LOAD_LOCAL_LOCAL:
+                    push(frame[a])
+                    push(frame[b])
+                elif op >= FIRST_BRANCH:
+                    operands, when, compare = BRANCHES[op - FIRST_BRANCH]
+                    if operands == LOCAL_CONST:
+                        right = constants[b]
+                        left = frame[a]
+                    elif operands == LOCAL_LOCAL:
+                        right = frame[b]
+                        left = frame[a]
+                    else:
+                        right = pop()
+                        left = pop()
+                    if compare(left, right) == when:
+                        pc = c
+                elif op == JUMP:
+                    pc = c
+                elif op == IADD_LOCAL_CONST:
+                    push(frame[a] + constants[b])
+                elif op == LOAD_GLOBAL:
+                    push(globals_[a])
+                elif op == STORE_GLOBAL:
+                    globals_[a] = pop()
+                elif op == IADD or op == FADD:
+                    right = pop()
+                    stack[-1] += right
+                elif op == ISUB or op == FSUB:
+                    right = pop()
+                    stack[-1] -= right
+                elif op == IMUL or op == FMUL:
+                    right = pop()
+                    stack[-1] *= right
+                elif op == IMOD:
+                    right = pop()
+                    if right == 0:
+                        raise ExecutionError('Division by zero')
+                    # C's remainder takes the sign of the dividend
+                    left = stack[-1]
+                    stack[-1] = left % right if (left < 0) == (right < 0) else -(-left % right)
+                elif op == FDIV:
+                    right = pop()
+                    if right == 0:
+                        raise ExecutionError('Division by zero')
+                    stack[-1] /= right
+                elif op == CALL:
+                    if len(calls) >= MAX_CALL_DEPTH:
+                        raise ExecutionError('Call stack overflow')
+                    function = functions[a]
+                    calls.append((pc, frame))
+                    frame = [0] * function.frame_size
+                    if b:
+                        frame[:b] = stack[-b:]
+                        del stack[-b:]
+                    pc = function.entry
+                elif op == RETURN:
+                    pc, frame = calls.pop()
+                elif op < JUMP:
+                    # the rest of the operators
+                    right = pop()
+                    if op == FMOD:
+                        push(remainder(pop(), right))
+                    elif op == EQ:
+                        stack[-1] = stack[-1] == right
+                    elif op == NE:
+                        stack[-1] = stack[-1] != right
+                    elif op == LT:
+                        stack[-1] = stack[-1] < right
+                    elif op == GT:
+                        stack[-1] = stack[-1] > right
+                    elif op == LE:
+                        stack[-1] = stack[-1] <= right
+                    elif op == GE:
+                        stack[-1] = stack[-1] >= right
+                    elif op == I2F:
+                        push(float(right))
+                    elif op == INEG or op == FNEG:
+                        push(-right)
+                    elif op == NOT:
+                        push(not right)
+                    elif op == BOOL:
+                        push(bool(right))
+                    elif op == INVERT:
+                        push(~right)
+                    elif op != POP:
+                        raise ExecutionError(f'Bad opcode {op} at {pc - 1}')
+                elif op == JUMP_IF_FALSE:
+                    if not pop():
+                        pc = c
+                elif op == JUMP_IF_TRUE:
+                    if pop():
+                        pc = c
+                elif op == JUMP_IF_FALSE_OR_POP:
+                    if stack[-1]:
+                        pop()
+                    else:
+                        pc = c
+                elif op == JUMP_IF_TRUE_OR_POP:
+                    if stack[-1]:
+                        pc = c
+                    else:
+                        pop()
+                elif op == PRINT:
+                    write(format_value(pop()) + '\n')
+                elif op == READ_LOCAL:
+                    frame[a] = parse_input(self.input.next_word(), semantic.TYPE_NAMES[b])
+                elif op == READ_GLOBAL:
+                    globals_[a] = parse_input(self.input.next_word(), semantic.TYPE_NAMES[b])
+                elif op == HALT:
+                    return pop()
+                else:
+                    raise ExecutionError(f'Bad opcode {op} at {pc - 1}')
+        finally:
+            self.executed = executed
+
+
+def run(program, analyzer, stdin=None, stdout=None):
+    """Compile and execute an analyzed program; returns main's result."""
+    return VM(compile_program(program, analyzer), stdin, stdout).run()
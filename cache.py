@@ -0,0 +1,176 @@
+"""On-disk cache of front-end results, shared by every process that compiles.
+
+Entries are pickles named after a hash of the source text and of the
+compiler's own source, so editing the compiler invalidates them all. Each
+entry is written to a temporary file and renamed into place, so readers never
+see a partial entry. A hit refreshes the entry's mtime. Once the directory
+grows past its size limit, the least recently used entries are removed.
+
+Like __pycache__, the directory is trusted: entries are unpickled as found."""
+
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+
+import ASTNodes
+import diagnostics
+import incremental
+import lexer
+import lookaheadparser
+import semantic
+
+SUFFIX = '.pickle'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _without_gc(fn, *args):
+    # (un)pickling a tree allocates or visits every node; left on, the cyclic
+    # collector rescans the growing heap over and over
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return fn(*args)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def compiler_version():
+    """Hash of the modules whose output is cached."""
+    digest = hashlib.blake2b(digest_size=16)
+    for module in (ASTNodes, diagnostics, lexer, lookaheadparser, semantic, incremental):
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    with open(__file__, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+COMPILER_VERSION = compiler_version()
+
+
+def default_directory():
+    if os.environ.get('MINIC_CACHE_DIR'):
+        return os.environ['MINIC_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'minic')
+
+
+class Entry:
+    """Everything the front end produced for one source.
+
+    semantic_errors is None when analysis did not run (syntax errors) or
+    did not finish."""
+
+    __slots__ = ('tokens', 'program', 'parse_errors', 'global_symbols',
+                 'function_symbols', 'functions', 'expr_types', 'semantic_errors')
+
+    def __init__(self, tokens, program, parse_errors, analyzer=None, semantic_errors=None):
+        self.tokens = tokens
+        self.program = program
+        self.parse_errors = parse_errors
+        self.global_symbols = analyzer.global_symbols if analyzer else None
+        self.function_symbols = analyzer.function_symbols if analyzer else None
+        self.functions = analyzer.functions if analyzer else None
+        self.expr_types = analyzer.expr_types if analyzer else None
+        self.semantic_errors = semantic_errors
+
+    def complete(self):
+        # only finished front-end runs are worth caching
+        return bool(self.parse_errors) or self.semantic_errors is not None
+
+    def analyzer(self):
+        """A SemanticAnalyzer holding the cached tables."""
+        analyzer = semantic.SemanticAnalyzer(collect_errors=True)
+        analyzer.global_symbols = self.global_symbols
+        analyzer.function_symbols = self.function_symbols
+        analyzer.functions = self.functions
+        analyzer.expr_types = self.expr_types
+        analyzer.errors = self.semantic_errors
+        return analyzer
+
+
+class CompileCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, version=COMPILER_VERSION):
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        self.version = version
+
+    def path(self, source):
+        digest = hashlib.blake2b(self.version.encode(), digest_size=20)
+        digest.update(source.encode())
+        return os.path.join(self.directory, digest.hexdigest() + SUFFIX)
+
+    def load(self, source):
+        """Return the cached Entry for `source`, or None."""
+        path = self.path(source)
+        try:
+            with open(path, 'rb') as f:
+                entry = _without_gc(pickle.load, f)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, TypeError):
+            # unreadable or written by an incompatible compiler: a miss
+            return None
+        if not isinstance(entry, Entry):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def store(self, source, entry):
+        """Cache `entry`; returns False if it could not be written."""
+        try:
+            data = _without_gc(pickle.dumps, entry, pickle.HIGHEST_PROTOCOL)
+        except RecursionError:
+            # trees deeper than the pickler will walk are rebuilt every time
+            return False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, self.path(source))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                # another process evicted it first
+                pass
+            except OSError:
+                continue
+            total -= size
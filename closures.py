@@ -0,0 +1,392 @@
+"""Closure compiler for analyzed MiniC programs.
+
+compile_program() turns every statement and expression into a Python
+closure ahead of time, so running a program never looks at a node type.
+Each closure takes the frame (a list of slots, as in interpreter.Layout)
+and is specialised on what the compiler knows:
+
+  - operand shapes: `i + 1` becomes `lambda frame: add(frame[slot], 1)`,
+    with no closure call for either operand
+  - types from the analyzer: int or float arithmetic, integer operands of
+    float arithmetic converted once, print formatting chosen up front
+  - control flow: statement lists that cannot return skip the check
+
+Statements return None, or a 1-tuple holding the value of a return, as in
+the interpreter; run-time behaviour is the interpreter's."""
+
+import operator
+import sys
+
+import ASTNodes as AST
+import semantic
+from interpreter import (MAX_CALL_DEPTH, PYTHON_RECURSION_LIMIT, ExecutionError, InputReader, Layout,
+                         float_divide, float_remainder, format_value, int_remainder, parse_input, zero)
+
+FLOATING_NAMES = ('float', 'double')
+
+COMPARISONS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt,
+               '>': operator.gt, '<=': operator.le, '>=': operator.ge}
+
+
+INT_OPS = {'+': operator.add, '-': operator.sub, '*': operator.mul, '%': int_remainder}
+FLOAT_OPS = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': float_divide, '%': float_remainder}
+
+# print formatting by static type
+FORMATS = {
+    semantic.BOOL: lambda value: 'true' if value else 'false',
+    semantic.FLOAT: lambda value: '%g' % value,
+    semantic.DOUBLE: lambda value: '%g' % value,
+}
+for _code in semantic.INTEGER_TYPES:
+    FORMATS[_code] = str
+
+
+def run_statements(statements):
+    """One closure running a statement list that may return."""
+    if len(statements) == 1:
+        return statements[0]
+
+    def block(frame):
+        for statement in statements:
+            result = statement(frame)
+            if result is not None:
+                return result
+    return block
+
+
+def run_plain(statements):
+    """One closure running a statement list that cannot return."""
+    if len(statements) == 1:
+        return statements[0]
+    if len(statements) == 2:
+        first, second = statements
+
+        def pair(frame):
+            first(frame)
+            second(frame)
+        return pair
+
+    def block(frame):
+        for statement in statements:
+            statement(frame)
+    return block
+
+
+class CompiledProgram:
+    """A program compiled to closures; run() may be called repeatedly."""
+
+    def __init__(self, program, analyzer):
+        if analyzer.errors:
+            raise ExecutionError('Cannot run a program with semantic errors')
+        self.types = analyzer.expr_types
+        self.layout = Layout(program, analyzer)
+        self.slots = self.layout.slots
+        self.globals = [0] * self.layout.global_count
+        self.write = None
+        self.input = None
+        self.depth = 0
+        self.returns = {}
+        # function name -> callable taking a list of the argument values (none for no parameters)
+        self.functions = {}
+        self.init = []
+        for item in program.getFunction():
+            if type(item) is AST.VarDecl:
+                self.init.append((~self.slots[item], self.store_value(item.typ, item.init)))
+        for name, func in self.layout.functions.items():
+            self.functions[name] = self.function(func)
+        self.main = self.functions.get('main')
+
+    def run(self, stdin=None, stdout=None):
+        """Initialize the globals, call main() and return its result."""
+        self.write = (stdout or sys.stdout).write
+        self.input = InputReader(stdin or sys.stdin)
+        self.globals[:] = [0] * len(self.globals)
+        self.depth = 0
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, PYTHON_RECURSION_LIMIT))
+        try:
+            for slot, value in self.init:
+                self.globals[slot] = value(None)
+            if self.main is None:
+                raise ExecutionError("No main() function")
+            return self.main()
+        except RecursionError:
+            raise ExecutionError('Call stack overflow') from None
+        finally:
+            sys.setrecursionlimit(limit)
+
+    # functions and statements
+
+    def function(self, func):
+        size = self.layout.frame_sizes[func]
+        params = len(func.getParams())
+        padding = [0] * (size - params)
+        self.return_type = func.getReturnType()
+        body = self.statements(func.getStatement().statements)
+        default = zero(self.return_type)
+        program = self
+
+        # the call depth is counted as in the interpreter: an error ends
+        # the run, so only returning calls need to unwind
+        if params == 0:
+            def invoke():
+                if program.depth >= MAX_CALL_DEPTH:
+                    raise ExecutionError('Call stack overflow')
+                program.depth += 1
+                result = body(padding[:])
+                program.depth -= 1
+                return default if result is None else result[0]
+        else:
+            def invoke(args):
+                if program.depth >= MAX_CALL_DEPTH:
+                    raise ExecutionError('Call stack overflow')
+                program.depth += 1
+                result = body(args + padding)
+                program.depth -= 1
+                return default if result is None else result[0]
+        return invoke
+
+    def can_return(self, stmt):
+        result = self.returns.get(stmt)
+        if result is None:
+            result = self.returns[stmt] = any(type(node) is AST.Return for node in semantic.walk_nodes(stmt))
+        return result
+
+    def statements(self, statements):
+        compiled = [self.statement(stmt) for stmt in statements]
+        if not compiled:
+            return lambda frame: None
+        if any(self.can_return(stmt) for stmt in statements):
+            return run_statements(compiled)
+        return run_plain(compiled)
+
+    def statement(self, stmt):
+        t = type(stmt)
+        if t is AST.VarDecl:
+            return self.store(self.slots[stmt], self.store_value(stmt.typ, stmt.init))
+        if t is AST.Assign:
+            return self.assign(stmt)
+        if t is AST.Return:
+            expr = stmt.getExpression()
+            if expr is None:
+                return lambda frame: (None,)
+            value = self.store_value(self.return_type, expr)
+            return lambda frame: (value(frame),)
+        if t is AST.IfElse:
+            return self.if_else(stmt)
+        if t is AST.While:
+            return self.loop(stmt, None, stmt.cond, stmt.body, None)
+        if t is AST.For:
+            return self.loop(stmt, stmt.init, stmt.cond, stmt.body, stmt.step)
+        if t is AST.Block:
+            return self.statements(stmt.statements)
+        if t is AST.Print:
+            value = self.expression(stmt.expr)
+            text = FORMATS.get(self.types[stmt.expr], format_value)
+            program = self
+
+            def print_value(frame):
+                program.write(text(value(frame)) + '\n')
+            return print_value
+        if t is AST.Read:
+            return self.read(stmt.target)
+        if t is AST.FuncCall or t is AST.Identifier:
+            value = self.expression(stmt)
+
+            def discard(frame):
+                value(frame)
+            return discard
+        raise ExecutionError(f'Cannot compile {t.__name__}')
+
+    def store(self, slot, value):
+        if slot >= 0:
+            def store_local(frame):
+                frame[slot] = value(frame)
+            return store_local
+        slot = ~slot
+        globals_ = self.globals
+
+        def store_global(frame):
+            globals_[slot] = value(frame)
+        return store_global
+
+    def assign(self, stmt):
+        target = stmt.target
+        slot = self.slots[target]
+        expr = stmt.expr
+        if (slot >= 0 and type(expr) is AST.BinOp and expr.oper in ('+', '-') and self.local(expr.left) == slot
+                and type(expr.right) is AST.Constant and self.types[expr] in semantic.INTEGER_TYPES):
+            step = expr.right.value if expr.oper == '+' else -expr.right.value
+
+            def increment(frame):
+                frame[slot] += step
+            return increment
+        return self.store(slot, self.store_value(target.symbol_ref['entry']['type'], expr))
+
+    def read(self, target):
+        slot = self.slots[target]
+        type_name = target.symbol_ref['entry']['type']
+        program = self
+        value = lambda frame: parse_input(program.input.next_word(), type_name)
+        return self.store(slot, value)
+
+    def if_else(self, stmt):
+        cond = self.expression(stmt.cond)
+        then = self.statements(stmt.then_branch.statements)
+        if stmt.else_branch is None:
+            def if_then(frame):
+                if cond(frame):
+                    return then(frame)
+            return if_then
+        otherwise = self.statements(stmt.else_branch.statements)
+
+        def if_then_else(frame):
+            if cond(frame):
+                return then(frame)
+            return otherwise(frame)
+        return if_then_else
+
+    def loop(self, stmt, init, cond, body, step):
+        init = None if init is None else self.statement(init)
+        cond = (lambda frame: True) if cond is None else self.expression(cond)
+        step = None if step is None else self.statement(step)
+        returns = self.can_return(stmt)
+        body = self.statements(body.statements)
+        if step is not None:
+            body = (run_statements if returns else run_plain)([body, step])
+        if returns:
+            def loop(frame):
+                while cond(frame):
+                    result = body(frame)
+                    if result is not None:
+                        return result
+        else:
+            def loop(frame):
+                while cond(frame):
+                    body(frame)
+        if init is None:
+            return loop
+        return run_statements([init, loop]) if returns else run_plain([init, loop])
+
+    # expressions
+
+    def local(self, expr):
+        """The frame slot of a local variable reference, else None."""
+        if type(expr) is AST.Identifier and self.slots[expr] >= 0:
+            return self.slots[expr]
+        return None
+
+    def store_value(self, type_name, expr):
+        """The closure for `expr`, converted for a variable (or result) of
+        `type_name`."""
+        if expr is None:
+            value = zero(type_name)
+            return lambda frame: value
+        if type_name in FLOATING_NAMES:
+            return self.as_float(expr)
+        return self.expression(expr)
+
+    def as_float(self, expr):
+        if type(expr) is AST.Constant:
+            value = float(expr.value)
+            return lambda frame: value
+        value = self.expression(expr)
+        if self.types[expr] in semantic.INTEGER_TYPES:
+            return lambda frame: float(value(frame))
+        return value
+
+    def expression(self, expr):
+        t = type(expr)
+        if t is AST.Constant:
+            value = expr.value
+            return lambda frame: value
+        if t is AST.Identifier:
+            slot = self.slots[expr]
+            if slot >= 0:
+                return lambda frame: frame[slot]
+            slot = ~slot
+            globals_ = self.globals
+            return lambda frame: globals_[slot]
+        if t is AST.BinOp:
+            return self.binop(expr)
+        if t is AST.UnOp:
+            inner = self.expression(expr.inner_exp)
+            if expr.oper == '!':
+                return lambda frame: not inner(frame)
+            if expr.oper == '~':
+                return lambda frame: ~inner(frame)
+            return lambda frame: -inner(frame)
+        if t is AST.FuncCall:
+            return self.call(expr)
+        raise ExecutionError(f'Cannot compile {t.__name__}')
+
+    def call(self, expr):
+        functions = self.functions
+        name = expr.name
+        params = expr.symbol_ref['entry']['additional']['params']
+        args = [self.store_value(typ, arg) for (typ, _), arg in zip(params, expr.args)]
+        # functions are looked up at run time: the callee may not be
+        # compiled yet. Arguments go in a list, not through f(*args),
+        # which CPython runs on the C stack, so deep recursion would
+        # crash the process.
+        if not args:
+            return lambda frame: functions[name]()
+        if len(args) == 1:
+            arg, = args
+            return lambda frame: functions[name]([arg(frame)])
+        if len(args) == 2:
+            first, second = args
+            return lambda frame: functions[name]([first(frame), second(frame)])
+        return lambda frame: functions[name]([arg(frame) for arg in args])
+
+    def binop(self, expr):
+        op = expr.oper
+        left, right = expr.left, expr.right
+        if op == '&&':
+            left, right = self.expression(left), self.expression(right)
+            return lambda frame: bool(left(frame)) and bool(right(frame))
+        if op == '||':
+            left, right = self.expression(left), self.expression(right)
+            return lambda frame: bool(left(frame)) or bool(right(frame))
+        if op in COMPARISONS:
+            return self.apply(COMPARISONS[op], left, right, False)
+        if self.types[expr] in semantic.FLOATING_TYPES:
+            return self.apply(FLOAT_OPS[op], left, right, True)
+        return self.apply(INT_OPS[op], left, right, False)
+
+    def apply(self, fn, left, right, floating):
+        """`fn` over two operands (as floats if `floating`), specialised
+        for local variables and constants so that they cost no call."""
+        operand = self.as_float if floating else self.expression
+        if type(right) is AST.Constant:
+            value = float(right.value) if floating else right.value
+            slot = self.operand_slot(left, floating)
+            if slot is not None:
+                return lambda frame: fn(frame[slot], value)
+            left = operand(left)
+            return lambda frame: fn(left(frame), value)
+        slot = self.operand_slot(left, floating)
+        other = self.operand_slot(right, floating)
+        if slot is not None and other is not None:
+            return lambda frame: fn(frame[slot], frame[other])
+        if slot is not None:
+            right = operand(right)
+            return lambda frame: fn(frame[slot], right(frame))
+        left, right = operand(left), operand(right)
+        return lambda frame: fn(left(frame), right(frame))
+
+    def operand_slot(self, expr, floating):
+        """The slot of a local that can be used as it is, else None."""
+        if floating and self.types[expr] not in semantic.FLOATING_TYPES:
+            return None
+        return self.local(expr)
+
+
+def compile_program(program, analyzer):
+    """Compile an analyzed program to closures."""
+    return CompiledProgram(program, analyzer)
+
+
+def run(program, analyzer, stdin=None, stdout=None):
+    """Compile and execute an analyzed program; returns main's result."""
+    return compile_program(program, analyzer).run(stdin, stdout)
@@ -0,0 +1,697 @@
+"""x86-64 code generator for analyzed MiniC programs.
+
+generate() writes a program as GNU assembler source (AT&T syntax) for the
+System V AMD64 ABI; build() assembles and links it with gcc into a native
+executable, whose exit status is main's return value.
+
+  - Frames: the analyzer gives a function's parameters and locals
+    consecutive 4-byte addresses; here each gets an 8-byte slot, the one
+    at (addr - first address) / 4 living at -8 * (slot + 1)(%rbp).
+    interpreter.Layout does that arithmetic.
+  - Globals live in .data as g_<name> and are initialized, in order, by
+    the C main() before it calls the MiniC main, named f_main like every
+    MiniC function f_<name>.
+  - Values: integers and bools are 64-bit, in %rax; float and double are
+    both doubles (as in the other engines), in %xmm0.
+  - Calls: integer arguments in %rdi, %rsi, %rdx, %rcx, %r8, %r9, floating
+    ones in %xmm0-%xmm7, the rest on the stack.
+  - print() uses printf with the formats of the other engines, read()
+    uses scanf. Division by zero and bad input print a run-time error on
+    stderr and exit with status 4, as main.py --run does.
+
+Unlike the Python engines, integers wrap at 64 bits and read() takes what
+scanf accepts (a number may be followed by other text)."""
+
+import os
+import shutil
+import struct
+import subprocess
+
+import ASTNodes as AST
+import semantic
+from interpreter import Layout
+
+FLOATING_NAMES = ('float', 'double')
+INT_REGISTERS = ('%rdi', '%rsi', '%rdx', '%rcx', '%r8', '%r9')
+FLOAT_REGISTERS = tuple(f'%xmm{i}' for i in range(8))
+
+ARITHMETIC = {'+': 'add', '-': 'sub', '*': 'imul'}
+FLOAT_ARITHMETIC = {'+': 'addsd', '-': 'subsd', '*': 'mulsd', '/': 'divsd'}
+# condition codes after `cmp right, left`
+INT_CONDITIONS = {'==': 'e', '!=': 'ne', '<': 'l', '>': 'g', '<=': 'le', '>=': 'ge'}
+NEGATED = {'e': 'ne', 'ne': 'e', 'l': 'ge', 'ge': 'l', 'g': 'le', 'le': 'g'}
+
+# Formats, messages and the helpers for read() and run-time errors. Every
+# helper is entered with the stack aligned, as the ABI requires.
+RUNTIME = r'''	.section .rodata
+.Lformat_int:
+	.string "%ld\n"
+.Lformat_float:
+	.string "%g\n"
+.Ltrue:
+	.string "true\n"
+.Lfalse:
+	.string "false\n"
+.Lscan_int:
+	.string " %ld"
+.Lscan_float:
+	.string " %lf"
+.Lscan_word:
+	.string " %63s"
+.Lword_true:
+	.string "true"
+.Lword_false:
+	.string "false"
+.Lerror_format:
+	.string "Runtime ERROR: %s\n"
+.Ldivision_by_zero:
+	.string "Division by zero"
+.Lend_of_input:
+	.string "read(): end of input"
+.Lexpected_int:
+	.string "read(): expected int"
+.Lexpected_float:
+	.string "read(): expected float"
+.Lexpected_bool:
+	.string "read(): expected bool"
+
+	.text
+# minic_error(message): report a run-time error and exit with status 4
+minic_error:
+	push %rbp
+	mov %rsp, %rbp
+	and $-16, %rsp
+	mov %rdi, %rdx
+	lea .Lerror_format(%rip), %rsi
+	mov $2, %edi
+	xor %eax, %eax
+	call dprintf@PLT
+	mov $4, %edi
+	call exit@PLT
+
+minic_division_by_zero:
+	lea .Ldivision_by_zero(%rip), %rdi
+	jmp minic_error
+
+minic_read_int:
+	push %rbp
+	mov %rsp, %rbp
+	sub $16, %rsp
+	lea -8(%rbp), %rsi
+	lea .Lscan_int(%rip), %rdi
+	xor %eax, %eax
+	call scanf@PLT
+	cmp $1, %eax
+	je 1f
+	lea .Lend_of_input(%rip), %rdi
+	cmp $-1, %eax
+	je 2f
+	lea .Lexpected_int(%rip), %rdi
+2:	call minic_error
+1:	mov -8(%rbp), %rax
+	leave
+	ret
+
+minic_read_float:
+	push %rbp
+	mov %rsp, %rbp
+	sub $16, %rsp
+	lea -8(%rbp), %rsi
+	lea .Lscan_float(%rip), %rdi
+	xor %eax, %eax
+	call scanf@PLT
+	cmp $1, %eax
+	je 1f
+	lea .Lend_of_input(%rip), %rdi
+	cmp $-1, %eax
+	je 2f
+	lea .Lexpected_float(%rip), %rdi
+2:	call minic_error
+1:	movsd -8(%rbp), %xmm0
+	leave
+	ret
+
+# true, false, or an integer (non-zero is true)
+minic_read_bool:
+	push %rbp
+	mov %rsp, %rbp
+	sub $80, %rsp
+	lea -64(%rbp), %rsi
+	lea .Lscan_word(%rip), %rdi
+	xor %eax, %eax
+	call scanf@PLT
+	cmp $1, %eax
+	je 1f
+	lea .Lend_of_input(%rip), %rdi
+	call minic_error
+1:	lea -64(%rbp), %rdi
+	lea .Lword_true(%rip), %rsi
+	call strcmp@PLT
+	test %eax, %eax
+	jnz 2f
+	mov $1, %eax
+	leave
+	ret
+2:	lea -64(%rbp), %rdi
+	lea .Lword_false(%rip), %rsi
+	call strcmp@PLT
+	test %eax, %eax
+	jnz 3f
+	xor %eax, %eax
+	leave
+	ret
+3:	lea -64(%rbp), %rdi
+	lea -72(%rbp), %rsi
+	mov $10, %edx
+	call strtol@PLT
+	lea -64(%rbp), %rcx
+	cmp %rcx, -72(%rbp)
+	je 4f
+	mov -72(%rbp), %rcx
+	cmpb $0, (%rcx)
+	jne 4f
+	test %rax, %rax
+	setne %al
+	movzbq %al, %rax
+	leave
+	ret
+4:	lea .Lexpected_bool(%rip), %rdi
+	call minic_error
+'''
+
+
+class CodegenError(Exception):
+    """The program cannot be compiled to native code."""
+
+
+def fits_imm32(value):
+    return -2 ** 31 <= value < 2 ** 31
+
+
+class Generator:
+    def __init__(self, program, analyzer):
+        if analyzer.errors:
+            raise CodegenError('Cannot compile a program with semantic errors')
+        self.program = program
+        self.types = analyzer.expr_types
+        self.layout = Layout(program, analyzer)
+        self.slots = self.layout.slots
+        self.lines = []
+        self.labels = 0
+        # double constants: bit pattern -> label
+        self.doubles = {}
+        # 8-byte values pushed in the current function, for call alignment
+        self.pushed = 0
+
+    def generate(self):
+        if 'main' not in self.layout.functions:
+            raise CodegenError("No main() function")
+        items = self.program.getFunction()
+        globals_ = [item for item in items if type(item) is AST.VarDecl]
+        self.emit('.text')
+        for item in items:
+            if type(item) is AST.Function:
+                self.function(item)
+        self.entry_point(globals_)
+        text = self.lines
+        self.lines = []
+        if globals_:
+            self.emit('.data')
+            self.emit('.balign 8')
+            for item in globals_:
+                self.label('g_' + item.name)
+                self.emit('.quad 0')
+        if self.doubles:
+            self.emit('.section .rodata')
+            self.emit('.balign 8')
+            for bits, label in self.doubles.items():
+                self.label(label)
+                self.emit(f'.quad {bits}')
+        self.emit('.section .note.GNU-stack,"",@progbits')
+        return '\n'.join(text + [''] + self.lines) + '\n\n' + RUNTIME
+
+    # output
+
+    def emit(self, text):
+        self.lines.append('\t' + text)
+
+    def label(self, name):
+        self.lines.append(name + ':')
+
+    def new_label(self):
+        self.labels += 1
+        return f'.L{self.labels}'
+
+    def double(self, value):
+        bits = struct.unpack('<q', struct.pack('<d', float(value)))[0]
+        label = self.doubles.get(bits)
+        if label is None:
+            label = self.doubles[bits] = f'.LD{len(self.doubles)}'
+        return f'{label}(%rip)'
+
+    def push(self, floating):
+        if floating:
+            self.emit('movq %xmm0, %rax')
+        self.emit('push %rax')
+        self.pushed += 1
+
+    def pop(self, register):
+        # pop into an integer register or an %xmm register
+        if register.startswith('%xmm'):
+            self.emit('pop %rax')
+            self.emit(f'movq %rax, {register}')
+        else:
+            self.emit(f'pop {register}')
+        self.pushed -= 1
+
+    def call(self, symbol):
+        # the stack must be 16-byte aligned at a call
+        if self.pushed % 2:
+            self.emit('sub $8, %rsp')
+            self.emit(f'call {symbol}')
+            self.emit('add $8, %rsp')
+        else:
+            self.emit(f'call {symbol}')
+
+    # functions
+
+    def entry_point(self, globals_):
+        self.emit('.globl main')
+        self.label('main')
+        self.emit('push %rbp')
+        self.emit('mov %rsp, %rbp')
+        for item in globals_:
+            floating = item.typ in FLOATING_NAMES
+            self.converted(item.typ, item.init)
+            self.emit(f"{'movsd %xmm0' if floating else 'mov %rax'}, g_{item.name}(%rip)")
+        self.emit('call f_main')
+        if self.layout.functions['main'].getReturnType() in FLOATING_NAMES:
+            self.emit('cvttsd2si %xmm0, %rax')
+        self.emit('pop %rbp')
+        self.emit('ret')
+
+    def function(self, func):
+        self.return_type = func.getReturnType()
+        self.return_label = self.new_label()
+        size = (self.layout.frame_sizes[func] * 8 + 15) // 16 * 16
+        self.lines.append('')
+        self.label('f_' + func.getName())
+        self.emit('push %rbp')
+        self.emit('mov %rsp, %rbp')
+        if size:
+            self.emit(f'sub ${size}, %rsp')
+        ints = floats = stacked = 0
+        for slot, (typ, _) in enumerate(func.getParams()):
+            where = f'{-8 * (slot + 1)}(%rbp)'
+            if typ in FLOATING_NAMES and floats < len(FLOAT_REGISTERS):
+                self.emit(f'movsd {FLOAT_REGISTERS[floats]}, {where}')
+                floats += 1
+            elif typ not in FLOATING_NAMES and ints < len(INT_REGISTERS):
+                self.emit(f'mov {INT_REGISTERS[ints]}, {where}')
+                ints += 1
+            else:
+                self.emit(f'mov {16 + 8 * stacked}(%rbp), %rax')
+                self.emit(f'mov %rax, {where}')
+                stacked += 1
+        self.pushed = 0
+        self.statements(func.getStatement().statements)
+        # falling off the end returns zero
+        self.emit('xor %eax, %eax')
+        if self.return_type in FLOATING_NAMES:
+            self.emit('xorpd %xmm0, %xmm0')
+        self.label(self.return_label)
+        self.emit('leave')
+        self.emit('ret')
+
+    # statements
+
+    def statements(self, statements):
+        for stmt in statements:
+            self.statement(stmt)
+
+    def statement(self, stmt):
+        t = type(stmt)
+        if t is AST.VarDecl:
+            self.converted(stmt.typ, stmt.init)
+            self.store(self.location(stmt), stmt.typ in FLOATING_NAMES)
+        elif t is AST.Assign:
+            type_name = stmt.target.symbol_ref['entry']['type']
+            self.converted(type_name, stmt.expr)
+            self.store(self.location(stmt.target), type_name in FLOATING_NAMES)
+        elif t is AST.Return:
+            expr = stmt.getExpression()
+            if expr is None:
+                self.emit('xor %eax, %eax')
+            else:
+                self.converted(self.return_type, expr)
+            self.emit(f'jmp {self.return_label}')
+        elif t is AST.IfElse:
+            otherwise = self.new_label()
+            self.branch(stmt.cond, False, otherwise)
+            self.statements(stmt.then_branch.statements)
+            if stmt.else_branch is None:
+                self.label(otherwise)
+            else:
+                end = self.new_label()
+                self.emit(f'jmp {end}')
+                self.label(otherwise)
+                self.statements(stmt.else_branch.statements)
+                self.label(end)
+        elif t is AST.While:
+            self.loop(stmt.cond, stmt.body.statements)
+        elif t is AST.For:
+            if stmt.init is not None:
+                self.statement(stmt.init)
+            self.loop(stmt.cond, stmt.body.statements + ([] if stmt.step is None else [stmt.step]))
+        elif t is AST.Block:
+            self.statements(stmt.statements)
+        elif t is AST.Print:
+            self.print_value(stmt.expr)
+        elif t is AST.Read:
+            type_name = stmt.target.symbol_ref['entry']['type']
+            if type_name in FLOATING_NAMES:
+                self.call('minic_read_float')
+            else:
+                self.call('minic_read_bool' if type_name == 'bool' else 'minic_read_int')
+            self.store(self.location(stmt.target), type_name in FLOATING_NAMES)
+        elif t is AST.FuncCall or t is AST.Identifier:
+            self.expression(stmt)
+        else:
+            raise CodegenError(f'Cannot compile {t.__name__}')
+
+    def loop(self, cond, body):
+        # the test sits after the body: one branch per pass
+        top, test = self.new_label(), self.new_label()
+        self.emit(f'jmp {test}')
+        self.label(top)
+        self.statements(body)
+        self.label(test)
+        if cond is None:
+            self.emit(f'jmp {top}')
+        else:
+            self.branch(cond, True, top)
+
+    def print_value(self, expr):
+        code = self.types[expr]
+        self.expression(expr)
+        if code in semantic.FLOATING_TYPES:
+            self.emit('lea .Lformat_float(%rip), %rdi')
+            self.emit('mov $1, %eax')
+        elif code == semantic.BOOL:
+            self.emit('test %rax, %rax')
+            self.emit('lea .Ltrue(%rip), %rdi')
+            self.emit('lea .Lfalse(%rip), %rsi')
+            self.emit('cmove %rsi, %rdi')
+            self.emit('xor %eax, %eax')
+        else:
+            self.emit('mov %rax, %rsi')
+            self.emit('lea .Lformat_int(%rip), %rdi')
+            self.emit('xor %eax, %eax')
+        self.call('printf@PLT')
+
+    # values
+
+    def floating(self, expr):
+        return self.types[expr] in semantic.FLOATING_TYPES
+
+    def location(self, node):
+        slot = self.slots[node]
+        if slot < 0:
+            return f'g_{node.name}(%rip)'
+        return f'{-8 * (slot + 1)}(%rbp)'
+
+    def store(self, where, floating):
+        self.emit(f"{'movsd %xmm0' if floating else 'mov %rax'}, {where}")
+
+    def converted(self, type_name, expr):
+        """Evaluate `expr` for a variable (or result) of `type_name`."""
+        if type_name in FLOATING_NAMES:
+            if expr is None:
+                self.emit('xorpd %xmm0, %xmm0')
+            else:
+                self.as_double(expr)
+        elif expr is None:
+            self.emit('xor %eax, %eax')
+        else:
+            self.expression(expr)
+
+    def as_double(self, expr):
+        """Evaluate `expr` into %xmm0, converting an integer."""
+        if type(expr) is AST.Constant:
+            self.emit(f'movsd {self.double(expr.value)}, %xmm0')
+            return
+        self.expression(expr)
+        if not self.floating(expr):
+            self.emit('cvtsi2sd %rax, %xmm0')
+
+    def int_operand(self, expr):
+        """An operand naming `expr` directly, if it is simple, else None."""
+        if type(expr) is AST.Constant and fits_imm32(int(expr.value)):
+            return f'${int(expr.value)}'
+        if type(expr) is AST.Identifier and not self.floating(expr):
+            return self.location(expr)
+        return None
+
+    def double_operand(self, expr):
+        if type(expr) is AST.Constant:
+            return self.double(expr.value)
+        if type(expr) is AST.Identifier and self.floating(expr):
+            return self.location(expr)
+        return None
+
+    def int_operands(self, left, right):
+        """Left into %rax; returns an operand for the right one."""
+        self.expression(left)
+        operand = self.int_operand(right)
+        if operand is None:
+            self.push(False)
+            self.expression(right)
+            self.emit('mov %rax, %rcx')
+            self.pop('%rax')
+            operand = '%rcx'
+        return operand
+
+    def double_operands(self, left, right):
+        """Left into %xmm0 as a double; returns an operand for the right one."""
+        self.as_double(left)
+        operand = self.double_operand(right)
+        if operand is None:
+            self.push(True)
+            self.as_double(right)
+            self.emit('movapd %xmm0, %xmm1')
+            self.pop('%xmm0')
+            operand = '%xmm1'
+        return operand
+
+    def expression(self, expr):
+        """Evaluate `expr` into %rax, or %xmm0 if it is floating."""
+        t = type(expr)
+        if t is AST.Constant:
+            if self.floating(expr):
+                self.emit(f'movsd {self.double(expr.value)}, %xmm0')
+            elif int(expr.value) == 0:
+                self.emit('xor %eax, %eax')
+            elif fits_imm32(int(expr.value)):
+                self.emit(f'mov ${int(expr.value)}, %rax')
+            else:
+                self.emit(f'movabs ${int(expr.value)}, %rax')
+        elif t is AST.Identifier:
+            if self.floating(expr):
+                self.emit(f'movsd {self.location(expr)}, %xmm0')
+            else:
+                self.emit(f'mov {self.location(expr)}, %rax')
+        elif t is AST.UnOp:
+            self.expression(expr.inner_exp)
+            if expr.oper == '!':
+                self.truth(expr.inner_exp)
+                self.emit('xor $1, %rax')
+            elif expr.oper == '~':
+                self.emit('not %rax')
+            elif self.floating(expr):
+                # flip the sign bit, so that -0.0 comes out as in C
+                self.emit('movq %xmm0, %rax')
+                self.emit('btc $63, %rax')
+                self.emit('movq %rax, %xmm0')
+            else:
+                self.emit('neg %rax')
+        elif t is AST.BinOp:
+            self.binop(expr)
+        elif t is AST.FuncCall:
+            self.function_call(expr)
+        else:
+            raise CodegenError(f'Cannot compile {t.__name__}')
+
+    def truth(self, expr):
+        """Turn the value of `expr`, just evaluated, into 0 or 1 in %rax."""
+        if self.floating(expr):
+            self.emit('xorpd %xmm1, %xmm1')
+            self.emit('ucomisd %xmm1, %xmm0')
+            # non-zero, or NaN
+            self.emit('setne %al')
+            self.emit('setp %cl')
+            self.emit('or %cl, %al')
+            self.emit('movzbq %al, %rax')
+        elif self.types[expr] != semantic.BOOL:
+            self.emit('test %rax, %rax')
+            self.emit('setne %al')
+            self.emit('movzbq %al, %rax')
+
+    def binop(self, expr):
+        op = expr.oper
+        left, right = expr.left, expr.right
+        if op in ('&&', '||'):
+            false, end = self.new_label(), self.new_label()
+            self.branch(expr, False, false)
+            self.emit('mov $1, %eax')
+            self.emit(f'jmp {end}')
+            self.label(false)
+            self.emit('xor %eax, %eax')
+            self.label(end)
+        elif op in INT_CONDITIONS:
+            self.compare(left, right, op)
+        elif self.floating(expr):
+            operand = self.double_operands(left, right)
+            if op in ('/', '%'):
+                if operand != '%xmm1':
+                    self.emit(f'movsd {operand}, %xmm1')
+                ok = self.new_label()
+                self.emit('xorpd %xmm2, %xmm2')
+                self.emit('ucomisd %xmm2, %xmm1')
+                self.emit(f'jp {ok}')
+                self.emit('je minic_division_by_zero')
+                self.label(ok)
+                operand = '%xmm1'
+            if op == '%':
+                self.call('fmod@PLT')
+            else:
+                self.emit(f'{FLOAT_ARITHMETIC[op]} {operand}, %xmm0')
+        else:
+            operand = self.int_operands(left, right)
+            if op == '%':
+                if operand != '%rcx':
+                    self.emit(f'mov {operand}, %rcx')
+                self.emit('test %rcx, %rcx')
+                self.emit('je minic_division_by_zero')
+                # idiv leaves C's remainder, with the sign of the dividend
+                self.emit('cqo')
+                self.emit('idiv %rcx')
+                self.emit('mov %rdx, %rax')
+            else:
+                self.emit(f'{ARITHMETIC[op]} {operand}, %rax')
+
+    def compare(self, left, right, op):
+        """Evaluate a comparison into %rax (0 or 1)."""
+        if self.floating(left) or self.floating(right):
+            self.compare_doubles(left, right)
+            if op in ('==', '!='):
+                self.emit('ucomisd %xmm1, %xmm0')
+            if op == '==':
+                self.emit('sete %al')
+                self.emit('setnp %cl')
+                self.emit('and %cl, %al')
+            elif op == '!=':
+                self.emit('setne %al')
+                self.emit('setp %cl')
+                self.emit('or %cl, %al')
+            else:
+                self.emit(f'set{self.double_condition(op)} %al')
+        else:
+            operand = self.int_operands(left, right)
+            self.emit(f'cmp {operand}, %rax')
+            self.emit(f'set{INT_CONDITIONS[op]} %al')
+        self.emit('movzbq %al, %rax')
+
+    def compare_doubles(self, left, right):
+        operand = self.double_operands(left, right)
+        if operand != '%xmm1':
+            self.emit(f'movsd {operand}, %xmm1')
+
+    def double_condition(self, op):
+        """Emit the ucomisd for <, >, <= or >= between %xmm0 (left) and
+        %xmm1 (right); returns the condition code that holds. `above` is
+        false for NaN, so only those are used."""
+        if op in ('>', '>='):
+            self.emit('ucomisd %xmm1, %xmm0')
+            return 'a' if op == '>' else 'ae'
+        self.emit('ucomisd %xmm0, %xmm1')
+        return 'a' if op == '<' else 'ae'
+
+    def branch(self, cond, when, target):
+        """Jump to `target` if the truth of `cond` is `when`."""
+        t = type(cond)
+        if t is AST.UnOp and cond.oper == '!':
+            self.branch(cond.inner_exp, not when, target)
+            return
+        if t is AST.BinOp:
+            op = cond.oper
+            if op in ('&&', '||'):
+                if (op == '&&') != when:
+                    # either operand alone can decide it
+                    self.branch(cond.left, when, target)
+                    self.branch(cond.right, when, target)
+                else:
+                    skip = self.new_label()
+                    self.branch(cond.left, not when, skip)
+                    self.branch(cond.right, when, target)
+                    self.label(skip)
+                return
+            if op in INT_CONDITIONS and not (self.floating(cond.left) or self.floating(cond.right)):
+                operand = self.int_operands(cond.left, cond.right)
+                self.emit(f'cmp {operand}, %rax')
+                code = INT_CONDITIONS[op]
+                self.emit(f'j{code if when else NEGATED[code]} {target}')
+                return
+        self.expression(cond)
+        self.truth(cond)
+        self.emit('test %rax, %rax')
+        self.emit(f"{'jnz' if when else 'jz'} {target}")
+
+    def function_call(self, expr):
+        params = expr.symbol_ref['entry']['additional']['params']
+        floating = [typ in FLOATING_NAMES for typ, _ in params]
+        # evaluate every argument onto the stack, left to right
+        for (typ, _), arg in zip(params, expr.args):
+            self.converted(typ, arg)
+            self.push(typ in FLOATING_NAMES)
+        count = len(expr.args)
+        ints = floats = 0
+        stacked = []
+        for i in range(count):
+            where = f'{8 * (count - 1 - i)}(%rsp)'
+            if floating[i] and floats < len(FLOAT_REGISTERS):
+                self.emit(f'movsd {where}, {FLOAT_REGISTERS[floats]}')
+                floats += 1
+            elif not floating[i] and ints < len(INT_REGISTERS):
+                self.emit(f'mov {where}, {INT_REGISTERS[ints]}')
+                ints += 1
+            else:
+                stacked.append(i)
+        # the rest go on the stack, the first one lowest, and the stack
+        # is aligned at the call
+        pad = (self.pushed + len(stacked)) % 2
+        if pad:
+            self.emit('sub $8, %rsp')
+        for n, i in enumerate(reversed(stacked)):
+            self.emit(f'pushq {8 * (count - 1 - i + pad + n)}(%rsp)')
+        self.emit(f'call f_{expr.name}')
+        dropped = count + pad + len(stacked)
+        if dropped:
+            self.emit(f'add ${8 * dropped}, %rsp')
+        self.pushed -= count
+
+
+def generate(program, analyzer):
+    """x86-64 assembly for an analyzed program."""
+    return Generator(program, analyzer).generate()
+
+
+def build(assembly, executable, compiler=None):
+    """Assemble and link `assembly` into `executable` with gcc."""
+    compiler = compiler or os.environ.get('CC') or shutil.which('gcc') or 'cc'
+    source = executable + '.s'
+    with open(source, 'w') as f:
+        f.write(assembly)
+    proc = subprocess.run([compiler, '-o', executable, source, '-lm'], capture_output=True, text=True)
+    if proc.returncode:
+        raise CodegenError(f'{compiler} failed:\n{proc.stderr}')
+    return executable
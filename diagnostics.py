@@ -0,0 +1,18 @@
+class Diagnostic():
+	'''
+	One compiler error: the message, the source line it was reported on and,
+	for syntax errors, the offending token (None at end of input).
+	'''
+
+	def __init__(self, message, line=None, token=None):
+		self.message = message
+		self.line = line
+		self.token = token
+
+	def __str__(self):
+		if self.line is None:
+			return self.message
+		return f"line {self.line}: {self.message}"
+
+	def __repr__(self):
+		return f"Diagnostic({self.message!r}, line={self.line!r}, token={self.token!r})"
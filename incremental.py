@@ -0,0 +1,196 @@
+"""Incremental front end: a CompileSession remembers the last compile and only
+re-parses and re-analyzes the top-level items that changed since."""
+
+import hashlib
+
+import ASTNodes as AST
+import lexer
+import lookaheadparser
+import semantic
+from diagnostics import Diagnostic
+
+LBRACE = lexer.KIND_CODES['lbrace']
+RBRACE = lexer.KIND_CODES['rbrace']
+SEMICOLON = lexer.KIND_CODES['semicolon']
+
+
+def split_top_level(tokens):
+    """Yield (start, end) token ranges of the top-level items in `tokens`: each
+    ends at a ';' or '}' outside any braces. A trailing unterminated range is
+    yielded as well."""
+    depth = 0
+    start = 0
+    for i, code in enumerate(tokens.kinds):
+        if code == LBRACE:
+            depth += 1
+        elif code == RBRACE:
+            depth -= 1
+            if depth <= 0:
+                depth = 0
+                yield start, i + 1
+                start = i + 1
+        elif code == SEMICOLON and depth == 0:
+            yield start, i + 1
+            start = i + 1
+    if start < len(tokens):
+        yield start, len(tokens)
+
+
+def shift_lines(nodes, delta):
+    for node in nodes:
+        for child in semantic.walk_nodes(node):
+            if child.line is not None:
+                child.line += delta
+
+
+def signature(entry):
+    # what a function body relies on when it uses a global name
+    if entry is None:
+        return None
+    additional = entry['additional']
+    if entry['type'] == 'function':
+        return ('function', additional['returns'], tuple(typ for typ, _ in additional['params']))
+    return (entry['type'],)
+
+
+class CachedItem:
+    """One top-level source chunk: its parse and, for a function, its last analysis."""
+
+    __slots__ = ('nodes', 'line', 'analysis')
+
+    def __init__(self, nodes, line):
+        self.nodes = nodes
+        self.line = line
+        self.analysis = None
+
+
+class FunctionAnalysis:
+    """What analyze_function produced for one function, and what it depended on."""
+
+    __slots__ = ('base', 'declarations', 'scopes', 'entries', 'expr_types', 'errors', 'dependencies')
+
+    def __init__(self, base, declarations, scopes, entries, expr_types, errors, dependencies):
+        self.base = base
+        self.declarations = declarations
+        self.scopes = scopes
+        # every entry declared, including any no longer in scopes
+        self.entries = entries
+        self.expr_types = expr_types
+        self.errors = errors
+        # global name -> signature() at the time of the analysis
+        self.dependencies = dependencies
+
+
+class CompileSession:
+    """Front end that reuses work between compiles of successive versions of
+    one source. Every top-level item is fingerprinted by a hash of its source
+    text. Unchanged items keep their parse tree. Unchanged functions also keep
+    their symbol tables and diagnostics, provided every global they use still
+    has the same signature. Line numbers and addresses of reused items are
+    shifted to their new positions, and global symbol entries are updated in
+    place, so symbol refs in reused trees stay valid.
+
+    Reused trees are shared with earlier results, which see these updates too."""
+
+    def __init__(self):
+        # (fingerprint, occurrence) -> CachedItem
+        self.cache = {}
+        self.global_symbols = {}
+        self.parsed = 0
+        self.analyzed = 0
+
+    def parse(self, tokens):
+        """Return (program, errors) for a lexer.TokenArray lexed from a string."""
+        cache = {}
+        items = []
+        errors = []
+        for start, end in split_top_level(tokens):
+            digest = hashlib.blake2b(tokens.source[tokens.starts[start]:tokens.ends[end - 1]].encode(),
+                                     digest_size=16).digest()
+            key = (digest, 0)
+            while key in cache:
+                key = (digest, key[1] + 1)
+            line = tokens.line(start)
+            cached = self.cache.get(key)
+            if cached is None:
+                program, chunk_errors = lookaheadparser.parse_with_diagnostics(tokens[start:end])
+                errors.extend(chunk_errors)
+                cached = CachedItem(program.getFunction(), line)
+                self.parsed += 1
+            elif cached.line != line:
+                shift_lines(cached.nodes, line - cached.line)
+                if cached.analysis is not None:
+                    delta = line - cached.line
+                    cached.analysis.errors = [Diagnostic(e.message, None if e.line is None else e.line + delta,
+                                                         e.token)
+                                              for e in cached.analysis.errors]
+                cached.line = line
+            cache[key] = cached
+            items.extend(cached.nodes)
+        if errors:
+            # report syntax errors exactly as a whole-file parse would
+            self.cache = {}
+            return lookaheadparser.parse_with_diagnostics(tokens)
+        self.cache = cache
+        return AST.Program(items), []
+
+    def analyze(self, program):
+        """Check `program` (from self.parse) and return (analyzer, errors),
+        reusing the analysis of every function that is still valid. Prints
+        nothing; reporting is left to the caller."""
+        analyzer = semantic.SemanticAnalyzer(collect_errors=True)
+        analyzer.previous_globals = self.global_symbols
+        items = program.getFunction()
+        analyzer.declare_globals(items)
+        cached_by_node = {}
+        for cached in self.cache.values():
+            for node in cached.nodes:
+                cached_by_node[id(node)] = cached
+        for item in items:
+            if not isinstance(item, AST.Function):
+                continue
+            cached = cached_by_node.get(id(item))
+            if cached is not None and len(cached.nodes) != 1:
+                cached = None
+            analysis = cached.analysis if cached is not None else None
+            if analysis is not None and self.still_valid(analysis, analyzer):
+                self.reuse(analysis, item, analyzer)
+            else:
+                analysis = self.run(item, analyzer)
+                if cached is not None:
+                    cached.analysis = analysis
+        self.global_symbols = analyzer.global_symbols
+        return analyzer, analyzer.errors
+
+    def still_valid(self, analysis, analyzer):
+        for name, sig in analysis.dependencies.items():
+            if signature(analyzer.global_symbols.get(name)) != sig:
+                return False
+        return True
+
+    def reuse(self, analysis, func, analyzer):
+        base = analyzer._next_addr
+        if base != analysis.base:
+            delta = base - analysis.base
+            for entry in analysis.entries:
+                entry['addr'] = hex(int(entry['addr'], 16) + delta)
+            analysis.base = base
+        analyzer._next_addr += 4 * analysis.declarations
+        analyzer.function_symbols[func.getName()] = analysis.scopes
+        analyzer.expr_types.update(analysis.expr_types)
+        analyzer.errors.extend(analysis.errors)
+
+    def run(self, func, analyzer):
+        base = analyzer._next_addr
+        first_error = len(analyzer.errors)
+        analyzer.global_uses = set()
+        analyzer.declared = entries = []
+        analyzer.analyze_function(func)
+        uses = analyzer.global_uses
+        analyzer.global_uses = analyzer.declared = None
+        self.analyzed += 1
+        expr_types = {node: analyzer.expr_types[node]
+                      for node in semantic.walk_nodes(func) if node in analyzer.expr_types}
+        dependencies = {name: signature(analyzer.global_symbols.get(name)) for name in uses}
+        return FunctionAnalysis(base, (analyzer._next_addr - base) // 4, analyzer.function_symbols[func.getName()],
+                                entries, expr_types, analyzer.errors[first_error:], dependencies)
@@ -0,0 +1,375 @@
+"""Tree-walking interpreter for analyzed MiniC programs.
+
+Variables live in indexed slots, never in name-keyed scopes. A function's
+parameters and locals get consecutive addresses from the semantic analyzer
+(see semantic.count_declarations), so a local's slot in its frame is
+(addr - first address of the function) // 4. A global's slot in the globals
+list is counted from the first global address in the same way. Before
+running, one pass over the program records the slot of every identifier and
+declaration in a node-keyed table, much as the analyzer keeps expr_types.
+
+Run-time semantics, shared by every execution engine:
+  - '/' always divides as floating point, as the type rules say; '%' on
+    integers takes the sign of the dividend, as in C
+  - print() writes integers in decimal, floating values as printf's %g and
+    booleans as true/false, each on its own line
+  - read() takes the next whitespace-separated word from the input
+  - variables start out as zero; integers do not wrap
+  - at most MAX_CALL_DEPTH calls, main's included, may be active at once;
+    one more is a 'Call stack overflow'
+  - the program's result is main's return value"""
+
+import math
+import operator
+import sys
+
+import ASTNodes as AST
+import semantic
+
+FLOATING_NAMES = ('float', 'double')
+
+MAX_CALL_DEPTH = 100_000
+# Python frames to allow for engines that recurse on the Python stack: a
+# MiniC call takes several, more when it sits in nested statements
+PYTHON_RECURSION_LIMIT = MAX_CALL_DEPTH * 20
+
+
+class ExecutionError(Exception):
+    """A run-time error in the interpreted program."""
+
+
+def zero(type_name):
+    if type_name in FLOATING_NAMES:
+        return 0.0
+    if type_name == 'bool':
+        return False
+    return 0
+
+
+def format_value(value):
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, float):
+        return '%g' % value
+    return str(value)
+
+
+def parse_input(word, type_name):
+    try:
+        if type_name in FLOATING_NAMES:
+            return float(word)
+        if type_name == 'bool':
+            if word in ('true', 'false'):
+                return word == 'true'
+            return int(word) != 0
+        return int(word)
+    except ValueError:
+        raise ExecutionError(f"read(): expected {type_name}, got {word!r}") from None
+
+
+def divide(left, right):
+    if right == 0:
+        raise ExecutionError('Division by zero')
+    return left / right
+
+
+def remainder(left, right):
+    if right == 0:
+        raise ExecutionError('Division by zero')
+    if isinstance(left, float) or isinstance(right, float):
+        return math.fmod(left, right)
+    # C truncates the quotient toward zero
+    result = abs(left) % abs(right)
+    return -result if left < 0 else result
+
+
+# typed variants, for engines that know the operand types ahead of time
+def int_remainder(left, right):
+    if right == 0:
+        raise ExecutionError('Division by zero')
+    # C's remainder takes the sign of the dividend
+    return left % right if (left < 0) == (right < 0) else -(-left % right)
+
+
+def float_remainder(left, right):
+    if right == 0:
+        raise ExecutionError('Division by zero')
+    return math.fmod(left, right)
+
+
+def float_divide(left, right):
+    if right == 0:
+        raise ExecutionError('Division by zero')
+    return left / right
+
+
+BINARY = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul, '/': divide, '%': remainder,
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt, '>': operator.gt,
+    '<=': operator.le, '>=': operator.ge,
+}
+
+UNARY = {
+    '-': operator.neg,
+    '!': operator.not_,
+    '~': operator.invert,
+}
+
+
+class InputReader:
+    """Hands out whitespace-separated words from a text stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.words = []
+
+    def next_word(self):
+        while not self.words:
+            line = self.stream.readline()
+            if not line:
+                raise ExecutionError('read(): end of input')
+            self.words = line.split()[::-1]
+        return self.words.pop()
+
+
+class Layout:
+    """Where one program's variables live: a slot per identifier and declaration."""
+
+    def __init__(self, program, analyzer):
+        global_entries = [entry for entry in analyzer.global_symbols.values()]
+        self.global_base = min((int(entry['addr'], 16) for entry in global_entries), default=0)
+        self.global_count = len(global_entries)
+        # node -> slot: frame index if >= 0, else ~index into the globals
+        self.slots = {}
+        # Function -> number of frame slots
+        self.frame_sizes = {}
+        self.functions = {}
+        for item in program.getFunction():
+            if type(item) is AST.Function:
+                self.functions[item.getName()] = item
+                self.add_function(item, analyzer.function_symbols.get(item.getName(), []))
+            elif type(item) is AST.VarDecl:
+                self.slots[item] = ~self.global_slot(analyzer.global_symbols[item.name])
+                self.add_uses(item.init, 0)
+
+    def global_slot(self, entry):
+        return (int(entry['addr'], 16) - self.global_base) >> 2
+
+    def add_function(self, func, scopes):
+        addrs = [int(entry['addr'], 16) for scope in scopes for entry in scope['symbols'].values()]
+        base = min(addrs, default=0)
+        self.frame_sizes[func] = semantic.count_declarations(func)
+        # declarations take slots in the order the analyzer gave them addresses
+        declared = len(func.getParams())
+        stack = [func.getStatement()]
+        while stack:
+            node = stack.pop()
+            t = type(node)
+            if t is AST.VarDecl:
+                self.slots[node] = declared
+                declared += 1
+                self.add_uses(node.init, base)
+            elif t is AST.Block:
+                stack.extend(reversed(node.statements))
+            elif t is AST.IfElse:
+                stack.append(node.else_branch)
+                stack.append(node.then_branch)
+                self.add_uses(node.cond, base)
+            elif t is AST.While:
+                stack.append(node.body)
+                self.add_uses(node.cond, base)
+            elif t is AST.For:
+                stack.append(node.body)
+                stack.append(node.step)
+                self.add_uses(node.cond, base)
+                stack.append(node.init)
+            elif node is not None:
+                self.add_uses(node, base)
+
+    def add_uses(self, node, base):
+        if node is None:
+            return
+        for child in semantic.walk_nodes(node):
+            if type(child) is AST.Identifier:
+                entry = child.symbol_ref['entry']
+                if entry['additional'].get('kind') == 'global':
+                    self.slots[child] = ~self.global_slot(entry)
+                else:
+                    self.slots[child] = (int(entry['addr'], 16) - base) >> 2
+
+
+class Interpreter:
+    def __init__(self, program, analyzer, stdin=None, stdout=None):
+        if analyzer.errors:
+            raise ExecutionError('Cannot run a program with semantic errors')
+        self.program = program
+        self.layout = Layout(program, analyzer)
+        self.slots = self.layout.slots
+        self.symbols = analyzer.global_symbols
+        self.input = InputReader(stdin or sys.stdin)
+        self.stdout = stdout or sys.stdout
+        self.globals = [0] * self.layout.global_count
+        self.depth = 0
+        self.exec_table = {
+            AST.VarDecl: self.exec_vardecl,
+            AST.Assign: self.exec_assign,
+            AST.Return: self.exec_return,
+            AST.IfElse: self.exec_if,
+            AST.While: self.exec_while,
+            AST.For: self.exec_for,
+            AST.Block: self.exec_block,
+            AST.Print: self.exec_print,
+            AST.Read: self.exec_read,
+            AST.FuncCall: self.exec_expression,
+            AST.Identifier: self.exec_expression,
+        }
+        self.eval_table = {
+            AST.Constant: self.eval_constant,
+            AST.Identifier: self.eval_identifier,
+            AST.BinOp: self.eval_binop,
+            AST.UnOp: self.eval_unop,
+            AST.FuncCall: self.eval_call,
+        }
+
+    def run(self):
+        """Initialize the globals, call main() and return its result."""
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, PYTHON_RECURSION_LIMIT))
+        try:
+            for item in self.program.getFunction():
+                if type(item) is AST.VarDecl:
+                    value = zero(item.typ) if item.init is None else self.convert(item.typ, self.eval(item.init, None))
+                    self.globals[~self.slots[item]] = value
+            main = self.layout.functions.get('main')
+            if main is None:
+                raise ExecutionError("No main() function")
+            return self.call(main, [])
+        except RecursionError:
+            raise ExecutionError('Call stack overflow') from None
+        finally:
+            sys.setrecursionlimit(limit)
+
+    def convert(self, type_name, value):
+        # values stored into floating variables become floats; everything
+        # else is stored as it is
+        if type_name in FLOATING_NAMES:
+            return float(value)
+        return value
+
+    def call(self, func, args):
+        if self.depth >= MAX_CALL_DEPTH:
+            raise ExecutionError('Call stack overflow')
+        frame = [0] * self.layout.frame_sizes[func]
+        for slot, ((typ, _), value) in enumerate(zip(func.getParams(), args)):
+            frame[slot] = self.convert(typ, value)
+        # an error ends the run, so only returning calls need to unwind
+        self.depth += 1
+        result = self.exec_statements(func.getStatement().statements, frame)
+        self.depth -= 1
+        if result is None:
+            return zero(func.getReturnType())
+        return self.convert(func.getReturnType(), result[0])
+
+    # statements return None, or a 1-tuple holding the value of a return
+
+    def exec_statements(self, statements, frame):
+        table = self.exec_table
+        for stmt in statements:
+            result = table[type(stmt)](stmt, frame)
+            if result is not None:
+                return result
+        return None
+
+    def exec_block(self, block, frame):
+        return self.exec_statements(block.statements, frame)
+
+    def store(self, slot, frame, value):
+        if slot >= 0:
+            frame[slot] = value
+        else:
+            self.globals[~slot] = value
+
+    def exec_vardecl(self, stmt, frame):
+        frame[self.slots[stmt]] = zero(stmt.typ) if stmt.init is None else self.convert(stmt.typ, self.eval(stmt.init, frame))
+
+    def exec_assign(self, stmt, frame):
+        target = stmt.target
+        value = self.eval(stmt.expr, frame)
+        entry = target.symbol_ref['entry']
+        self.store(self.slots[target], frame, self.convert(entry['type'], value))
+
+    def exec_return(self, stmt, frame):
+        expr = stmt.getExpression()
+        return (None if expr is None else self.eval(expr, frame),)
+
+    def exec_if(self, stmt, frame):
+        if self.eval(stmt.cond, frame):
+            return self.exec_statements(stmt.then_branch.statements, frame)
+        if stmt.else_branch is not None:
+            return self.exec_statements(stmt.else_branch.statements, frame)
+        return None
+
+    def exec_while(self, stmt, frame):
+        body = stmt.body.statements
+        while self.eval(stmt.cond, frame):
+            result = self.exec_statements(body, frame)
+            if result is not None:
+                return result
+        return None
+
+    def exec_for(self, stmt, frame):
+        if stmt.init is not None:
+            self.exec_table[type(stmt.init)](stmt.init, frame)
+        body = stmt.body.statements
+        while stmt.cond is None or self.eval(stmt.cond, frame):
+            result = self.exec_statements(body, frame)
+            if result is not None:
+                return result
+            if stmt.step is not None:
+                self.exec_table[type(stmt.step)](stmt.step, frame)
+        return None
+
+    def exec_expression(self, stmt, frame):
+        self.eval(stmt, frame)
+
+    def exec_print(self, stmt, frame):
+        self.stdout.write(format_value(self.eval(stmt.expr, frame)) + '\n')
+
+    def exec_read(self, stmt, frame):
+        target = stmt.target
+        value = parse_input(self.input.next_word(), target.symbol_ref['entry']['type'])
+        self.store(self.slots[target], frame, value)
+
+    def eval(self, expr, frame):
+        return self.eval_table[type(expr)](expr, frame)
+
+    def eval_constant(self, expr, frame):
+        return expr.value
+
+    def eval_identifier(self, expr, frame):
+        slot = self.slots[expr]
+        if slot >= 0:
+            return frame[slot]
+        return self.globals[~slot]
+
+    def eval_binop(self, expr, frame):
+        op = expr.oper
+        if op == '&&':
+            return bool(self.eval(expr.left, frame)) and bool(self.eval(expr.right, frame))
+        if op == '||':
+            return bool(self.eval(expr.left, frame)) or bool(self.eval(expr.right, frame))
+        return BINARY[op](self.eval(expr.left, frame), self.eval(expr.right, frame))
+
+    def eval_unop(self, expr, frame):
+        return UNARY[expr.oper](self.eval(expr.inner_exp, frame))
+
+    def eval_call(self, expr, frame):
+        args = [self.eval(arg, frame) for arg in expr.args]
+        return self.call(self.layout.functions[expr.name], args)
+
+
+def run(program, analyzer, stdin=None, stdout=None):
+    """Execute an analyzed program and return main's result."""
+    return Interpreter(program, analyzer, stdin, stdout).run()
@@ -1,3 +1,7 @@
+import re
+import sys
+from array import array
+
 keywords = ["auto", "struct", "break", "else", "switch", "case", "enum", "register", "typedef", "extern", "return", "union", "const", "unsigned", "continue", "for", "signed", "void" , "default", "sizeof", "volatile" , "do", "if", "static", "while", "true", "false", "print", "read", "func"]
 types = ["double", "int", "long", "char", "float", "short", "bool", "void"] 
 
@@ -5,117 +9,346 @@ types = ["double", "int", "long", "char", "float", "short", "bool", "void"]
 Produces a stream of tokens.
 Current terminals: Keyword, Identifier, Open-Paren, Closed-Paren, Open-Brace, Closed-Brace, Semicolon, Integer
 '''
-lineNumber = 1
 
-def lex(source):	
-	token_list = []
-	x = 0
-	newStr = ""
-	global lineNumber
-	while x < len(source):
-		c = source[x]
+# Kinds for punctuation/operator lexemes, looked up by the exact text matched
+# by the master pattern below.
+punctuation = {
+	"==": "relop", "!=": "relop", "<=": "relop", ">=": "relop",
+	"&&": "logop", "||": "logop",
+	"=": "assign", "+": "addop", "-": "addop", "*": "mulop", "/": "divop", "%": "modop",
+	"~": "unop", "!": "unop", "<": "relop", ">": "relop",
+	"(": "lparen", ")": "rparen", "{": "lbrace", "}": "rbrace",
+	";": "semicolon", ",": "comma",
+}
 
-		# Collect identifiers, numbers, dots (for floats), and underscores
-		if c.isalpha() or c.isdigit() or c == '_' or c == '.':
-			newStr += c
-			x += 1
-			continue
+# Keywords and types are their own token kind.
+word_kinds = {word: word for word in keywords + types}
 
-		# whitespace
-		if c.isspace():
-			token_list.append(check(newStr))
-			newStr = ""
-			if c == '\n':
-				lineNumber += 1
-			x += 1
-			continue
-
-		# punctuation / operators
-		# flush any running identifier/number
-		token_list.append(check(newStr))
-		newStr = ""
-
-		nxt = source[x+1] if x+1 < len(source) else ''
-
-		# comments: skip // ... until end of line
-		if c == '/' and nxt == '/':
-			while x < len(source) and source[x] != '\n':
-				x += 1
-			continue
-
-		# two-character operators
-		if c == '=' and nxt == '=':
-			token_list.append(("relop", '==', lineNumber)); x += 2; continue
-		if c == '!' and nxt == '=':
-			token_list.append(("relop", '!=', lineNumber)); x += 2; continue
-		if c == '<' and nxt == '=':
-			token_list.append(("relop", '<=', lineNumber)); x += 2; continue
-		if c == '>' and nxt == '=':
-			token_list.append(("relop", '>=', lineNumber)); x += 2; continue
-		if c == '&' and nxt == '&':
-			token_list.append(("logop", '&&', lineNumber)); x += 2; continue
-		if c == '|' and nxt == '|':
-			token_list.append(("logop", '||', lineNumber)); x += 2; continue
-
-		# single-character tokens
-		if c == '=':
-			token_list.append(("assign", '=', lineNumber)); x += 1; continue
-		if c in '+-':
-			token_list.append(("addop", c, lineNumber)); x += 1; continue
-		if c == '*':
-			token_list.append(("mulop", c, lineNumber)); x += 1; continue
-		if c == '/':
-			token_list.append(("divop", c, lineNumber)); x += 1; continue
-		if c == '%':
-			token_list.append(("modop", c, lineNumber)); x += 1; continue
-		if c == '~' or c == '!':
-			token_list.append(("unop", c, lineNumber)); x += 1; continue
-		if c in '<>':
-			token_list.append(("relop", c, lineNumber)); x += 1; continue
-		if c == '(':
-			token_list.append(("lparen", c, lineNumber)); x += 1; continue
-		if c == ')':
-			token_list.append(("rparen", c, lineNumber)); x += 1; continue
-		if c == '{':
-			token_list.append(("lbrace", c, lineNumber)); x += 1; continue
-		if c == '}':
-			token_list.append(("rbrace", c, lineNumber)); x += 1; continue
-		if c == ';':
-			token_list.append(("semicolon", c, lineNumber)); x += 1; continue
-		if c == ',':
-			token_list.append(("comma", c, lineNumber)); x += 1; continue
-
-		# unknown/ignored characters - skip
-		x += 1
-	
-	# filter returns an iterator in Python 3 — convert to list so callers can index/slice
-	return list(filter(None, token_list))
-
-def check(newStr):
-	if newStr == '' or newStr == '\n':
-		return None
+# Every lexeme whose kind follows from its text alone.
+token_kinds = dict(punctuation, **word_kinds)
+
+# One compiled master pattern for the whole scanner.  Alternatives are tried in
+# order, so two-character operators win over their one-character prefixes.
+# Newlines are matched to count lines; other whitespace and any character
+# matched by none of them is skipped.
+token_pattern = re.compile(r"\n|//.*|[\w.]+|==|!=|<=|>=|&&|\|\||[=+\-*/%~!<>(){};,]")
+
+# One-character operators that are also the start of a longer lexeme (a
+# two-character operator or a comment).
+OPERATOR_STARTS = frozenset("=!<>/")
+
+# Characters read per call when lexing from a file object.
+CHUNK_SIZE = 64 * 1024
+
+def lex(source):
+	return list(Lexer(source).tokens())
+
+def lex_iter(source_or_file, chunk_size=CHUNK_SIZE):
+	return Lexer(source_or_file, chunk_size).tokens()
+
+def lex_compact(source_or_file):
+	return Lexer(source_or_file).token_array()
+
+class Lexer():
+	'''
+	Scanner for one source. All position state lives on the instance, so
+	separate lexers (one per compilation, or one per thread) never share line
+	numbers.
+
+	line/column/position describe the start of the token produced last
+	(1-based line and column, 0-based character offset into the source).
+	'''
+
+	def __init__(self, source_or_file, chunk_size=CHUNK_SIZE):
+		self.source = source_or_file
+		self.chunk_size = chunk_size
+		self.line = 1
+		self.position = 0
+		self.line_start = 0
+
+	@property
+	def column(self):
+		return self.position - self.line_start + 1
+
+	def __iter__(self):
+		return self.tokens()
+
+	def tokens(self):
+		'''
+		Yields tokens lazily from a string or a text-mode file object. Files
+		are read `chunk_size` characters at a time and scanned as they come,
+		so memory stays bounded by the chunk size (and the longest word), not
+		by the longest line.
+		'''
+		for kind, value, start, end in self.scan():
+			if kind == 'identifier':
+				# symbol_ref is a mutable container (dict) that the semantic analyzer will populate
+				yield (kind, value, self.line, {})
+			else:
+				yield (kind, value, self.line)
+
+	def token_array(self):
+		'''
+		Lexes the whole source into a compact TokenArray.
+		'''
+		tokens = TokenArray(self.source if isinstance(self.source, str) else None)
+		append = tokens.append
+		for kind, value, start, end in self.scan():
+			append(kind, value, start, end, self.line, self.column)
+		return tokens
+
+	def scan(self):
+		'''
+		Yields (kind, value, start, end) for each token, with start/end as
+		character offsets into the source; self.line and self.column
+		describe the token just yielded.
+
+		Each chunk is scanned in place, matches one at a time. All that is
+		carried over to the next chunk is whatever the chunk ends in the
+		middle of: a word or number, an operator that may be the first half
+		of a two-character one, or (as a flag, not text) a // comment.
+		'''
+		carry = ''
+		# source offset of text[0]
+		base = 0
+		in_comment = False
+		for chunk, is_last in source_chunks(self.source, self.chunk_size):
+			text = carry + chunk if carry else chunk
+			carry = ''
+			size = len(text)
+			begin = 0
+			if in_comment:
+				begin = text.find('\n')
+				if begin < 0:
+					base += size
+					continue
+				in_comment = False
+			cut = size
+			at_end = False
+			for m in token_pattern.finditer(text, begin):
+				token = m.group()
+				if token == '\n':
+					self.line += 1
+					self.line_start = base + m.end()
+					continue
+				text_start = m.start()
+				# a word running into the end of the input is never flushed
+				tail = False
+				if m.end() == size:
+					at_end = True
+					if not is_last:
+						if token.startswith('//'):
+							in_comment = True
+							break
+						if is_word(token) or token in OPERATOR_STARTS:
+							cut = text_start
+							break
+					elif is_word(token):
+						tail = True
+				# punctuation, keywords and types in one lookup
+				kind = token_kinds.get(token)
+				if kind is not None and not tail:
+					start = base + text_start
+					self.position = start
+					yield (kind, token, start, start + len(token))
+					continue
+				# comments: skip // ... until end of line
+				if token.startswith('//'):
+					continue
+				# identifiers and numbers
+				if token.isascii() and not tail:
+					classified = classify_literal(token)
+					if classified:
+						start = base + text_start
+						self.position = start
+						yield (classified[0], classified[1], start, start + len(token))
+					continue
+				words = split_word(token)
+				if tail:
+					words.pop()
+				for offset, word in words:
+					classified = classify(word)
+					if classified:
+						start = base + text_start + offset
+						self.position = start
+						yield (classified[0], classified[1], start, start + len(word))
+			# a lone '&' or '|' matches nothing yet, but may be half of && or ||
+			if not (at_end or is_last) and text[-1:] in ('&', '|'):
+				cut = size - 1
+			carry = text[cut:]
+			base += cut
+
+# Token kinds, interned as small integer codes for TokenArray.
+KINDS = sorted(set(punctuation.values()) | set(keywords) | set(types) | {"number", "identifier"})
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+class TokenArray():
+	'''
+	Compact token store: one parallel array per field instead of one tuple
+	per token. Kinds are stored as codes into KINDS, offsets/lines/columns as
+	machine integers, and identifier names are interned. The symbol_ref dict
+	of an identifier is only allocated when symbol_ref(i) asks for it.
 
-	# Keywords: emit the keyword itself as the token type (e.g. 'for', 'if')
-	if newStr in keywords:
-		return (newStr, newStr, lineNumber)
+	Indexing returns the usual (kind, value, line[, symbol_ref]) tuple, with
+	symbol_ref None for identifiers whose slot was never allocated.
+	'''
 
-	# Types: emit the type name as the token type (e.g. 'int', 'float')
-	if newStr in types:
-		return (newStr, newStr, lineNumber)
+	def __init__(self, source=None):
+		self.source = source
+		self.kinds = array('B')
+		self.starts = array('I')
+		self.ends = array('I')
+		self.lines = array('I')
+		self.columns = array('I')
+		self.values = []
+		self.symbol_refs = {}
+		# one shared int object per line number, so the tuples (and the AST
+		# nodes built from them) do not each box their own copy of the line
+		self.line_numbers = [0]
 
-	# numeric literal detection (integer or float) -> emit ('number', value)
-	if newStr.replace('.', '', 1).isdigit() and newStr.count('.') <= 1 and newStr != '.':
-		try:
-			if '.' in newStr:
-				return ("number", float(newStr), lineNumber)
-			return ("number", int(newStr), lineNumber)
-		except Exception:
-			return ("number", newStr, lineNumber)
+	def append(self, kind, value, start, end, line, column):
+		self.kinds.append(KIND_CODES[kind])
+		self.values.append(value)
+		self.starts.append(start)
+		self.ends.append(end)
+		self.lines.append(line)
+		self.columns.append(column)
+		if line >= len(self.line_numbers):
+			self.line_numbers.extend(range(len(self.line_numbers), line + 1))
 
+	def __len__(self):
+		return len(self.kinds)
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return [self[j] for j in range(*i.indices(len(self)))]
+		kind = KINDS[self.kinds[i]]
+		if kind == 'identifier':
+			if i < 0:
+				i += len(self)
+			return (kind, self.values[i], self.line_numbers[self.lines[i]], self.symbol_refs.get(i))
+		return (kind, self.values[i], self.line_numbers[self.lines[i]])
+
+	def __iter__(self):
+		for i in range(len(self)):
+			yield self[i]
+
+	def kind(self, i):
+		return KINDS[self.kinds[i]]
+
+	def value(self, i):
+		return self.values[i]
+
+	def line(self, i):
+		return self.line_numbers[self.lines[i]]
+
+	def column(self, i):
+		return self.columns[i]
+
+	def span(self, i):
+		return (self.starts[i], self.ends[i])
+
+	def text(self, i):
+		'''
+		The source text of token i (when lexed from a string).
+		'''
+		return self.source[self.starts[i]:self.ends[i]]
+
+	def symbol_ref(self, i):
+		'''
+		The symbol_ref dict of identifier i, allocated on first use.
+		'''
+		if i < 0:
+			i += len(self)
+		ref = self.symbol_refs.get(i)
+		if ref is None:
+			ref = self.symbol_refs[i] = {}
+		return ref
+
+def source_chunks(source_or_file, chunk_size=CHUNK_SIZE):
+	'''
+	Yields (chunk, is_last) pairs: a string as one chunk, a file
+	`chunk_size` characters at a time.
+	'''
+	if isinstance(source_or_file, str):
+		yield source_or_file, True
+		return
+	chunk = source_or_file.read(chunk_size)
+	while True:
+		following = source_or_file.read(chunk_size) if chunk else ''
+		yield chunk, not following
+		if not following:
+			return
+		chunk = following
+
+def is_word(text):
+	return text not in punctuation and not text.startswith('//')
+
+def split_word(text):
+	'''
+	The word pattern also matches numeric characters that are neither letters
+	nor digits (vulgar fractions, roman numerals); like any other unknown
+	character they are skipped and end the current word. Returns a list of
+	(offset, word) pairs.
+	'''
+	words = []
+	newStr = ""
+	start = 0
+	for i, c in enumerate(text):
+		if c.isalpha() or c.isdigit() or c == '_' or c == '.':
+			newStr += c
+		else:
+			words.append((start, newStr))
+			newStr = ""
+			start = i + 1
+	words.append((start, newStr))
+	return words
+
+def check(newStr, lineNumber=1):
+	classified = classify(newStr)
+	if classified is None:
+		return None
+	kind, value = classified
 	# identifier: emit ('identifier', name, lineNumber, symbol_ref)
-	# symbol_ref is a mutable container (dict) that the semantic analyzer will populate
-	if len(newStr) > 0 and len(newStr) < 32:
+	if kind == 'identifier':
 		symbol_ref = {}  # Mutable dict; semantic analyzer will fill in {'entry': symbol_table_entry}
-		return ("identifier", newStr, lineNumber, symbol_ref)
+		return (kind, value, lineNumber, symbol_ref)
+	return (kind, value, lineNumber)
+
+def classify(newStr):
+	'''
+	Returns (kind, value) for a word, or None if it is not a token.
+	'''
+	# Keywords and types: emit the word itself as the token type (e.g. 'for', 'int')
+	kind = word_kinds.get(newStr)
+	if kind is not None:
+		return (kind, newStr)
+	if newStr == '' or newStr == '\n':
+		return None
+	return classify_literal(newStr)
+
+def classify_literal(newStr):
+	'''
+	Classifies a non-empty word that is not a keyword or type.
+	'''
+	# numeric literal (integer or float) -> ('number', value); only words
+	# starting with a digit or '.' can be one
+	first = newStr[0]
+	if first.isdigit() or first == '.':
+		if newStr.isdigit():
+			try:
+				return ("number", int(newStr))
+			except ValueError:
+				return ("number", newStr)
+		whole, dot, frac = newStr.partition('.')
+		if dot and (whole + frac).isdigit():
+			try:
+				return ("number", float(newStr))
+			except ValueError:
+				return ("number", newStr)
+
+	# identifier names are interned so repeated uses share one string
+	if len(newStr) < 32:
+		return ("identifier", sys.intern(newStr))
 
-	return None
\ No newline at end of file
+	return None
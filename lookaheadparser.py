@@ -1,648 +1,669 @@
 import sys
 import ASTNodes as AST
 import lexer
+from diagnostics import Diagnostic
 
-token_list = []
 
-
-def parse(tokens):
-    global token_list
-    token_list = list(tokens)
-    return Program()
+# Binary operator precedence, loosest first:
+#   || → && → == != → < > <= >= → + - → * / %
+BINARY_PRECEDENCE = {
+    '||': 1,
+    '&&': 2,
+    '==': 3, '!=': 3,
+    '<': 4, '>': 4, '<=': 4, '>=': 4,
+    '+': 5, '-': 5,
+    '*': 6, '/': 6, '%': 6,
+}
+BINARY_OPERATOR_KINDS = ('logop', 'relop', 'addop', 'mulop', 'divop', 'modop')
 
 
-# --- Grammar nonterminals (recursive-descent) ---
+class ParseError(Exception):
+    """Raised by Parser.fail and caught at the nearest recovery point."""
 
+    def __init__(self, diagnostic, position):
+        super().__init__(str(diagnostic))
+        self.diagnostic = diagnostic
+        # index of the offending token; recovery resynchronizes from here
+        self.position = position
 
-def Program():
-    # Program → TopLevelList
-    top_level = TopLevelList()
-    return AST.Program(top_level)
 
-
-def TopLevelList():
-    # TopLevelList → TopLevel TopLevelList | ε
-    items = []
-    while lookahead() is not None:
-        la = lookahead()
-        # Top-level can be:
-        # - 'func' Type Identifier '(' ... ')' Block
-        # - Type Identifier ... ';' (global variable)
-        if la[0] == 'func':
-            items.append(Function())
-        elif la[0] in lexer.types:
-            # Global variable declaration
-            items.append(VarDecl())
+def parse(tokens):
+    # Reports every syntax error, then exits as the parser always has.
+    program, errors = parse_with_diagnostics(tokens)
+    if errors:
+        for err in errors:
+            print('ERROR ' + str(err))
+        sys.exit()
+    return program
+
+
+def parse_with_diagnostics(tokens):
+    # Returns the (possibly partial) AST.Program and the list of Diagnostics.
+    parser = Parser()
+    program = parser.parse(tokens)
+    return program, parser.errors
+
+
+class Parser:
+    """Recursive-descent parser. Each instance owns its token cursor and
+    error list, so separate parsers can run at the same time (e.g. on a
+    thread pool) and an instance can be reused for any number of parses.
+
+    Syntax errors do not stop the parse: the failing statement (or top-level
+    declaration) is dropped, the parser resynchronizes on the next ';' or
+    '}' (or next top-level declaration) and carries on, recording one
+    Diagnostic per error in self.errors."""
+
+    def __init__(self):
+        self.tokens = []
+        # iterator the rest of self.tokens still comes from, if any
+        self.pending = None
+        # index of the next unconsumed token in self.tokens
+        self.position = 0
+        self.errors = []
+
+    def parse(self, tokens):
+        # Sequences (lists, TokenArrays) are read in place through the cursor;
+        # anything else (lexer.lex_iter) is read only as far as the parser has
+        # looked, so parsing goes along with lexing.
+        if isinstance(tokens, (list, tuple, lexer.TokenArray)):
+            self.tokens = tokens
+            self.pending = None
         else:
-            fail(f'Expected top-level declaration (function or global variable), got: {la!r}')
-    return items
-
-
-def Function():
-    # Function → 'func' Type Identifier '(' ParamListOpt ')' Block
-    t = nextToken()
-    if t[0] != 'func':
-        fail('Expected func at start of function')
-    typ = Type()
-    idtok = nextToken()
-    if idtok[0] != 'identifier':
-        fail('Expected function name identifier')
-    t = nextToken()
-    if t[0] != 'lparen':
-        fail('Expected ( after function name')
-    params = ParamListOpt()
-    t = nextToken()
-    if t[0] != 'rparen':
-        fail('Missing ) after parameter list')
-    body = Block()
-    # Pass return type and parameters into AST.Function
-    # Note: idtok = ('identifier', name, lineNumber, symbol_ref); we ignore symbol_ref for functions
-    return AST.Function(idtok[1], typ, params, body)
-
-
-def ParamListOpt():
-    # ParamListOpt → ParamList | ε
-    la = lookahead()
-    if la is None or la[0] == 'rparen':
-        return []
-    return ParamList()
-
-
-def ParamList():
-    # ParamList → Param (',' Param)*
-    params = []
-    params.append(Param())
-    while lookahead() and lookahead()[0] == 'comma':
-        nextToken()
-        params.append(Param())
-    return params
-
-
-def Param():
-    # Param → Type Identifier
-    typ = Type()
-    idtok = nextToken()
-    if idtok[0] != 'identifier':
-        fail('Expected parameter name')
-    return (typ, idtok[1])
-
-
-def Type():
-    la = lookahead()
-    if la is None or la[0] not in lexer.types:
-        fail('Expected type')
-    return nextToken()[1]
-
-
-def Block():
-    t = nextToken()
-    if t[0] != 'lbrace':
-        fail('Expected { to start block')
-    stmts = StmtList()
-    t = nextToken()
-    if t[0] != 'rbrace':
-        fail('Expected } to close block')
-    return AST.Block(stmts)
-
-
-def StmtList():
-    # StmtList → Stmt StmtList | ε
-    stmts = []
-    while lookahead() is not None and lookahead()[0] != 'rbrace':
-        stmts.append(Stmt())
-    return stmts
-
-
-def Stmt():
-    # Stmt -> try all productions based on lookahead
-    la = lookahead()
-    if la is None:
-        fail('Unexpected EOF in statement')
-
-    # Variable declaration starts with a type
-    if la[0] in lexer.types:
-        return VarDecl()
-
-    # AssignmentStmt | FuncCallStmt | ExprStmt begin with Identifier
-    if la[0] == 'identifier':
-        idtok = nextToken()
-        la2 = lookahead()
-        # idtok[3] is symbol_ref from token
-        symbol_ref = idtok[3] if len(idtok) > 3 else None
-
-        # AssignmentStmt: Identifier '=' Expr ';'
-        if la2 and la2[0] == 'assign':
-            nextToken()
-            expr = Expr()
-            t = nextToken()
+            self.tokens = []
+            self.pending = iter(tokens)
+        self.position = 0
+        self.errors = []
+        return self.Program()
+
+    # --- Grammar nonterminals (recursive-descent) ---
+
+    def Program(self):
+        # Program → TopLevelList
+        top_level = self.TopLevelList()
+        return AST.Program(top_level)
+
+    def TopLevelList(self):
+        # TopLevelList → TopLevel TopLevelList | ε
+        items = []
+        while self.lookahead() is not None:
+            start = self.position
+            la = self.lookahead()
+            # Top-level can be:
+            # - 'func' Type Identifier '(' ... ')' Block
+            # - Type Identifier ... ';' (global variable)
+            try:
+                if la[0] == 'func':
+                    items.append(self.Function())
+                elif la[0] in lexer.types:
+                    # Global variable declaration
+                    items.append(self.VarDecl())
+                else:
+                    self.fail(f'Expected top-level declaration (function or global variable), got: {la!r}', at=self.position)
+            except ParseError as err:
+                self.recover(err, start, self.synchronize_top_level)
+        return items
+
+    def Function(self):
+        # Function → 'func' Type Identifier '(' ParamListOpt ')' Block
+        func_tok = self.nextToken()
+        if func_tok[0] != 'func':
+            self.fail('Expected func at start of function')
+        typ = self.Type()
+        idtok = self.nextToken()
+        if idtok[0] != 'identifier':
+            self.fail('Expected function name identifier')
+        t = self.nextToken()
+        if t[0] != 'lparen':
+            self.fail('Expected ( after function name')
+        params = self.ParamListOpt()
+        t = self.nextToken()
+        if t[0] != 'rparen':
+            self.fail('Missing ) after parameter list')
+        body = self.Block()
+        # Pass return type and parameters into AST.Function
+        # Note: idtok = ('identifier', name, lineNumber, symbol_ref); we ignore symbol_ref for functions
+        return AST.Function(idtok[1], typ, params, body, line=func_tok[2])
+
+    def ParamListOpt(self):
+        # ParamListOpt → ParamList | ε
+        la = self.lookahead()
+        if la is None or la[0] == 'rparen':
+            return []
+        return self.ParamList()
+
+    def ParamList(self):
+        # ParamList → Param (',' Param)*
+        params = []
+        params.append(self.Param())
+        while self.lookahead() and self.lookahead()[0] == 'comma':
+            self.nextToken()
+            params.append(self.Param())
+        return params
+
+    def Param(self):
+        # Param → Type Identifier
+        typ = self.Type()
+        idtok = self.nextToken()
+        if idtok[0] != 'identifier':
+            self.fail('Expected parameter name')
+        return (typ, idtok[1])
+
+    def Type(self):
+        la = self.lookahead()
+        if la is None or la[0] not in lexer.types:
+            self.fail('Expected type', at=self.position)
+        return self.nextToken()[1]
+
+    def Block(self):
+        lbrace = self.nextToken()
+        if lbrace[0] != 'lbrace':
+            self.fail('Expected { to start block')
+        stmts = self.StmtList()
+        t = self.nextToken()
+        if t[0] != 'rbrace':
+            self.fail('Expected } to close block')
+        return AST.Block(stmts, line=lbrace[2])
+
+    def StmtList(self):
+        # StmtList → Stmt StmtList | ε
+        stmts = []
+        while self.lookahead() is not None and self.lookahead()[0] != 'rbrace':
+            start = self.position
+            try:
+                stmts.append(self.Stmt())
+            except ParseError as err:
+                self.recover(err, start, self.synchronize_statement)
+        return stmts
+
+    def Stmt(self):
+        # Stmt -> try all productions based on lookahead
+        la = self.lookahead()
+        if la is None:
+            self.fail('Unexpected EOF in statement', at=self.position)
+
+        # Variable declaration starts with a type
+        if la[0] in lexer.types:
+            return self.VarDecl()
+
+        # AssignmentStmt | FuncCallStmt | ExprStmt begin with Identifier
+        if la[0] == 'identifier':
+            idtok = self.nextToken()
+            la2 = self.lookahead()
+            # idtok[3] is symbol_ref from token
+            symbol_ref = idtok[3] if len(idtok) > 3 else None
+
+            # AssignmentStmt: Identifier '=' Expr ';'
+            if la2 and la2[0] == 'assign':
+                self.nextToken()
+                expr = self.Expr()
+                t = self.nextToken()
+                if t[0] != 'semicolon':
+                    self.fail('Missing ; after assignment')
+                return AST.Assign(AST.Identifier(idtok[1], symbol_ref, line=idtok[2]), expr, line=idtok[2])
+
+            # FuncCallStmt: Identifier '(' ArgListOpt ')' ';'
+            if la2 and la2[0] == 'lparen':
+                self.nextToken()
+                args = self.ArgListOpt()
+                t = self.nextToken()
+                if t[0] != 'rparen':
+                    self.fail('Missing ) after function call')
+                t = self.nextToken()
+                if t[0] != 'semicolon':
+                    self.fail('Missing ; after function call')
+                return AST.FuncCall(idtok[1], args, symbol_ref, line=idtok[2])
+
+            # ExprStmt (identifier-only expression)
+            t = self.nextToken()
             if t[0] != 'semicolon':
-                fail('Missing ; after assignment')
-            return AST.Assign(AST.Identifier(idtok[1], symbol_ref), expr)
-
-        # FuncCallStmt: Identifier '(' ArgListOpt ')' ';'
-        if la2 and la2[0] == 'lparen':
-            nextToken()
-            args = ArgListOpt()
-            t = nextToken()
-            if t[0] != 'rparen':
-                fail('Missing ) after function call')
-            t = nextToken()
+                self.fail('Missing ; after expression')
+            return AST.Identifier(idtok[1], symbol_ref, line=idtok[2])
+
+        # Keywords -> delegate to the matching statement parser (keywords are token types now)
+        if la[0] == 'if':
+            return self.IfStmt()
+        if la[0] == 'while':
+            return self.WhileStmt()
+        if la[0] == 'for':
+            return self.ForStmt()
+        if la[0] == 'return':
+            return self.ReturnStmt()
+        if la[0] == 'print':
+            return self.PrintStmt()
+        if la[0] == 'read':
+            return self.ReadStmt()
+
+        # identifier-led statements: assignment, function call, or identifier expression
+
+        if la[0] == 'identifier':
+            idtok = self.nextToken()
+            la2 = self.lookahead()
+            # idtok[3] is symbol_ref from token
+            symbol_ref = idtok[3] if len(idtok) > 3 else None
+
+            # AssignmentStmt: Identifier '=' Expr ';'
+            if la2 and la2[0] == 'assign':
+                self.nextToken()
+                expr = self.Expr()
+                t = self.nextToken()
+                if t[0] != 'semicolon':
+                    self.fail('Missing ; after assignment')
+                return AST.Assign(AST.Identifier(idtok[1], symbol_ref, line=idtok[2]), expr, line=idtok[2])
+
+            # FuncCallStmt: Identifier '(' ArgListOpt ')' ';'
+            if la2 and la2[0] == 'lparen':
+                self.nextToken()
+                args = self.ArgListOpt()
+                t = self.nextToken()
+                if t[0] != 'rparen':
+                    self.fail('Missing ) after function call')
+                t = self.nextToken()
+                if t[0] != 'semicolon':
+                    self.fail('Missing ; after function call')
+                return AST.FuncCall(idtok[1], args, symbol_ref, line=idtok[2])
+
+            # ExprStmt (identifier-only expression)
+            t = self.nextToken()
             if t[0] != 'semicolon':
-                fail('Missing ; after function call')
-            return AST.FuncCall(idtok[1], args, symbol_ref)
+                self.fail('Missing ; after expression')
+            return AST.Identifier(idtok[1], symbol_ref, line=idtok[2])
 
-        # ExprStmt (identifier-only expression)
-        t = nextToken()
-        if t[0] != 'semicolon':
-            fail('Missing ; after expression')
-        return AST.Identifier(idtok[1], symbol_ref)
-
-    # Keywords -> delegate to the matching statement parser (keywords are token types now)
-    if la[0] == 'if':
-        return IfStmt()
-    if la[0] == 'while':
-        return WhileStmt()
-    if la[0] == 'for':
-        return ForStmt()
-    if la[0] == 'return':
-        return ReturnStmt()
-    if la[0] == 'print':
-        return PrintStmt()
-    if la[0] == 'read':
-        return ReadStmt()
-
-    # identifier-led statements: assignment, function call, or identifier expression
-
-    if la[0] == 'identifier':
-        idtok = nextToken()
-        la2 = lookahead()
-        # idtok[3] is symbol_ref from token
-        symbol_ref = idtok[3] if len(idtok) > 3 else None
-
-        # AssignmentStmt: Identifier '=' Expr ';'
-        if la2 and la2[0] == 'assign':
-            nextToken()
-            expr = Expr()
-            t = nextToken()
-            if t[0] != 'semicolon':
-                fail('Missing ; after assignment')
-            return AST.Assign(AST.Identifier(idtok[1], symbol_ref), expr)
-
-        # FuncCallStmt: Identifier '(' ArgListOpt ')' ';'
-        if la2 and la2[0] == 'lparen':
-            nextToken()
-            args = ArgListOpt()
-            t = nextToken()
-            if t[0] != 'rparen':
-                fail('Missing ) after function call')
-            t = nextToken()
+        # In other cases, try parsing an expression statement
+        if la[0] in ('number', 'lparen') or (la[0] in ('unop', 'addop') and la[1] in ('-', '!')) or la[0] in ('true', 'false'):
+            expr = self.Expr()
+            t = self.nextToken()
             if t[0] != 'semicolon':
-                fail('Missing ; after function call')
-            return AST.FuncCall(idtok[1], args, symbol_ref)
+                self.fail('Missing ; after expression')
+            return expr
+
+        self.fail('Unknown statement start: %r' % (la,), at=self.position)
+
+    ### Declarations & VarInit
+
+    def VarInitOpt(self):
+        if self.lookahead() and self.lookahead()[0] == 'assign':
+            self.nextToken()
+            return self.Expr()
+        return None
 
-        # ExprStmt (identifier-only expression)
-        t = nextToken()
+    def VarDecl(self):
+        # VarDecl → Type Identifier VarInitOpt ';'
+        line = self.lookahead()[2]
+        typ = self.Type()
+        idtok = self.nextToken()
+        if idtok[0] != 'identifier':
+            self.fail('Expected identifier after type')
+        init = self.VarInitOpt()
+        t = self.nextToken()
+        if t[0] != 'semicolon':
+            self.fail('Missing ; after variable declaration')
+        # Note: VarDecl stores idtok[1] (name) but ignores symbol_ref; semantic analyzer sets it
+        return AST.VarDecl(typ, idtok[1], init, line=line)
+
+    def AssignmentStmt(self):
+        # AssignmentStmt -> Identifier '=' Expr ';'
+        idtok = self.nextToken()
+        if idtok[0] != 'identifier':
+            self.fail('Expected identifier at start of assignment')
+        t = self.nextToken()
+        if t[0] != 'assign':
+            self.fail('Expected = in assignment')
+        expr = self.Expr()
+        t = self.nextToken()
+        if t[0] != 'semicolon':
+            self.fail('Missing ; after assignment')
+        return AST.Assign(AST.Identifier(idtok[1], line=idtok[2]), expr, line=idtok[2])
+
+    def FuncCallStmt(self):
+        # FuncCallStmt -> Identifier '(' ArgListOpt ')' ';'
+        idtok = self.nextToken()
+        if idtok[0] != 'identifier':
+            self.fail('Expected identifier at start of function call')
+        t = self.nextToken()
+        if t[0] != 'lparen':
+            self.fail('Expected ( after function name')
+        args = self.ArgListOpt()
+        t = self.nextToken()
+        if t[0] != 'rparen':
+            self.fail('Missing ) after function call')
+        t = self.nextToken()
         if t[0] != 'semicolon':
-            fail('Missing ; after expression')
-        return AST.Identifier(idtok[1], symbol_ref)
+            self.fail('Missing ; after function call')
+        return AST.FuncCall(idtok[1], args, line=idtok[2])
 
-    # In other cases, try parsing an expression statement
-    if la[0] in ('number', 'lparen') or (la[0] in ('unop', 'addop') and la[1] in ('-', '!')) or la[0] in ('true', 'false'):
-        expr = Expr()
-        t = nextToken()
+    def ExprStmt(self):
+        # ExprStmt -> Expr ';'
+        expr = self.Expr()
+        t = self.nextToken()
         if t[0] != 'semicolon':
-            fail('Missing ; after expression')
+            self.fail('Missing ; after expression')
         return expr
 
-    fail('Unknown statement start: %r' % (la,))
-
-
-### Declarations & VarInit
-
-
-def VarInitOpt():
-    if lookahead() and lookahead()[0] == 'assign':
-        nextToken()
-        return Expr()
-    return None
-
-
-def VarDecl():
-    # VarDecl → Type Identifier VarInitOpt ';'
-    typ = Type()
-    idtok = nextToken()
-    if idtok[0] != 'identifier':
-        fail('Expected identifier after type')
-    init = VarInitOpt()
-    t = nextToken()
-    if t[0] != 'semicolon':
-        fail('Missing ; after variable declaration')
-    # Note: VarDecl stores idtok[1] (name) but ignores symbol_ref; semantic analyzer sets it
-    return AST.VarDecl(typ, idtok[1], init)
-
-
-def AssignmentStmt():
-    # AssignmentStmt -> Identifier '=' Expr ';'
-    idtok = nextToken()
-    if idtok[0] != 'identifier':
-        fail('Expected identifier at start of assignment')
-    t = nextToken()
-    if t[0] != 'assign':
-        fail('Expected = in assignment')
-    expr = Expr()
-    t = nextToken()
-    if t[0] != 'semicolon':
-        fail('Missing ; after assignment')
-    return AST.Assign(AST.Identifier(idtok[1]), expr)
-
-
-def FuncCallStmt():
-    # FuncCallStmt -> Identifier '(' ArgListOpt ')' ';'
-    idtok = nextToken()
-    if idtok[0] != 'identifier':
-        fail('Expected identifier at start of function call')
-    t = nextToken()
-    if t[0] != 'lparen':
-        fail('Expected ( after function name')
-    args = ArgListOpt()
-    t = nextToken()
-    if t[0] != 'rparen':
-        fail('Missing ) after function call')
-    t = nextToken()
-    if t[0] != 'semicolon':
-        fail('Missing ; after function call')
-    return AST.FuncCall(idtok[1], args)
-
-
-def ExprStmt():
-    # ExprStmt -> Expr ';'
-    expr = Expr()
-    t = nextToken()
-    if t[0] != 'semicolon':
-        fail('Missing ; after expression')
-    return expr
-
-
-def IfStmt():
-    # IfStmt → if '(' Expr ')' Block ElseOpt
-    tok = nextToken()
-    if tok[0] != 'if':
-        fail('Expected if')
-    t = nextToken()
-    if t[0] != 'lparen':
-        fail('Expected ( after if')
-    cond = Expr()
-    t = nextToken()
-    if t[0] != 'rparen':
-        fail('Missing ) after if')
-    then_blk = Block()
-    else_blk = ElseOpt()
-    return AST.IfElse(cond, then_blk, else_blk)
-
-
-def WhileStmt():
-    # WhileStmt -> while '(' Expr ')' Block
-    tok = nextToken()
-    if tok[0] != 'while':
-        fail('Expected while')
-    t = nextToken()
-    if t[0] != 'lparen':
-        fail('Expected ( after while')
-    cond = Expr()
-    t = nextToken()
-    if t[0] != 'rparen':
-        fail('Missing ) after while')
-    body = Block()
-    return AST.While(cond, body)
-
-
-def ForStmt():
-    # ForStmt -> for '(' ForInit ';' ForCond ';' ForStep ')' Block
-    tok = nextToken()
-    if tok[0] != 'for':
-        fail('Expected for')
-    t = nextToken()
-    if t[0] != 'lparen':
-        fail('Expected ( after for')
-    init = ForInit()
-    t = nextToken()
-    if t[0] != 'semicolon':
-        fail('Expected ; after for init')
-    cond = ForCond()
-    t = nextToken()
-    if t[0] != 'semicolon':
-        fail('Expected ; after for condition')
-    step = ForStep()
-    t = nextToken()
-    if t[0] != 'rparen':
-        fail('Expected ) after for header')
-    body = Block()
-    return AST.For(init, cond, step, body)
-
-
-def ReturnStmt():
-    tok = nextToken()
-    if tok[0] != 'return':
-        fail('Expected return')
-    expr = Expr()
-    t = nextToken()
-    if t[0] != 'semicolon':
-        fail('Missing ; after return')
-    return AST.Return(expr)
-
-
-def PrintStmt():
-    tok = nextToken()
-    if tok[0] != 'print':
-        fail('Expected print')
-    t = nextToken()
-    if t[0] != 'lparen':
-        fail('Expected ( after print')
-    expr = Expr()
-    t = nextToken()
-    if t[0] != 'rparen':
-        fail('Missing ) after print')
-    t = nextToken()
-    if t[0] != 'semicolon':
-        fail('Missing ; after print')
-    return AST.Print(expr)
-
-
-def ReadStmt():
-    tok = nextToken()
-    if tok[0] != 'read':
-        fail('Expected read')
-    t = nextToken()
-    if t[0] != 'lparen':
-        fail('Expected ( after read')
-    idtok = nextToken()
-    if idtok[0] != 'identifier':
-        fail('Expected identifier inside read()')
-    t = nextToken()
-    if t[0] != 'rparen':
-        fail('Missing ) after read')
-    t = nextToken()
-    if t[0] != 'semicolon':
-        fail('Missing ; after read')
-    # idtok[3] is symbol_ref from token
-    return AST.Read(AST.Identifier(idtok[1], idtok[3] if len(idtok) > 3 else None))
-
-
-### For header helpers
-
-
-def VarDeclNoSemicolon():
-    # VarDeclNoSemicolon → Type Identifier VarInitOpt
-    la = lookahead()
-    if la is None or la[0] not in lexer.types:
-        return None
-    typ = Type()
-    idtok = nextToken()
-    if idtok[0] != 'identifier':
-        fail('Expected identifier in var declaration')
-    init = VarInitOpt()
-    # Note: VarDecl stores idtok[1] (name) but ignores symbol_ref
-    return AST.VarDecl(typ, idtok[1], init)
-
-
-def AssignmentExpr():
-    # AssignmentExpr → Identifier '=' Expr (no semicolon expected)
-    la = lookahead()
-    if la is None or la[0] != 'identifier':
-        return None
-    idtok = nextToken()
-    if lookahead() and lookahead()[0] == 'assign':
-        nextToken()
+    def IfStmt(self):
+        # IfStmt → if '(' Expr ')' Block ElseOpt
+        tok = self.nextToken()
+        if tok[0] != 'if':
+            self.fail('Expected if')
+        t = self.nextToken()
+        if t[0] != 'lparen':
+            self.fail('Expected ( after if')
+        cond = self.Expr()
+        t = self.nextToken()
+        if t[0] != 'rparen':
+            self.fail('Missing ) after if')
+        then_blk = self.Block()
+        else_blk = self.ElseOpt()
+        return AST.IfElse(cond, then_blk, else_blk, line=tok[2])
+
+    def WhileStmt(self):
+        # WhileStmt -> while '(' Expr ')' Block
+        tok = self.nextToken()
+        if tok[0] != 'while':
+            self.fail('Expected while')
+        t = self.nextToken()
+        if t[0] != 'lparen':
+            self.fail('Expected ( after while')
+        cond = self.Expr()
+        t = self.nextToken()
+        if t[0] != 'rparen':
+            self.fail('Missing ) after while')
+        body = self.Block()
+        return AST.While(cond, body, line=tok[2])
+
+    def ForStmt(self):
+        # ForStmt -> for '(' ForInit ';' ForCond ';' ForStep ')' Block
+        tok = self.nextToken()
+        if tok[0] != 'for':
+            self.fail('Expected for')
+        t = self.nextToken()
+        if t[0] != 'lparen':
+            self.fail('Expected ( after for')
+        init = self.ForInit()
+        t = self.nextToken()
+        if t[0] != 'semicolon':
+            self.fail('Expected ; after for init')
+        cond = self.ForCond()
+        t = self.nextToken()
+        if t[0] != 'semicolon':
+            self.fail('Expected ; after for condition')
+        step = self.ForStep()
+        t = self.nextToken()
+        if t[0] != 'rparen':
+            self.fail('Expected ) after for header')
+        body = self.Block()
+        return AST.For(init, cond, step, body, line=tok[2])
+
+    def ReturnStmt(self):
+        tok = self.nextToken()
+        if tok[0] != 'return':
+            self.fail('Expected return')
+        expr = self.Expr()
+        t = self.nextToken()
+        if t[0] != 'semicolon':
+            self.fail('Missing ; after return')
+        return AST.Return(expr, line=tok[2])
+
+    def PrintStmt(self):
+        tok = self.nextToken()
+        if tok[0] != 'print':
+            self.fail('Expected print')
+        t = self.nextToken()
+        if t[0] != 'lparen':
+            self.fail('Expected ( after print')
+        expr = self.Expr()
+        t = self.nextToken()
+        if t[0] != 'rparen':
+            self.fail('Missing ) after print')
+        t = self.nextToken()
+        if t[0] != 'semicolon':
+            self.fail('Missing ; after print')
+        return AST.Print(expr, line=tok[2])
+
+    def ReadStmt(self):
+        tok = self.nextToken()
+        if tok[0] != 'read':
+            self.fail('Expected read')
+        t = self.nextToken()
+        if t[0] != 'lparen':
+            self.fail('Expected ( after read')
+        idtok = self.nextToken()
+        if idtok[0] != 'identifier':
+            self.fail('Expected identifier inside read()')
+        t = self.nextToken()
+        if t[0] != 'rparen':
+            self.fail('Missing ) after read')
+        t = self.nextToken()
+        if t[0] != 'semicolon':
+            self.fail('Missing ; after read')
         # idtok[3] is symbol_ref from token
-        return AST.Assign(AST.Identifier(idtok[1], idtok[3] if len(idtok) > 3 else None), Expr())
-    fail('Invalid assignment expression')
-
-
-def ForInit():
-    # ForInit → VarDeclNoSemicolon | AssignmentExpr | ε
-    if lookahead() is None:
+        return AST.Read(AST.Identifier(idtok[1], idtok[3] if len(idtok) > 3 else None, line=idtok[2]), line=tok[2])
+
+    ### For header helpers
+
+    def VarDeclNoSemicolon(self):
+        # VarDeclNoSemicolon → Type Identifier VarInitOpt
+        la = self.lookahead()
+        if la is None or la[0] not in lexer.types:
+            return None
+        typ = self.Type()
+        idtok = self.nextToken()
+        if idtok[0] != 'identifier':
+            self.fail('Expected identifier in var declaration')
+        init = self.VarInitOpt()
+        # Note: VarDecl stores idtok[1] (name) but ignores symbol_ref
+        return AST.VarDecl(typ, idtok[1], init, line=la[2])
+
+    def AssignmentExpr(self):
+        # AssignmentExpr → Identifier '=' Expr (no semicolon expected)
+        la = self.lookahead()
+        if la is None or la[0] != 'identifier':
+            return None
+        idtok = self.nextToken()
+        if self.lookahead() and self.lookahead()[0] == 'assign':
+            self.nextToken()
+            # idtok[3] is symbol_ref from token
+            return AST.Assign(AST.Identifier(idtok[1], idtok[3] if len(idtok) > 3 else None, line=idtok[2]), self.Expr(), line=idtok[2])
+        self.fail('Invalid assignment expression', at=self.position)
+
+    def ForInit(self):
+        # ForInit → VarDeclNoSemicolon | AssignmentExpr | ε
+        if self.lookahead() is None:
+            return None
+        if self.lookahead()[0] in lexer.types:
+            return self.VarDeclNoSemicolon()
+        if self.lookahead()[0] == 'identifier' and self.lookahead(1) and self.lookahead(1)[0] == 'assign':
+            return self.AssignmentExpr()
         return None
-    if lookahead()[0] in lexer.types:
-        return VarDeclNoSemicolon()
-    if lookahead()[0] == 'identifier' and len(token_list) > 1 and token_list[1][0] == 'assign':
-        return AssignmentExpr()
-    return None
-
-
-def ElseOpt():
-    # ElseOpt → else Block | ε
-    la = lookahead()
-    if la and la[0] == 'else':
-        nextToken()
-        return Block()
-    return None
 
-
-def ForCond():
-    # ForCond → Expr | ε
-    if lookahead() is None or lookahead()[0] == 'semicolon':
+    def ElseOpt(self):
+        # ElseOpt → else Block | ε
+        la = self.lookahead()
+        if la and la[0] == 'else':
+            self.nextToken()
+            return self.Block()
         return None
-    return Expr()
-
 
-def ForStep():
-    # ForStep → AssignmentExpr | ε
-    if lookahead() is None:
+    def ForCond(self):
+        # ForCond → Expr | ε
+        if self.lookahead() is None or self.lookahead()[0] == 'semicolon':
+            return None
+        return self.Expr()
+
+    def ForStep(self):
+        # ForStep → AssignmentExpr | ε
+        if self.lookahead() is None:
+            return None
+        if self.lookahead()[0] == 'identifier' and self.lookahead(1) and self.lookahead(1)[0] == 'assign':
+            return self.AssignmentExpr()
         return None
-    if lookahead()[0] == 'identifier' and len(token_list) > 1 and token_list[1][0] == 'assign':
-        return AssignmentExpr()
-    return None
-
-
-### Expressions (precedence)
-
-
-def Expr():
-    # Expr -> LogicalOr
-    return LogicalOr()
-
-
-def LogicalOr():
-    # LogicalOr → LogicalAnd LogicalOrTail
-    left = LogicalAnd()
-    return LogicalOrTail(left)
-
-
-def LogicalOrTail(left):
-    # LogicalOrTail → '||' LogicalAnd LogicalOrTail | ε
-    la = lookahead()
-    if la and la[0] == 'logop' and la[1] == '||':
-        nextToken()
-        right = LogicalAnd()
-        combined = AST.BinOp(left, '||', right)
-        return LogicalOrTail(combined)
-    return left
-
-
-def LogicalAnd():
-    # LogicalAnd → Equality EqualityTail
-    left = Equality()
-    return EqualityTail(left)
 
-
-def EqualityTail(left):
-    # EqualityTail → '&&' Equality EqualityTail | ε
-    la = lookahead()
-    if la and la[0] == 'logop' and la[1] == '&&':
-        nextToken()
-        right = Equality()
-        combined = AST.BinOp(left, '&&', right)
-        return EqualityTail(combined)
-    return left
-
-
-def Equality():
-    # Equality → Relational EqualityOpTail
-    left = Relational()
-    return EqualityOpTail(left)
-
-
-def EqualityOpTail(left):
-    # EqualityOpTail → ('=='|'!=') Relational EqualityOpTail | ε
-    la = lookahead()
-    if la and la[0] == 'relop' and la[1] in ('==', '!='):
-        op = nextToken()[1]
-        right = Relational()
-        combined = AST.BinOp(left, op, right)
-        return EqualityOpTail(combined)
-    return left
-
-
-def Relational():
-    # Relational → Additive RelOpTail
-    left = Additive()
-    return RelOpTail(left)
-
-
-def RelOpTail(left):
-    # RelOpTail → RelOp Additive RelOpTail | ε
-    la = lookahead()
-    if la and la[0] == 'relop' and la[1] in ('<', '>', '<=', '>='):
-        op = nextToken()[1]
-        right = Additive()
-        combined = AST.BinOp(left, op, right)
-        return RelOpTail(combined)
-    return left
-
-
-def Additive():
-    # Additive → Multiplicative AddOpTail
-    left = Multiplicative()
-    return AddOpTail(left)
-
-
-def AddOpTail(left):
-    # AddOpTail → AddOp Multiplicative AddOpTail | ε
-    la = lookahead()
-    if la and la[0] == 'addop' and la[1] in ('+', '-'):
-        op = nextToken()[1]
-        right = Multiplicative()
-        combined = AST.BinOp(left, op, right)
-        return AddOpTail(combined)
-    return left
-
-
-def Multiplicative():
-    # Multiplicative → Unary MulOpTail
-    left = Unary()
-    return MulOpTail(left)
-
-
-def MulOpTail(left):
-    # MulOpTail → ('*'|'/'|'%') Unary MulOpTail | ε
-    la = lookahead()
-    if la and la[0] in ('mulop', 'divop', 'modop') and la[1] in ('*', '/', '%'):
-        op = nextToken()[1]
-        right = Unary()
-        combined = AST.BinOp(left, op, right)
-        return MulOpTail(combined)
-    return left
-
-
-def Unary():
-    # Unary → UnaryOp Unary | Primary
-    la = lookahead()
-    if la and la[0] in ('unop', 'addop') and la[1] in ('-', '!', '~'):
-        op = nextToken()[1]
-        rhs = Unary()
-        return AST.UnOp(op, rhs)
-    return Primary()
-
-
-def Primary():
-    # Primary → Integer | Float | Boolean | Identifier | FuncCallExpr | '(' Expr ')'
-    la = lookahead()
-    if la is None:
-        fail('Unexpected EOF in expression')
-    tok = nextToken()
-    # numbers -> ('number', value)
-    if tok[0] == 'number':
-        return AST.Constant(tok[1])
-
-    # booleans are now keyword tokens 'true'/'false'
-    if tok[0] == 'true' or tok[0] == 'false':
-        return AST.Constant(True if tok[0] == 'true' else False)
-
-    # identifier -> possible function call
-    if tok[0] == 'identifier':
-        # tok[3] is symbol_ref from token
-        symbol_ref = tok[3] if len(tok) > 3 else None
-        if lookahead() and lookahead()[0] == 'lparen':
-            nextToken()
-            args = ArgListOpt()
-            t = nextToken()
+    ### Expressions (precedence)
+
+    def Expr(self):
+        # Expr -> LogicalOr, parsed by precedence climbing over BINARY_PRECEDENCE
+        return self.BinaryExpr(1)
+
+    def BinaryExpr(self, min_prec):
+        # BinaryExpr(p) → Unary (BinOp[prec >= p] BinaryExpr(prec + 1))*
+        # Operators of one level are folded left-associatively in the loop;
+        # only a tighter-binding operator on the right recurses, so the
+        # depth is bounded by the number of levels, not the operand count.
+        left = self.Unary()
+        while True:
+            la = self.lookahead()
+            if la is None or la[0] not in BINARY_OPERATOR_KINDS:
+                return left
+            prec = BINARY_PRECEDENCE.get(la[1])
+            if prec is None or prec < min_prec:
+                return left
+            self.nextToken()
+            right = self.BinaryExpr(prec + 1)
+            left = AST.BinOp(left, la[1], right, line=la[2])
+
+    def Unary(self):
+        # Unary → UnaryOp Unary | Primary
+        # Prefix operators are collected iteratively and applied innermost first.
+        ops = []
+        la = self.lookahead()
+        while la and la[0] in ('unop', 'addop') and la[1] in ('-', '!', '~'):
+            ops.append(self.nextToken())
+            la = self.lookahead()
+        node = self.Primary()
+        for op in reversed(ops):
+            node = AST.UnOp(op[1], node, line=op[2])
+        return node
+
+    def Primary(self):
+        # Primary → Integer | Float | Boolean | Identifier | FuncCallExpr | '(' Expr ')'
+        la = self.lookahead()
+        if la is None:
+            self.fail('Unexpected EOF in expression', at=self.position)
+        tok = self.nextToken()
+        # numbers -> ('number', value)
+        if tok[0] == 'number':
+            return AST.Constant(tok[1], line=tok[2])
+
+        # booleans are now keyword tokens 'true'/'false'
+        if tok[0] == 'true' or tok[0] == 'false':
+            return AST.Constant(True if tok[0] == 'true' else False, line=tok[2])
+
+        # identifier -> possible function call
+        if tok[0] == 'identifier':
+            # tok[3] is symbol_ref from token
+            symbol_ref = tok[3] if len(tok) > 3 else None
+            if self.lookahead() and self.lookahead()[0] == 'lparen':
+                self.nextToken()
+                args = self.ArgListOpt()
+                t = self.nextToken()
+                if t[0] != 'rparen':
+                    self.fail('Missing ) after function call')
+                return AST.FuncCall(tok[1], args, symbol_ref, line=tok[2])
+            return AST.Identifier(tok[1], symbol_ref, line=tok[2])
+
+        if tok[0] == 'lparen':
+            expr = self.Expr()
+            t = self.nextToken()
             if t[0] != 'rparen':
-                fail('Missing ) after function call')
-            return AST.FuncCall(tok[1], args, symbol_ref)
-        return AST.Identifier(tok[1], symbol_ref)
-
-    if tok[0] == 'lparen':
-        expr = Expr()
-        t = nextToken()
-        if t[0] != 'rparen':
-            fail('Missing )')
-        return expr
-    fail('Unexpected token %r in primary' % (tok,))
-
-
-def ArgListOpt():
-    # ArgListOpt → ArgList | ε
-    if lookahead() and lookahead()[0] == 'rparen':
-        return []
-    return ArgList()
-
-
-def ArgList():
-    # ArgList → Expr (',' Expr)*
-    args = []
-    args.append(Expr())
-    while lookahead() and lookahead()[0] == 'comma':
-        nextToken()
-        args.append(Expr())
-    return args
-
-
-def fail(err):
-    print('ERROR ' + err)
-    sys.exit()
-
-
-def nextToken():
-    global token_list
-    if not token_list:
-        fail('Unexpected end of input (no more tokens)')
-    a = token_list[0]
-    token_list = token_list[1:]
-    return a
-
-
-def lookahead():
-    global token_list
-    if not token_list:
-        return None
-    return token_list[0]
+                self.fail('Missing )')
+            return expr
+        self.fail('Unexpected token %r in primary' % (tok,))
+
+    def ArgListOpt(self):
+        # ArgListOpt → ArgList | ε
+        if self.lookahead() and self.lookahead()[0] == 'rparen':
+            return []
+        return self.ArgList()
+
+    def ArgList(self):
+        # ArgList → Expr (',' Expr)*
+        args = []
+        args.append(self.Expr())
+        while self.lookahead() and self.lookahead()[0] == 'comma':
+            self.nextToken()
+            args.append(self.Expr())
+        return args
+
+    def fail(self, err, at=None):
+        # `at` is the index of the offending token; by default the token just
+        # consumed, which is what the `t = nextToken(); if t[0] != ...` checks
+        # reject.
+        if at is None:
+            at = self.position - 1
+        token = self.token(at) if at >= 0 else None
+        if token is not None:
+            line = token[2]
+        elif self.tokens:
+            line = self.tokens[len(self.tokens) - 1][2]
+        else:
+            line = None
+        raise ParseError(Diagnostic(err, line, token), at)
+
+    def recover(self, err, start, synchronize):
+        # Panic mode: record the error, rewind to the offending token (so a
+        # wrongly consumed ';' or '}' can still end the statement or block)
+        # and skip ahead to a synchronizing token.
+        self.errors.append(err.diagnostic)
+        self.position = max(err.position, start)
+        synchronize()
+        if self.position == start and self.lookahead() is not None:
+            # always make progress
+            self.nextToken()
+
+    def synchronize_statement(self):
+        # Skip to just after the next ';' or to (not past) the '}' closing
+        # the current block, stepping over any nested braces on the way.
+        depth = 0
+        while self.lookahead() is not None:
+            kind = self.lookahead()[0]
+            if kind == 'lbrace':
+                depth += 1
+            elif kind == 'rbrace':
+                if depth == 0:
+                    return
+                depth -= 1
+                if depth == 0:
+                    self.nextToken()
+                    return
+            elif kind == 'semicolon' and depth == 0:
+                self.nextToken()
+                return
+            self.nextToken()
+
+    def synchronize_top_level(self):
+        # Skip to the next 'func' or type keyword outside any braces.
+        depth = 0
+        while self.lookahead() is not None:
+            kind = self.lookahead()[0]
+            if depth == 0 and (kind == 'func' or kind in lexer.types):
+                return
+            if kind == 'lbrace':
+                depth += 1
+            elif kind == 'rbrace' and depth > 0:
+                depth -= 1
+            self.nextToken()
+
+    def nextToken(self):
+        if self.position >= len(self.tokens) and self.token(self.position) is None:
+            self.fail('Unexpected end of input (no more tokens)', at=self.position)
+        a = self.tokens[self.position]
+        self.position += 1
+        return a
+
+    def lookahead(self, offset=0):
+        # peek at the token `offset` places after the cursor without consuming it
+        i = self.position + offset
+        if i >= len(self.tokens):
+            return self.token(i)
+        return self.tokens[i]
+
+    def token(self, i):
+        # token i, reading it from self.pending if need be; None past the end
+        tokens = self.tokens
+        while i >= len(tokens) and self.pending is not None:
+            token = next(self.pending, None)
+            if token is None:
+                self.pending = None
+            else:
+                tokens.append(token)
+        return tokens[i] if i < len(tokens) else None
@@ -1,6 +1,9 @@
+import argparse
+import os
 import sys
-from lexer import lex
-import lookaheadparser
+from lexer import lex_compact
+from incremental import CompileSession
+from cache import CompileCache, Entry
 
 '''
 Rules For Identifiers:
@@ -13,28 +16,91 @@ Rules For Identifiers:
 
 '''
 Accepts C program from user, reads it and passes it to lexer for lexical analysis.
+With several files, a directory or --batch, compiles them all on a worker pool
+and prints one JSON line per file instead (see batch.py).
 '''
 def main():
+	parser = argparse.ArgumentParser(description="MiniC compiler front end.")
+	parser.add_argument("sources", nargs="*", metavar="source", help=".c files or directories of them")
+	parser.add_argument("--batch", action="store_true", help="print JSON lines even for a single file")
+	parser.add_argument("-j", "--jobs", type=int, help="worker processes in batch mode (default: one per CPU)")
+	parser.add_argument("--no-cache", action="store_true", help="ignore and do not update the compilation cache")
+	parser.add_argument("--run", action="store_true", help="execute the program; the exit status is main's return value")
+	parser.add_argument("--engine", choices=("vm", "closures", "python", "tree", "native"), default="vm", help="how --run executes: bytecode VM, compiled closures, translation to Python, tree-walking interpreter or x86-64 code built with gcc (default: vm)")
+	parser.add_argument("-S", "--assembly", metavar="FILE", help="write x86-64 assembly for the program to FILE")
+	parser.add_argument("--stats", action="store_true", help="with --run on the VM, report instructions executed per second on stderr")
+	parser.add_argument("--watch", action="store_true", help="compile (or run) the file again every time it changes, redoing only the edited functions")
+	args = parser.parse_args()
 	# Require a source file argument; show usage if missing
-	if len(sys.argv) < 2:
+	if not args.sources:
 		print("Usage: python main.py <source_file.c>")
 		print("Example: python main.py \"Test Programs/return_1.c\"")
 		sys.exit(2)
 
-	source_file = sys.argv[1]
+	if args.batch or len(args.sources) > 1 or os.path.isdir(args.sources[0]):
+		import batch
+		failed = batch.run(args.sources, args.jobs, use_cache=not args.no_cache)
+		sys.exit(1 if failed else 0)
+
+	global compile_cache
+	if args.no_cache:
+		compile_cache = None
+	source_file = args.sources[0]
 	if check_file(source_file):
+		if args.run:
+			action = lambda contents: run(contents, args.engine, args.stats, source_file)
+		elif args.assembly:
+			action = lambda contents: assemble(contents, args.assembly)
+		else:
+			action = compile
+		if args.watch:
+			sys.exit(watch(source_file, action))
 		with open(source_file, "r") as f:
 			contents = f.read()
-			compile(contents)
+			sys.exit(action(contents))
+
+# Remembers the previous compile, so compiling an edited version of the same
+# source again only re-parses and re-analyzes what changed.
+session = CompileSession()
+
+# Results of earlier runs, shared between processes; unchanged sources skip
+# the front end entirely. None when running with --no-cache.
+compile_cache = CompileCache()
+
+'''
+Runs the front end over the source text and returns a cache.Entry, printing nothing.
+Pass a fresh CompileSession for sources that are not versions of one another (see batch.py).
+'''
+def front_end(contents, session=session):
+	token_list = lex_compact(contents)
+	ast, errors = session.parse(token_list)
+	if errors:
+		return Entry(token_list, ast, errors)
+	try:
+		an, errors = session.analyze(ast)
+	except Exception:
+		return Entry(token_list, ast, [])
+	return Entry(token_list, ast, [], an, errors)
 
 '''
-Produces a token list by calling the lexer and uses the token list to produce an abstract syntax tree.
+Returns the cache.Entry for the source, from the cache when possible.
+'''
+def load_or_compile(contents):
+	entry = compile_cache.load(contents) if compile_cache else None
+	if entry is None:
+		entry = front_end(contents)
+		if compile_cache and entry.complete():
+			compile_cache.store(contents, entry)
+	return entry
+
+'''
+Compiles the source (or fetches the cached result) and prints the tokens, the abstract syntax tree and the symbol tables.
 '''
 def compile(contents):
-	token_list = lex(contents)
+	entry = load_or_compile(contents)
 	# Show lexer output (tokens)
 	print("--- Lexical analysis (tokens) ---")
-	for t in token_list:
+	for t in entry.tokens:
 		# Remove symbol_ref dict (4th element) from identifier tokens for cleaner output
 		if len(t) == 4 and t[0] == 'identifier':
 			print((t[0], t[1], t[2]))
@@ -44,21 +110,156 @@ def compile(contents):
 
 	# Parse and show AST
 	print("--- Syntax / AST ---")
-	ast = lookaheadparser.parse(token_list)
+	if entry.parse_errors:
+		for err in entry.parse_errors:
+			print('ERROR ' + str(err))
+		sys.exit()
 	import ast_tree_printer
-	ast_tree_printer.pretty_print_ast_tree(ast)
+	ast_tree_printer.pretty_print_ast_tree(entry.program)
 	print("--- End AST ---")
 
-	# Semantic analysis
-	import semantic
-	an = semantic.SemanticAnalyzer()
-	try:
-		an.analyze(ast)
-		# print symbol tables after successful analysis
-		an.print_symbol_tables()
-	except Exception:
+	# Semantic analysis: report every error, not just the first
+	errors = entry.semantic_errors
+	if errors is None or errors:
+		for err in errors or ():
+			print('Semantic ERROR: ' + str(err))
 		print("Semantic analysis failed")
 		sys.exit(3)
+	print('Semantic: no errors')
+	# print symbol tables after successful analysis
+	entry.analyzer().print_symbol_tables()
+
+'''
+Compiles the source and executes it on the given engine, reporting errors on stderr. Returns the exit status: main's return value.
+The python engine keeps the compiled program beside source_file and reuses it while the source is unchanged, skipping the front end.
+'''
+def run(contents, engine="vm", stats=False, source_file=None):
+	import interpreter
+	code = None
+	if engine == "python" and source_file:
+		import transpile
+		code = transpile.load(source_file, contents)
+	if code is None:
+		entry = load_or_compile(contents)
+		status = report_errors(entry)
+		if status:
+			return status
+	try:
+		if code is not None:
+			result = transpile.execute(code)
+		elif engine == "python":
+			import transpile
+			code = transpile.compile_program(entry.program, entry.analyzer(), source_file or '<minic>')
+			if source_file:
+				transpile.store(source_file, contents, code)
+			result = transpile.execute(code)
+		elif engine == "tree":
+			result = interpreter.run(entry.program, entry.analyzer())
+		elif engine == "native":
+			return run_native(entry)
+		elif engine == "closures":
+			import closures
+			result = closures.run(entry.program, entry.analyzer())
+		else:
+			import bytecode
+			vm = bytecode.VM(bytecode.compile_program(entry.program, entry.analyzer()))
+			try:
+				result = vm.run()
+			finally:
+				if stats:
+					sys.stdout.flush()
+					print("Executed %d instructions in %.3fs (%.0f instructions/s)" % (vm.executed, vm.seconds, vm.rate()), file=sys.stderr)
+	except interpreter.ExecutionError as err:
+		sys.stdout.flush()
+		print('Runtime ERROR: ' + str(err), file=sys.stderr)
+		return 4
+	return int(result) & 0xFF
+
+'''
+Reports parse or semantic errors on stderr; returns the exit status for them, or 0 if there are none.
+'''
+def report_errors(entry):
+	errors = entry.parse_errors or entry.semantic_errors
+	if errors or entry.semantic_errors is None:
+		for err in errors or ():
+			print(('ERROR ' if entry.parse_errors else 'Semantic ERROR: ') + str(err), file=sys.stderr)
+		if not entry.parse_errors:
+			print("Semantic analysis failed", file=sys.stderr)
+		return 1 if entry.parse_errors else 3
+	return 0
+
+'''
+Builds the program into a native executable with gcc and runs it on our stdin and stdout. The executable reports its own run-time errors.
+'''
+def run_native(entry):
+	import codegen
+	import subprocess
+	import tempfile
+	with tempfile.TemporaryDirectory() as directory:
+		try:
+			executable = codegen.build(codegen.generate(entry.program, entry.analyzer()), os.path.join(directory, "program"))
+		except codegen.CodegenError as err:
+			print('ERROR ' + str(err), file=sys.stderr)
+			return 4
+		sys.stdout.flush()
+		status = subprocess.run([executable]).returncode
+	if status < 0:
+		print('Runtime ERROR: killed by signal %d' % -status, file=sys.stderr)
+		return 4
+	return status
+
+'''
+Compiles the source to x86-64 assembly and writes it to output; assemble that with gcc (adding -lm) to get an executable.
+'''
+def assemble(contents, output):
+	import codegen
+	entry = load_or_compile(contents)
+	status = report_errors(entry)
+	if status:
+		return status
+	try:
+		assembly = codegen.generate(entry.program, entry.analyzer())
+	except codegen.CodegenError as err:
+		print('ERROR ' + str(err), file=sys.stderr)
+		return 4
+	with open(output, "w") as f:
+		f.write(assembly)
+	return 0
+
+'''
+Compiles the file with action (compile, run or assemble), then again every time it changes, until interrupted.
+All of these compiles go through the session, so each one re-parses and re-analyzes only the top-level items that
+were edited; how many is reported on stderr.
+'''
+def watch(source_file, action, interval=0.2):
+	import time
+	global compile_cache
+	# a whole-source cache hit would skip the session, which does the reuse here
+	compile_cache = None
+	seen = None
+	try:
+		while True:
+			try:
+				info = os.stat(source_file)
+				current = (info.st_mtime_ns, info.st_size)
+			except OSError:
+				current = seen
+			if current != seen:
+				seen = current
+				with open(source_file, "r") as f:
+					contents = f.read()
+				parsed, analyzed = session.parsed, session.analyzed
+				try:
+					status = action(contents)
+				except SystemExit as stop:
+					status = stop.code
+				sys.stdout.flush()
+				print("--- exit status %d; re-parsed %d and re-analyzed %d of %d top-level items; watching %s for changes ---"
+					% (status or 0, session.parsed - parsed, session.analyzed - analyzed, len(session.cache), source_file), file=sys.stderr)
+				sys.stderr.flush()
+			time.sleep(interval)
+	except KeyboardInterrupt:
+		return 0
 
 '''
 Checks if .c file is passed to the compiler. 
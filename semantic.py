@@ -1,56 +1,156 @@
+import contextlib
+import io
+import pickle
 import sys
+from concurrent.futures import ProcessPoolExecutor
 import ASTNodes as AST
+from diagnostics import Diagnostic
+
+# Types are small ints indexing TYPE_NAMES; the numeric ones are listed in
+# rank order, so the usual arithmetic conversion is max(left, right, INT).
+# Symbol entries keep the type name; expression types are codes.
+TYPE_NAMES = ['error', 'bool', 'char', 'short', 'int', 'long', 'float', 'double', 'void', 'function']
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+ERROR, BOOL, CHAR, SHORT, INT, LONG, FLOAT, DOUBLE, VOID, FUNCTION = range(len(TYPE_NAMES))
+INTEGER_TYPES = (CHAR, SHORT, INT, LONG)
+FLOATING_TYPES = (FLOAT, DOUBLE)
+NUMERIC_TYPES = INTEGER_TYPES + FLOATING_TYPES
+
+# type of an expression that already produced an error; it is compatible with
+# everything, so one mistake is reported once rather than at every use
+ERROR_TYPE = ERROR
+
+
+def _type_table(rule):
+    # table[a][b] = rule(a, b) for every pair of type codes
+    return [[rule(a, b) for b in range(len(TYPE_NAMES))] for a in range(len(TYPE_NAMES))]
+
+
+def _assignable(target, source):
+    # exact match; any integer to any integer (as C converts implicitly);
+    # integer or floating to a floating type of at least the same rank
+    return (target == source or ERROR in (target, source)
+            or (target in INTEGER_TYPES and source in INTEGER_TYPES)
+            or (target in FLOATING_TYPES and source in NUMERIC_TYPES and source <= target))
+
+
+def _arithmetic(op):
+    def rule(left, right):
+        if ERROR in (left, right):
+            return ERROR
+        if left not in NUMERIC_TYPES or right not in NUMERIC_TYPES:
+            return None
+        # '/' always yields a floating result
+        return max(left, right, FLOAT if op == '/' else INT)
+    return _type_table(rule)
+
+
+# ASSIGNABLE[target][source]
+ASSIGNABLE = _type_table(_assignable)
+# Python type of a Constant's value -> type code
+CONSTANT_TYPES = {bool: BOOL, int: INT, float: FLOAT}
+BOOLEAN_COMPATIBLE = [code in (ERROR, BOOL) or code in NUMERIC_TYPES for code in range(len(TYPE_NAMES))]
+# BINOP_RESULT[op][left][right]: result type, or None for invalid operands
+BINOP_RESULT = {op: _arithmetic(op) for op in ('+', '-', '*', '/', '%')}
+BINOP_RESULT.update(dict.fromkeys(('==', '!=', '<', '>', '<=', '>=', '&&', '||'), _type_table(lambda left, right: BOOL)))
+
+
+def type_name(code):
+    return TYPE_NAMES[code] if code is not None else None
 
 
 class SemanticError(Exception):
-    pass
+    """Raised by SemanticAnalyzer.error unless errors are being collected."""
+
+    def __init__(self, diagnostic):
+        super().__init__(diagnostic.message)
+        self.diagnostic = diagnostic
+
+
+def analyze_with_diagnostics(program, workers=None):
+    # Checks the whole program and returns the analyzer and every Diagnostic.
+    analyzer = SemanticAnalyzer(collect_errors=True)
+    analyzer.analyze(program, workers)
+    return analyzer, analyzer.errors
 
 
 class SemanticAnalyzer:
-    def __init__(self):
+    def __init__(self, collect_errors=False):
+        # raise on the first error, or record each one in self.errors and carry on
+        self.collect_errors = collect_errors
+        self.errors = []
         # global function table: name -> (return_type, params_list)
         self.functions = {}
-        # current scopes stack: list of dict name->type
+        # current scopes stack: list of dict name->entry; each dict doubles as
+        # the undo log of the bindings pop_scope must remove
         self.scopes = []
+        # visible local bindings: name -> stack of entries, innermost last
+        self._bindings = {}
         self.current_function = None
         # store symbol tables per function: func_name -> list of scope dicts
         # each scope dict: { 'label': str, 'symbols': { name: {type, addr, info} } }
         self.function_symbols = {}
         # temporary list to collect scopes while analyzing a function
         self._current_function_scopes = None
+        # the record in _current_function_scopes of each open scope (None
+        # outside functions), parallel to self.scopes
+        self._scope_records = []
         # global symbol table for functions and globals: name -> info
         self.global_symbols = {}
+        # global entries of an earlier analysis to update in place (see define_global)
+        self.previous_globals = {}
+        # when a set, every global name looked up is added to it
+        self.global_uses = None
+        # when a list, every local or parameter entry declared is appended to it
+        self.declared = None
         # simple address allocator (unique addresses)
         self._next_addr = 0x1000
+        # resolved type of every expression node typed so far: node -> type
+        self.expr_types = {}
 
-    def error(self, msg):
-        print('Semantic ERROR: ' + msg)
-        raise SemanticError(msg)
+    def error(self, msg, node=None):
+        self.report(Diagnostic(msg, getattr(node, 'line', None)))
+
+    def report(self, diagnostic):
+        self.errors.append(diagnostic)
+        if not self.collect_errors:
+            print('Semantic ERROR: ' + diagnostic.message)
+            raise SemanticError(diagnostic)
 
     def push_scope(self, label='block'):
         """Push a new lexical scope. Optionally provide a `label` for printing (e.g. 'params', 'for-init')."""
         self.scopes.append({})
+        record = None
         # if inside a function, track this scope for symbol-table printing
         if self.current_function is not None:
             if self._current_function_scopes is None:
                 self._current_function_scopes = []
             # record an empty scope with label
-            self._current_function_scopes.append({'label': label, 'symbols': {}})
+            record = {'label': label, 'symbols': {}}
+            self._current_function_scopes.append(record)
+        self._scope_records.append(record)
 
     def pop_scope(self):
-        self.scopes.pop()
+        for name in self.scopes.pop():
+            stack = self._bindings[name]
+            stack.pop()
+            if not stack:
+                del self._bindings[name]
+        self._scope_records.pop()
         # on pop we do not remove the recorded scope info; it's kept for printing
 
-    def declare_var(self, name, typ, kind='local', init_value=None):
+    def declare_var(self, name, typ, kind='local', init_value=None, node=None):
         """Declare a variable in the current lexical scope.
 
         kind: 'param'|'local'|'global'
         init_value: optional initializer value for additional info
+        node: the declaring AST node, for error lines
         """
         # Global variables can be declared without active scope
         if kind == 'global':
             if name in self.global_symbols:
-                self.error(f"Duplicate declaration of global variable '{name}'")
+                self.error(f"Duplicate declaration of global variable '{name}'", node)
+                return
             addr = self._alloc_addr()
             additional = {'kind': 'global'}
             if init_value is None:
@@ -58,7 +158,7 @@ class SemanticAnalyzer:
             else:
                 additional['initialized'] = True
                 additional['init_value'] = init_value
-            self.global_symbols[name] = {'type': typ, 'addr': addr, 'additional': additional}
+            self.define_global(name, {'type': typ, 'addr': addr, 'additional': additional})
             return
         
         # Local/param variables require active scope
@@ -66,8 +166,11 @@ class SemanticAnalyzer:
             self.error('No active scope to declare variable')
         scope = self.scopes[-1]
         if name in scope:
-            self.error(f"Duplicate declaration of variable '{name}' in the same scope")
-        scope[name] = typ
+            self.error(f"Duplicate declaration of variable '{name}' in the same scope", node)
+            # the first declaration stays; the address is still used up so
+            # later ones match count_declarations
+            self._alloc_addr()
+            return
         # allocate an address for this symbol
         addr = self._alloc_addr()
         additional = {}
@@ -77,189 +180,149 @@ class SemanticAnalyzer:
             additional['initialized'] = True
             additional['init_value'] = init_value
         additional['kind'] = kind
-
-        # record in the current function's symbol table if present
-        if self.current_function is not None and self._current_function_scopes is not None and len(self._current_function_scopes) > 0:
-            self._current_function_scopes[-1]['symbols'][name] = {'type': typ, 'addr': addr, 'additional': additional}
+        entry = scope[name] = {'type': typ, 'addr': addr, 'additional': additional}
+        self._bindings.setdefault(name, []).append(entry)
+        if self.declared is not None:
+            self.declared.append(entry)
+
+        # record in the current function's symbol table if present; under the
+        # scope's own record, which after a nested block has closed is no
+        # longer the last one pushed
+        record = self._scope_records[-1]
+        if record is not None:
+            record['symbols'][name] = entry
         else:
             # global scope (shouldn't reach here due to earlier return)
-            self.global_symbols[name] = {'type': typ, 'addr': addr, 'additional': additional}
+            self.global_symbols[name] = entry
 
     def lookup_var(self, name):
-        # Check local scopes first
-        for scope in reversed(self.scopes):
-            if name in scope:
-                return scope[name]
-        # Fall back to global symbols
-        if name in self.global_symbols:
-            return self.global_symbols[name]['type']
-        return None
-
-    def resolve_symbol_ref(self, name):
-        """Resolve a symbol reference and return its entry from global_symbols or None."""
-        # Check global symbols first (functions and global variables)
-        if name in self.global_symbols:
-            return self.global_symbols[name]
-        # Check all function scopes if currently analyzing a function
-        if self.current_function is not None and self.function_symbols and self.current_function.getName() in self.function_symbols:
-            func_scopes = self.function_symbols[self.current_function.getName()]
-            for scope in func_scopes:
-                if name in scope.get('symbols', {}):
-                    return scope['symbols'][name]
-        return None
-
-    def populate_symbol_refs(self, node):
-        """Recursively walk the AST and populate symbol_ref dicts in Identifier and FuncCall nodes."""
-        if node is None:
-            return
-        
-        t = type(node)
-        
-        # Identifier nodes
-        if t is AST.Identifier:
-            if hasattr(node, 'symbol_ref') and node.symbol_ref is not None:
-                entry = self.resolve_symbol_ref(node.name)
-                if entry:
-                    node.symbol_ref['entry'] = entry
-            return
-        
-        # FuncCall nodes
-        if t is AST.FuncCall:
-            if hasattr(node, 'symbol_ref') and node.symbol_ref is not None:
-                entry = self.resolve_symbol_ref(node.name)
-                if entry:
-                    node.symbol_ref['entry'] = entry
-            # recurse into args
-            for arg in node.args:
-                self.populate_symbol_refs(arg)
-            return
-        
-        # BinOp nodes
-        if t is AST.BinOp:
-            self.populate_symbol_refs(node.left)
-            self.populate_symbol_refs(node.right)
-            return
-        
-        # UnOp nodes
-        if t is AST.UnOp:
-            self.populate_symbol_refs(node.inner_exp)
-            return
-        
-        # Assign nodes
-        if t is AST.Assign:
-            self.populate_symbol_refs(node.target)
-            self.populate_symbol_refs(node.expr)
-            return
-        
-        # VarDecl nodes
-        if t is AST.VarDecl:
-            if node.init:
-                self.populate_symbol_refs(node.init)
-            return
-        
-        # Block nodes
-        if t is AST.Block:
-            for stmt in node.statements:
-                self.populate_symbol_refs(stmt)
-            return
-        
-        # IfElse nodes
-        if t is AST.IfElse:
-            self.populate_symbol_refs(node.cond)
-            self.populate_symbol_refs(node.then_branch)
-            if node.else_branch:
-                self.populate_symbol_refs(node.else_branch)
-            return
-        
-        # While nodes
-        if t is AST.While:
-            self.populate_symbol_refs(node.cond)
-            self.populate_symbol_refs(node.body)
-            return
-        
-        # For nodes
-        if t is AST.For:
-            self.populate_symbol_refs(node.init)
-            self.populate_symbol_refs(node.cond)
-            self.populate_symbol_refs(node.step)
-            self.populate_symbol_refs(node.body)
-            return
-        
-        # Return nodes
-        if t is AST.Return:
-            self.populate_symbol_refs(node.expression)
-            return
-        
-        # Print nodes
-        if t is AST.Print:
-            self.populate_symbol_refs(node.expr)
-            return
-        
-        # Read nodes
-        if t is AST.Read:
-            self.populate_symbol_refs(node.target)
-            return
-        
-        # Function nodes - set current_function for context during recursion
-        if t is AST.Function:
-            old_func = self.current_function
-            self.current_function = node
-            self.populate_symbol_refs(node.statement)
-            self.current_function = old_func
-            return
-        
-        # Program nodes
-        if t is AST.Program:
-            items = node.getFunction()  # Now mixed: functions and global VarDecl
-            if items:
-                for item in items:
-                    if isinstance(item, AST.VarDecl):
-                        # Handle global variable declaration - recurse into initializer
-                        if item.init:
-                            self.populate_symbol_refs(item.init)
-                    else:
-                        # Function - recurse normally
-                        self.populate_symbol_refs(item)
-            return
+        entry = self.lookup_symbol(name)
+        if entry is None:
+            return None
+        return entry['type']
+
+    def lookup_symbol(self, name):
+        """Return the entry `name` refers to here: innermost local first, then globals."""
+        stack = self._bindings.get(name)
+        if stack:
+            return stack[-1]
+        if self.global_uses is not None:
+            self.global_uses.add(name)
+        return self.global_symbols.get(name)
+
+    def define_global(self, name, entry):
+        """Enter a global symbol. An entry of the same name carried over in
+        previous_globals is updated in place instead, so symbol refs bound to
+        it by an earlier analysis stay valid."""
+        old = self.previous_globals.get(name)
+        if old is not None:
+            old.clear()
+            old.update(entry)
+            entry = old
+        self.global_symbols[name] = entry
+
+    def bind_symbol_ref(self, node, entry):
+        """Store the resolved entry in node.symbol_ref, allocating the dict if the
+        token never had one (compact token arrays only allocate on demand)."""
+        if node.symbol_ref is None:
+            node.symbol_ref = {}
+        node.symbol_ref['entry'] = entry
+
+    def unbind_symbol_ref(self, node):
+        """Drop a binding left by an earlier analysis of the same tree."""
+        if node.symbol_ref:
+            node.symbol_ref.pop('entry', None)
+
+    def lookup_identifier(self, node, what='variable'):
+        """Resolve an Identifier node, bind its symbol_ref and return the entry
+        (None, after reporting, if the name is undeclared)."""
+        entry = self.lookup_symbol(node.name)
+        if entry is None:
+            self.error(f"Use of undeclared {what} '{node.name}'", node)
+            self.unbind_symbol_ref(node)
+            return None
+        self.bind_symbol_ref(node, entry)
+        return entry
 
-    def add_function(self, name, return_type, params):
+    def add_function(self, name, return_type, params, node=None):
         if name in self.functions:
-            self.error(f"Duplicate function declaration '{name}'")
+            self.error(f"Duplicate function declaration '{name}'", node)
+            return
         self.functions[name] = (return_type, params)
         # also add to global symbol table as function symbol
         addr = self._alloc_addr()
-        self.global_symbols[name] = {'type': 'function', 'addr': addr, 'additional': {'returns': return_type, 'params': params}}
+        self.define_global(name, {'type': 'function', 'addr': addr, 'additional': {'returns': return_type, 'params': params}})
 
-    def analyze(self, program: AST.Program):
+    def analyze(self, program: AST.Program, workers=None):
+        """Check `program`. With `workers` > 1, function bodies are checked in
+        parallel on that many processes; the result matches a serial run."""
         items = program.getFunction()
         # Expect items to be a list (can be functions or global variable declarations)
         if items is None:
             return
 
+        self.declare_globals(items)
+
+        # Second pass: analyze each function body
+        if workers is not None and workers > 1:
+            self.analyze_functions_parallel(items, workers)
+        else:
+            for item in items:
+                if isinstance(item, AST.Function):
+                    self.analyze_function(item)
+
+        if not self.errors:
+            print('Semantic: no errors')
+
+    def declare_globals(self, items):
         # First pass: collect function signatures and declare global variables
         for item in items:
             if isinstance(item, AST.Function):
-                self.add_function(item.getName(), item.getReturnType(), item.getParams())
+                self.add_function(item.getName(), item.getReturnType(), item.getParams(), item)
             elif isinstance(item, AST.VarDecl):
                 # Global variable declaration
                 init_type = None
                 if item.init:
                     init_type = self.type_of(item.init)
-                    if not self.is_assignable(item.typ, init_type):
-                        self.error(f"Type mismatch in global variable initialization")
-                self.declare_var(item.name, item.typ, kind='global', init_value=item.init)
+                    if not self.is_assignable(TYPE_CODES[item.typ], init_type):
+                        self.error(f"Type mismatch in global variable initialization", item)
+                self.declare_var(item.name, item.typ, kind='global', init_value=item.init, node=item)
             else:
-                self.error('Unexpected top-level item')
-
-        # Second pass: analyze each function body
-        for item in items:
+                self.error('Unexpected top-level item', item)
+
+    def analyze_functions_parallel(self, items, workers):
+        """Check every function in `items` on a process pool and merge the results
+        in source order. Each function's first address is precomputed from the
+        declarations before it, so addresses match a serial run."""
+        jobs = []
+        for index, item in enumerate(items):
             if isinstance(item, AST.Function):
-                self.analyze_function(item)
-
-        # Third pass: populate symbol references in the AST
-        self.populate_symbol_refs(program)
-
-        print('Semantic: no errors')
+                jobs.append((index, self._next_addr))
+                self._next_addr += 4 * count_declarations(item)
+        if not jobs:
+            return
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(items, self.functions, self.global_symbols, self.collect_errors)) as pool:
+            for (index, _), (errors, payload) in zip(jobs, pool.map(_analyze_function_job, jobs, chunksize=chunksize)):
+                for diagnostic in errors:
+                    self.report(diagnostic)
+                if payload is not None:
+                    self.merge_function_result(items[index], payload)
+
+    def merge_function_result(self, func, payload):
+        """Apply a worker's results for `func`: its scopes, the entry bound to
+        each symbol ref and the type of each expression, the last two keyed by
+        position in walk_nodes order."""
+        unpickler = pickle.Unpickler(io.BytesIO(payload))
+        unpickler.persistent_load = self.global_symbols.__getitem__
+        scopes, refs, types = unpickler.load()
+        self.function_symbols[func.getName()] = scopes
+        nodes = list(walk_nodes(func))
+        for position, entry in refs:
+            self.bind_symbol_ref(nodes[position], entry)
+        for position, typ in types:
+            self.expr_types[nodes[position]] = typ
 
     def analyze_function(self, func: AST.Function):
         self.current_function = func
@@ -269,7 +332,7 @@ class SemanticAnalyzer:
         self.push_scope(label='function')
         # add parameters to scope (recorded in first scope)
         for (t, name) in func.getParams():
-            self.declare_var(name, t, kind='param')
+            self.declare_var(name, t, kind='param', node=func)
 
         # analyze body statements in the function entry scope so that
         # parameters and top-level declarations in the function body
@@ -346,40 +409,40 @@ class SemanticAnalyzer:
         t = type(stmt)
         if t is AST.VarDecl:
             # VarDecl(type, name, init)
-            self.declare_var(stmt.name, stmt.typ)
+            self.declare_var(stmt.name, stmt.typ, node=stmt)
             if stmt.init is not None:
                 expr_type = self.type_of(stmt.init)
-                if not self.is_assignable(stmt.typ, expr_type):
-                    self.error(f"Cannot initialize variable '{stmt.name}' of type {stmt.typ} with {expr_type}")
+                if not self.is_assignable(TYPE_CODES[stmt.typ], expr_type):
+                    self.error(f"Cannot initialize variable '{stmt.name}' of type {stmt.typ} with {type_name(expr_type)}", stmt)
         elif t is AST.Assign:
             # Assign(target Identifier, expr)
             if not isinstance(stmt.target, AST.Identifier):
-                self.error('Assignment target must be an identifier')
+                self.error('Assignment target must be an identifier', stmt)
+                return
             name = stmt.target.name
-            var_type = self.lookup_var(name)
-            if var_type is None:
-                self.error(f"Use of undeclared variable '{name}'")
+            entry = self.lookup_identifier(stmt.target)
+            var_type = ERROR_TYPE if entry is None else TYPE_CODES[entry['type']]
             expr_type = self.type_of(stmt.expr)
             if not self.is_assignable(var_type, expr_type):
-                self.error(f"Cannot assign {expr_type} to variable '{name}' of type {var_type}")
+                self.error(f"Cannot assign {type_name(expr_type)} to variable '{name}' of type {type_name(var_type)}", stmt)
         elif t is AST.Return:
             expr_type = self.type_of(stmt.getExpression())
             expected = self.current_function.getReturnType()
             if expected is None:
-                self.error('Function missing return type')
-            if not self.is_assignable(expected, expr_type):
-                self.error(f"Return type mismatch in function '{self.current_function.getName()}': expected {expected}, got {expr_type}")
+                self.error('Function missing return type', stmt)
+            elif not self.is_assignable(TYPE_CODES[expected], expr_type):
+                self.error(f"Return type mismatch in function '{self.current_function.getName()}': expected {expected}, got {type_name(expr_type)}", stmt)
         elif t is AST.IfElse:
             cond_type = self.type_of(stmt.cond)
             if not self.is_boolean_compatible(cond_type):
-                self.error('If-condition not boolean-compatible')
+                self.error('If-condition not boolean-compatible', stmt)
             self.analyze_block(stmt.then_branch)
             if stmt.else_branch:
                 self.analyze_block(stmt.else_branch)
         elif t is AST.While:
             cond_type = self.type_of(stmt.cond)
             if not self.is_boolean_compatible(cond_type):
-                self.error('While-condition not boolean-compatible')
+                self.error('While-condition not boolean-compatible', stmt)
             self.analyze_block(stmt.body)
         elif t is AST.For:
             # The for-loop header should introduce a scope that covers init, cond, step, and the loop body.
@@ -388,7 +451,7 @@ class SemanticAnalyzer:
                 self.analyze_stmt(stmt.init)
             if stmt.cond is not None:
                 if not self.is_boolean_compatible(self.type_of(stmt.cond)):
-                    self.error('For-condition not boolean-compatible')
+                    self.error('For-condition not boolean-compatible', stmt)
             if stmt.step is not None:
                 self.analyze_stmt(stmt.step)
             # analyze body statements in the same for-scope
@@ -397,116 +460,231 @@ class SemanticAnalyzer:
             self.pop_scope()
         elif t is AST.FuncCall:
             # function call statement: check call validity
-            self.check_funccall(stmt)
+            self.type_of(stmt)
         elif t is AST.Print:
             _ = self.type_of(stmt.expr)
         elif t is AST.Read:
             if not isinstance(stmt.target, AST.Identifier):
-                self.error('read() target must be identifier')
-            if self.lookup_var(stmt.target.name) is None:
-                self.error(f"Use of undeclared variable '{stmt.target.name}' in read()")
+                self.error('read() target must be identifier', stmt)
+                return
+            entry = self.lookup_symbol(stmt.target.name)
+            if entry is None:
+                self.error(f"Use of undeclared variable '{stmt.target.name}' in read()", stmt)
+                self.unbind_symbol_ref(stmt.target)
+                return
+            self.bind_symbol_ref(stmt.target, entry)
         elif t is AST.Identifier:
             # expression statement with an identifier
-            if self.lookup_var(stmt.name) is None:
-                self.error(f"Use of undeclared identifier '{stmt.name}'")
+            self.lookup_identifier(stmt, 'identifier')
         else:
             # unknown/unsupported statement type
             pass
 
     def check_funccall(self, node: AST.FuncCall):
+        """Validate a call's arguments and return the callee's return type."""
         name = node.name
+        if self.global_uses is not None:
+            self.global_uses.add(name)
         if name not in self.functions:
-            self.error(f"Call to undefined function '{name}'")
+            self.error(f"Call to undefined function '{name}'", node)
+            self.unbind_symbol_ref(node)
+            # still check the arguments for errors of their own
+            for arg in node.args:
+                self.type_of(arg)
+            return ERROR_TYPE
         ret_type, params = self.functions[name]
+        self.bind_symbol_ref(node, self.global_symbols[name])
         if len(node.args) != len(params):
-            self.error(f"Function '{name}' expects {len(params)} args, got {len(node.args)}")
+            self.error(f"Function '{name}' expects {len(params)} args, got {len(node.args)}", node)
         for i, arg in enumerate(node.args):
-            expected_type = params[i][0]
             actual_type = self.type_of(arg)
-            if not self.is_assignable(expected_type, actual_type):
-                self.error(f"Argument {i+1} of function '{name}' expects {expected_type}, got {actual_type}")
+            if i >= len(params):
+                continue
+            expected_type = params[i][0]
+            if not self.is_assignable(TYPE_CODES[expected_type], actual_type):
+                self.error(f"Argument {i+1} of function '{name}' expects {expected_type}, got {type_name(actual_type)}", arg)
+        return TYPE_CODES[ret_type]
 
     def type_of(self, expr):
-        # Return a type string like 'int', 'float', 'bool'
+        # Return a type code (INT, FLOAT, BOOL, ...); see TYPE_NAMES
         if expr is None:
             return None
-        if isinstance(expr, AST.Constant):
+        # each node is typed once; a node's scope never changes, so neither does its type
+        if expr in self.expr_types:
+            return self.expr_types[expr]
+        typ = self.compute_type(expr)
+        self.expr_types[expr] = typ
+        return typ
+
+    def compute_type(self, expr):
+        t = type(expr)
+        if t is AST.BinOp:
+            table = BINOP_RESULT.get(expr.oper)
+            left_t = self.type_of(expr.left)
+            right_t = self.type_of(expr.right)
+            if table is not None:
+                result = table[left_t][right_t]
+                if result is None:
+                    self.error(f"Operator {expr.oper} requires numeric operands", expr)
+                    return ERROR_TYPE
+                return result
+            return None
+        if t is AST.Identifier:
+            entry = self.lookup_identifier(expr)
+            if entry is None:
+                return ERROR_TYPE
+            return TYPE_CODES[entry['type']]
+        if t is AST.Constant:
             v = expr.getValue()
-            if isinstance(v, bool):
-                return 'bool'
-            if isinstance(v, float):
-                return 'float'
-            if isinstance(v, int):
-                return 'int'
+            code = CONSTANT_TYPES.get(type(v))
+            if code is not None:
+                return code
             # fallback: try to parse
             s = str(v)
             if s in ('true', 'false'):
-                return 'bool'
+                return BOOL
             if '.' in s:
-                return 'float'
-            return 'int'
-        if isinstance(expr, AST.Identifier):
-            typ = self.lookup_var(expr.name)
-            if typ is None:
-                self.error(f"Use of undeclared variable '{expr.name}'")
-            return typ
-        if isinstance(expr, AST.UnOp):
+                return FLOAT
+            return INT
+        if t is AST.UnOp:
             op = expr.getOperator()
             inner = expr.getExpression()
             t = self.type_of(inner)
+            if t == ERROR_TYPE:
+                return ERROR_TYPE
             if op == '!':
                 if not self.is_boolean_compatible(t):
-                    self.error('Operator ! requires boolean-compatible operand')
-                return 'bool'
+                    self.error('Operator ! requires boolean-compatible operand', expr)
+                return BOOL
             if op == '~':
-                if t != 'int':
-                    self.error('Operator ~ requires integer operand')
-                return 'int'
+                if t not in INTEGER_TYPES:
+                    self.error('Operator ~ requires integer operand', expr)
+                    return INT
+                return max(t, INT)
             if op == '-':
-                if t not in ('int', 'float'):
-                    self.error('Unary - requires numeric operand')
-                return t
-        if isinstance(expr, AST.BinOp):
-            left_t = self.type_of(expr.left)
-            right_t = self.type_of(expr.right)
-            op = expr.oper
-            if op in ('+', '-', '*', '/', '%'):
-                if left_t not in ('int', 'float') or right_t not in ('int', 'float'):
-                    self.error(f"Operator {op} requires numeric operands")
-                # if either float -> float, else int
-                if left_t == 'float' or right_t == 'float' or op == '/':
-                    return 'float'
-                return 'int'
-            if op in ('==', '!=', '<', '>', '<=', '>='):
-                # comparisons -> bool
-                return 'bool'
-            if op in ('&&', '||'):
-                return 'bool'
-        if isinstance(expr, AST.FuncCall):
-            name = expr.name
-            if name not in self.functions:
-                self.error(f"Call to undefined function '{name}'")
-            ret_type, params = self.functions[name]
-            # also validate args here
-            if len(expr.args) != len(params):
-                self.error(f"Function '{name}' expects {len(params)} args, got {len(expr.args)}")
-            for i, arg in enumerate(expr.args):
-                expected_type = params[i][0]
-                actual_type = self.type_of(arg)
-                if not self.is_assignable(expected_type, actual_type):
-                    self.error(f"Argument {i+1} of function '{name}' expects {expected_type}, got {actual_type}")
-            return ret_type
+                if t not in NUMERIC_TYPES:
+                    self.error('Unary - requires numeric operand', expr)
+                    return ERROR_TYPE
+                return max(t, INT)
+            return None
+        if t is AST.FuncCall:
+            return self.check_funccall(expr)
 
         # Unknown expression type: be permissive
         return None
 
     def is_assignable(self, target_type, expr_type):
-        # allow exact match; allow int -> float promotion
-        if target_type == expr_type:
-            return True
-        if target_type == 'float' and expr_type == 'int':
-            return True
-        return False
+        # codes from TYPE_CODES; see _assignable for the rules
+        if target_type is None or expr_type is None:
+            return target_type is expr_type
+        return ASSIGNABLE[target_type][expr_type]
 
     def is_boolean_compatible(self, typ):
-        return typ == 'bool' or typ in ('int', 'float')
+        return typ is not None and BOOLEAN_COMPATIBLE[typ]
+
+
+def count_declarations(func):
+    """Number of addresses analyze_function allocates for `func`: its parameters
+    plus every local declaration in its body."""
+    count = len(func.getParams())
+    stack = [func.getStatement()]
+    while stack:
+        node = stack.pop()
+        t = type(node)
+        if t is AST.VarDecl:
+            count += 1
+        elif t is AST.Block:
+            stack.extend(node.statements)
+        elif t is AST.IfElse:
+            stack.append(node.then_branch)
+            stack.append(node.else_branch)
+        elif t is AST.While:
+            stack.append(node.body)
+        elif t is AST.For:
+            stack.append(node.init)
+            stack.append(node.body)
+    return count
+
+
+# slots of each node class that can hold child nodes, in reverse field order
+_CHILD_SLOTS = {
+    AST.Program: ('function_declaration',),
+    AST.Function: ('statement',),
+    AST.Block: ('statements',),
+    AST.VarDecl: ('init',),
+    AST.Assign: ('expr', 'target'),
+    AST.IfElse: ('else_branch', 'then_branch', 'cond'),
+    AST.While: ('body', 'cond'),
+    AST.For: ('body', 'step', 'cond', 'init'),
+    AST.Return: ('expression',),
+    AST.Print: ('expr',),
+    AST.Read: ('target',),
+    AST.BinOp: ('right', 'left'),
+    AST.UnOp: ('inner_exp',),
+    AST.FuncCall: ('args',),
+    AST.Identifier: (),
+    AST.Constant: (),
+}
+
+
+def walk_nodes(node):
+    """Yield every AST node under `node` (inclusive) in a fixed preorder."""
+    stack = [node]
+    pop = stack.pop
+    while stack:
+        node = pop()
+        if node is None:
+            continue
+        if type(node) is list:
+            stack.extend(reversed(node))
+            continue
+        yield node
+        for name in _CHILD_SLOTS[type(node)]:
+            stack.append(getattr(node, name))
+
+
+# worker-side state for analyze_functions_parallel, set once per process
+_worker_items = None
+_worker_functions = None
+_worker_globals = None
+_worker_global_names = None
+_worker_collect_errors = False
+
+
+def _init_worker(items, functions, global_symbols, collect_errors):
+    global _worker_items, _worker_functions, _worker_globals, _worker_global_names, _worker_collect_errors
+    _worker_items = items
+    _worker_functions = functions
+    _worker_globals = global_symbols
+    _worker_collect_errors = collect_errors
+    _worker_global_names = {id(entry): name for name, entry in global_symbols.items()}
+
+
+def _analyze_function_job(job):
+    """Check one function in a worker. Returns (diagnostics, payload); the
+    payload is what merge_function_result expects, or None if the check
+    stopped at an error. Global entries are pickled by name so the parent can
+    point them back at its own entries."""
+    index, base = job
+    func = _worker_items[index]
+    analyzer = SemanticAnalyzer(_worker_collect_errors)
+    analyzer.functions = _worker_functions
+    analyzer.global_symbols = _worker_globals
+    analyzer._next_addr = base
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyzer.analyze_function(func)
+    except SemanticError:
+        return analyzer.errors, None
+    refs = []
+    types = []
+    for position, node in enumerate(walk_nodes(func)):
+        if type(node) in (AST.Identifier, AST.FuncCall) and node.symbol_ref and 'entry' in node.symbol_ref:
+            refs.append((position, node.symbol_ref['entry']))
+        if node in analyzer.expr_types:
+            types.append((position, analyzer.expr_types[node]))
+    buffer = io.BytesIO()
+    pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = lambda obj: _worker_global_names.get(id(obj))
+    pickler.dump((analyzer.function_symbols[func.getName()], refs, types))
+    return analyzer.errors, buffer.getvalue()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Checks for ast_binary."""
+
+import glob
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import ASTNodes as AST
+import ast_binary
+import lexer
+import lookaheadparser
+import semantic
+
+PROGRAMS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'Test Programs', '*.c')))
+
+SOURCE = """int g = 4000000000;
+func float scale(float x, int n) {
+    bool flag = true;
+    float r = x * 0.1 + n;
+    if (!flag) { print(-r); } else { read(n); }
+    for (int i = 0; i < n; i = i + 1) { r = r + scale(r, i - 1); }
+    return r;
+}
+func int main() { return 0; }
+"""
+
+
+def parse(source):
+    return lookaheadparser.parse(lexer.lex_compact(source))
+
+
+def shape(program):
+    return [(type(node).__name__, node.line) for node in semantic.walk_nodes(program)]
+
+
+def test_round_trip():
+    for path in PROGRAMS:
+        with open(path) as f:
+            program = parse(f.read())
+        loaded = ast_binary.BinaryAST(ast_binary.encode(program)).program()
+        assert repr(loaded) == repr(program), path
+        assert shape(loaded) == shape(program), path
+
+
+def test_constants_and_params_keep_their_types():
+    program = ast_binary.BinaryAST(ast_binary.encode(parse(SOURCE))).program()
+    glob_decl, scale, _ = program.getFunction()
+    assert glob_decl.init.value == 4000000000
+    assert scale.getParams() == [('float', 'x'), ('int', 'n')]
+    flag, r = scale.getStatement().statements[:2]
+    assert flag.init.value is True
+    assert r.init.left.right.value == 0.1
+    assert not hasattr(r.init.left.left, '__dict__')
+    assert r.init.left.left.symbol_ref is None
+
+
+def test_nodes_are_built_lazily_and_once():
+    tree = ast_binary.BinaryAST(ast_binary.encode(parse(SOURCE)))
+    items = tree.items()
+    assert [tree.kind(i) for i in items] == [AST.VarDecl, AST.Function, AST.Function]
+    assert tree.line(items[2]) == 9
+    main = tree.node(items[2])
+    assert len(tree._nodes) == len(list(semantic.walk_nodes(main)))
+    scale = tree.node(items[1])
+    program = tree.program()
+    assert program.getFunction()[1] is scale and program.getFunction()[2] is main
+    assert len(tree._nodes) == len(tree)
+    # a loaded tree can be analyzed like a parsed one
+    analyzer, errors = semantic.analyze_with_diagnostics(program)
+    assert errors == []
+
+
+def test_deep_expressions_round_trip():
+    source = 'func int main() { return ' + ' + '.join(['x'] * 50_000) + '; }'
+    program = parse(source)
+    loaded = ast_binary.BinaryAST(ast_binary.encode(program)).program()
+    node = loaded.getFunction()[0].getStatement().statements[0].getExpression()
+    depth = 0
+    while isinstance(node, AST.BinOp):
+        node, depth = node.left, depth + 1
+    assert depth == 49_999
+
+
+def test_rejects_other_formats():
+    data = ast_binary.encode(parse(SOURCE))
+    for bad, message in [(b'XXXX' + data[4:], 'bad magic'),
+                         (data[:4] + (2).to_bytes(4, 'little') + data[8:], 'version 2'),
+                         (data[:-10], 'truncated')]:
+        try:
+            ast_binary.BinaryAST(bad)
+        except ValueError as err:
+            assert message in str(err)
+        else:
+            assert False, message
+
+
+def _function_names(path):
+    with ast_binary.load(path) as tree:
+        return [tree.node(i).getName() for i in tree.items() if tree.kind(i) is AST.Function]
+
+
+def test_files_are_shared_between_processes():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'program.ast')
+        ast_binary.dump(parse(SOURCE), path)
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            assert list(pool.map(_function_names, [path] * 4)) == [['scale', 'main']] * 4
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'{name}: ok')
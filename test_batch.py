@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Checks for batch mode."""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import batch
+import lexer
+import lookaheadparser
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROGRAMS = os.path.join(HERE, 'Test Programs')
+
+
+def run(paths, jobs):
+    out, err = io.StringIO(), io.StringIO()
+    failed = batch.run(paths, jobs, use_cache=False, out=out, err=err)
+    return failed, [json.loads(line) for line in out.getvalue().splitlines()], err.getvalue()
+
+
+def test_pool_matches_a_serial_run_in_input_order():
+    failed, serial, report = run([PROGRAMS], 1)
+    assert [r['file'] for r in serial] == batch.find_sources([PROGRAMS])
+    assert failed == sum(r['status'] != 'ok' for r in serial) > 0
+    assert 'files/s' in report
+    _, pooled, _ = run([PROGRAMS], 3)
+    for r in serial + pooled:
+        del r['seconds']
+    assert pooled == serial
+
+
+def test_results_carry_every_stage():
+    with tempfile.TemporaryDirectory() as directory:
+        sources = {
+            'ok.c': 'int g = 1;\nfunc int main() {\n    return g + 1;\n}\n',
+            'syntax.c': 'func int main() {\n    return 1\n}\n',
+            'semantic.c': 'func int main() {\n    return x;\n}\n',
+            'notes.txt': '',
+        }
+        for name, text in sources.items():
+            with open(os.path.join(directory, name), 'w') as f:
+                f.write(text)
+        paths = [os.path.join(directory, name) for name in ('ok.c', 'syntax.c', 'semantic.c', 'notes.txt')]
+        failed, (ok, syntax, semantic_error, notes), _ = run(paths, 2)
+    assert failed == 3
+    assert ok['status'] == 'ok' and ok['errors'] == []
+    assert ok['tokens'][:2] == [['int', 'int', 1], ['identifier', 'g', 1]]
+    program = lookaheadparser.parse(lexer.lex(sources['ok.c']))
+    assert ok['ast'][0] == {'kind': 'Program', 'line': None, 'function_declaration': [1, 3]}
+    assert ok['ast'][3]['kind'] == 'Function' and ok['ast'][3]['name'] == program.getFunction()[1].getName()
+    assert ok['symbols']['globals']['g']['additional']['init_value'] == 'Constant(1)'
+    assert ok['symbols']['functions']['main'][0]['label'] == 'function'
+    assert syntax['status'] == 'syntax-error'
+    assert [(e['stage'], e['line']) for e in syntax['errors']] == [('syntax', 3)]
+    assert semantic_error['status'] == 'semantic-error'
+    assert semantic_error['errors'] == [{'stage': 'semantic', 'line': 2, 'message': "Use of undeclared variable 'x'"}]
+    assert notes['status'] == 'failed'
+
+
+def test_files_do_not_share_a_session():
+    import main
+
+    def encoded(result):
+        del result['seconds']
+        return json.dumps(result, default=repr)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # the same global, on different lines
+        shared = 'int shared = 1;\n'
+        paths = []
+        for name, text in (('a.c', shared + 'func int main() { return shared; }\n'),
+                           ('b.c', '\n\n' + shared + 'func int main() { return shared + 1; }\n')):
+            paths.append(os.path.join(directory, name))
+            with open(paths[-1], 'w') as f:
+                f.write(text)
+        parsed = main.session.parsed
+        alone = encoded(batch.compile_file(paths[0], use_cache=False))
+        first = batch.compile_file(paths[0], use_cache=False)
+        batch.compile_file(paths[1], use_cache=False)
+    # compiling b must not change a's result, even before it is encoded
+    assert encoded(first) == alone
+    assert main.session.parsed == parsed
+
+
+def test_main_switches_to_batch_mode():
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, MINIC_CACHE_DIR=directory)
+        proc = subprocess.run([sys.executable, os.path.join(HERE, 'main.py'), '-j', '2', PROGRAMS],
+                              capture_output=True, text=True, env=env)
+    lines = proc.stdout.splitlines()
+    assert len(lines) == len(batch.find_sources([PROGRAMS]))
+    assert proc.returncode == 1
+    assert 'files/s' in proc.stderr
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'{name}: ok')
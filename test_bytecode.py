@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Checks for the bytecode compiler and VM."""
+
+import glob
+import io
+import os
+import subprocess
+import sys
+import tempfile
+from array import array
+
+import bytecode
+import interpreter
+from test_interpreter import EXPECTED, SEMANTICS, analyze
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CONDITIONS = """int calls = 0;
+func bool touch(bool value) { calls = calls + 1; return value; }
+func int main() {
+    int hits = 0;
+    for (int i = 0; i < 12; i = i + 1) {
+        if (i % 2 == 0 && !(i > 8) || touch(i == 11)) { hits = hits + 1; }
+        if (!(i < 3 || touch(i >= 10))) { hits = hits + 100; }
+    }
+    int n = 5;
+    while (n != 0 && (n > 2 || touch(true))) { n = n - 1; }
+    bool b = n <= 2 && !(calls > 100);
+    print(b);
+    print(calls);
+    return hits + n;
+}
+"""
+
+
+def execute(source, stdin=''):
+    program, analyzer, errors = analyze(source)
+    assert errors == []
+    out = io.StringIO()
+    result = bytecode.run(program, analyzer, io.StringIO(stdin), out)
+    return result, out.getvalue().splitlines()
+
+
+def test_test_programs():
+    ran = set()
+    for path in sorted(glob.glob(os.path.join(HERE, 'Test Programs', '*.c'))):
+        with open(path) as f:
+            program, analyzer, errors = analyze(f.read())
+        if errors:
+            continue
+        out = io.StringIO()
+        result = bytecode.run(program, analyzer, io.StringIO(), out)
+        name = os.path.basename(path)
+        assert (result, out.getvalue().splitlines()) == EXPECTED[name], name
+        ran.add(name)
+    assert ran == set(EXPECTED)
+
+
+def test_matches_the_interpreter():
+    for source, stdin in [(SEMANTICS, '12\n 0.25 '), (CONDITIONS, '')]:
+        program, analyzer, _ = analyze(source)
+        out = io.StringIO()
+        expected = (interpreter.run(program, analyzer, io.StringIO(stdin), out), out.getvalue())
+        out = io.StringIO()
+        assert (bytecode.run(program, analyzer, io.StringIO(stdin), out), out.getvalue()) == expected
+    assert execute(CONDITIONS) == (706, ['true', '18'])
+
+
+def test_typed_opcodes():
+    program, analyzer, _ = analyze("""func float f(int i, float x) {
+    float y = i;
+    return x * y + i;
+}
+func int main() { return 7 % 2 - 1; }
+""")
+    code = bytecode.compile_program(program, analyzer)
+    assert isinstance(code.code, array) and code.code.typecode == 'i'
+    ops = [bytecode.OPCODES[op] for op, _, _, _ in code.instructions()]
+    assert ops[ops.index('FMUL') - 2:ops.index('FMUL')] == ['LOAD_LOCAL', 'LOAD_LOCAL']
+    assert ops[ops.index('FADD') - 2:ops.index('FADD')] == ['LOAD_LOCAL', 'I2F']
+    assert ops.count('I2F') == 2
+    assert 'IMOD' in ops and 'ISUB' in ops and 'IADD' not in ops
+    assert 'main:' in bytecode.disassemble(code)
+
+
+def test_counts_instructions():
+    program, analyzer, _ = analyze('func int main() { int s = 0; while (s < 10) { s = s + 1; } return s; }')
+    vm = bytecode.VM(bytecode.compile_program(program, analyzer))
+    assert vm.run() == 10
+    # call, halt; 2 to declare s, the jump into the loop, 10 passes of
+    # increment and test, one final test, then 2 to return
+    assert vm.executed == 2 + 3 + 20 + 1 + 2
+    assert vm.rate() > 0
+
+
+def test_runtime_errors():
+    for source, stdin, message in [
+        ('func int main() { int z = 0; return 1 % z; }', '', 'Division by zero'),
+        ('func int main() { float z = 0; float r = 1 / z; return 0; }', '', 'Division by zero'),
+        ('func int main() { int x = 0; read(x); return x; }', '', 'end of input'),
+        ('func int main() { int x = 0; read(x); return x; }', 'abc', "expected int, got 'abc'"),
+        ('func int f(int n) { return f(n + 1); }\nfunc int main() { return f(0); }', '', 'Call stack overflow'),
+        ('func int helper() { return 0; }', '', 'No main()'),
+    ]:
+        try:
+            execute(source, stdin)
+        except interpreter.ExecutionError as err:
+            assert message in str(err), (source, err)
+        else:
+            assert False, source
+
+
+def test_main_runs_on_either_engine():
+    path = os.path.join(HERE, 'Test Programs', 'global_mutation.c')
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, MINIC_CACHE_DIR=directory)
+        for engine in ('vm', 'tree'):
+            proc = subprocess.run([sys.executable, os.path.join(HERE, 'main.py'), '--run', '--engine', engine,
+                                   '--stats', path], capture_output=True, text=True, env=env)
+            assert (proc.returncode, proc.stdout) == (11, '10\n11\n')
+            assert ('instructions/s' in proc.stderr) == (engine == 'vm')
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'{name}: ok')
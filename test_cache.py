@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Checks for cache.CompileCache."""
+
+import contextlib
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import cache
+import lexer
+import lookaheadparser
+import semantic
+
+SOURCE = """int limit = 3;
+func int twice(int a) { return a * 2; }
+func int main() {
+    int x = twice(limit);
+    print(x);
+    return x;
+}
+"""
+
+
+def front_end(source):
+    tokens = lexer.lex_compact(source)
+    program, errors = lookaheadparser.parse_with_diagnostics(tokens)
+    if errors:
+        return cache.Entry(tokens, program, errors)
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer, errors = semantic.analyze_with_diagnostics(program)
+    return cache.Entry(tokens, program, [], analyzer, errors)
+
+
+def symbol_tables(analyzer):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        analyzer.print_symbol_tables()
+    return out.getvalue()
+
+
+def test_round_trip_keeps_tokens_tree_and_tables():
+    with tempfile.TemporaryDirectory() as directory:
+        compile_cache = cache.CompileCache(directory)
+        assert compile_cache.load(SOURCE) is None
+        entry = front_end(SOURCE)
+        assert compile_cache.store(SOURCE, entry)
+        loaded = compile_cache.load(SOURCE)
+        assert list(loaded.tokens) == list(entry.tokens)
+        assert repr(loaded.program) == repr(entry.program)
+        assert symbol_tables(loaded.analyzer()) == symbol_tables(entry.analyzer())
+        assert loaded.semantic_errors == []
+        # symbol refs still point into the cached tables
+        call = loaded.program.getFunction()[2].getStatement().statements[0].init
+        assert call.symbol_ref['entry'] is loaded.global_symbols['twice']
+        assert loaded.expr_types[call] == semantic.INT
+
+
+def test_errors_are_cached_too():
+    with tempfile.TemporaryDirectory() as directory:
+        compile_cache = cache.CompileCache(directory)
+        for source in (SOURCE.replace('return x;', 'return x'), SOURCE.replace('twice(limit)', 'twice(y)')):
+            entry = front_end(source)
+            assert entry.complete()
+            compile_cache.store(source, entry)
+            loaded = compile_cache.load(source)
+            assert [str(e) for e in loaded.parse_errors] == [str(e) for e in entry.parse_errors]
+            assert [str(e) for e in loaded.semantic_errors or ()] == [str(e) for e in entry.semantic_errors or ()]
+
+
+def test_other_compiler_versions_and_bad_entries_miss():
+    with tempfile.TemporaryDirectory() as directory:
+        cache.CompileCache(directory, version='old').store(SOURCE, front_end(SOURCE))
+        compile_cache = cache.CompileCache(directory)
+        assert compile_cache.load(SOURCE) is None
+        with open(compile_cache.path(SOURCE), 'wb') as f:
+            f.write(b'\x80\x05truncated')
+        assert compile_cache.load(SOURCE) is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    with tempfile.TemporaryDirectory() as directory:
+        compile_cache = cache.CompileCache(directory)
+        sources = [SOURCE.replace('limit = 3', f'limit = {i}') for i in range(4)]
+        for i, source in enumerate(sources):
+            compile_cache.store(source, front_end(source))
+            os.utime(compile_cache.path(source), (i, i))
+        size = os.path.getsize(compile_cache.path(sources[0]))
+        # using the oldest entry makes it the most recent
+        assert compile_cache.load(sources[0]) is not None
+        compile_cache.max_bytes = 3 * size
+        compile_cache.evict()
+        assert [compile_cache.load(s) is not None for s in sources] == [True, False, True, True]
+
+
+def _store_and_load(directory, i):
+    compile_cache = cache.CompileCache(directory, max_bytes=1 << 20)
+    source = SOURCE.replace('limit = 3', f'limit = {i % 5}')
+    entry = front_end(source)
+    for _ in range(20):
+        compile_cache.store(source, entry)
+        loaded = compile_cache.load(source)
+        if loaded is not None and repr(loaded.program) != repr(entry.program):
+            return False
+    return True
+
+
+def test_concurrent_processes_share_the_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            assert all(pool.map(_store_and_load, [directory] * 12, range(12)))
+        assert not [name for name in os.listdir(directory) if name.startswith('.tmp-')]
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'{name}: ok')
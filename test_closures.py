@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Checks for the closure compiler."""
+
+import glob
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+import closures
+import interpreter
+from test_bytecode import CONDITIONS
+from test_interpreter import EXPECTED, SEMANTICS, analyze
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def execute(source, stdin=''):
+    program, analyzer, errors = analyze(source)
+    assert errors == []
+    out = io.StringIO()
+    result = closures.run(program, analyzer, io.StringIO(stdin), out)
+    return result, out.getvalue().splitlines()
+
+
+def test_test_programs():
+    ran = set()
+    for path in sorted(glob.glob(os.path.join(HERE, 'Test Programs', '*.c'))):
+        with open(path) as f:
+            program, analyzer, errors = analyze(f.read())
+        if errors:
+            continue
+        out = io.StringIO()
+        result = closures.run(program, analyzer, io.StringIO(), out)
+        name = os.path.basename(path)
+        assert (result, out.getvalue().splitlines()) == EXPECTED[name], name
+        ran.add(name)
+    assert ran == set(EXPECTED)
+
+
+def test_matches_the_interpreter():
+    for source, stdin in [(SEMANTICS, '12\n 0.25 '), (CONDITIONS, '')]:
+        program, analyzer, _ = analyze(source)
+        out = io.StringIO()
+        expected = (interpreter.run(program, analyzer, io.StringIO(stdin), out), out.getvalue())
+        out = io.StringIO()
+        assert (closures.run(program, analyzer, io.StringIO(stdin), out), out.getvalue()) == expected
+
+
+def test_runs_repeatedly():
+    program, analyzer, _ = analyze('int n = 1;\nfunc int main() { n = n * 3; print(n); return n; }')
+    compiled = closures.compile_program(program, analyzer)
+    for _ in range(2):
+        out = io.StringIO()
+        assert compiled.run(stdout=out) == 3 and out.getvalue() == '3\n'
+
+
+def test_specialised_closures():
+    program, analyzer, _ = analyze("""func float f(int i, float x) {
+    int j = i + 1;
+    float y = x * 2;
+    return y + j;
+}
+func int main() { return 0; }
+""")
+    compiled = closures.compile_program(program, analyzer)
+    body = program.getFunction()[0].getStatement().statements
+    # `i + 1` reads the slot and the literal directly: no operand closures
+    j = compiled.expression(body[0].init)
+    cells = [cell.cell_contents for cell in j.__closure__]
+    assert sorted(map(repr, cells)) == sorted(map(repr, [closures.INT_OPS['+'], 0, 1]))
+    # float arithmetic: the int literal becomes a float constant
+    y = compiled.expression(body[1].init)
+    assert 2.0 in [cell.cell_contents for cell in y.__closure__]
+    assert type(y([1, 1.5])) is float
+    # the int local is converted before the float addition
+    assert compiled.functions['f']([3, 1.5]) == 7.0
+    assert type(compiled.functions['f']([3, 1.5])) is float
+
+
+def test_runtime_errors():
+    for source, stdin, message in [
+        ('func int main() { int z = 0; return 1 % z; }', '', 'Division by zero'),
+        ('func int main() { float z = 0; float r = 1 / z; return 0; }', '', 'Division by zero'),
+        ('func int main() { int x = 0; read(x); return x; }', '', 'end of input'),
+        ('func int main() { int x = 0; read(x); return x; }', 'abc', "expected int, got 'abc'"),
+        ('func int f(int n) { return f(n + 1); }\nfunc int main() { return f(0); }', '', 'Call stack overflow'),
+        ('func int helper() { return 0; }', '', 'No main()'),
+    ]:
+        try:
+            execute(source, stdin)
+        except interpreter.ExecutionError as err:
+            assert message in str(err), (source, err)
+        else:
+            assert False, source
+
+
+def test_main_runs_closures():
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, MINIC_CACHE_DIR=directory)
+        proc = subprocess.run([sys.executable, os.path.join(HERE, 'main.py'), '--run', '--engine', 'closures',
+                               os.path.join(HERE, 'Test Programs', 'global_mutation.c')],
+                              capture_output=True, text=True, env=env)
+    assert (proc.returncode, proc.stdout) == (11, '10\n11\n')
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'{name}: ok')
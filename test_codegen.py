@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Checks for the x86-64 code generator; they build real executables, so
+they need gcc on an x86-64 machine."""
+
+import glob
+import io
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+import codegen
+import interpreter
+from test_bytecode import CONDITIONS
+from test_interpreter import DEEP, EXPECTED, SEMANTICS, SHADOWED, analyze
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+pytestmark = pytest.mark.skipif(not shutil.which('gcc') or platform.machine() != 'x86_64',
+                                reason='needs gcc on x86-64')
+
+ARGUMENTS = """func float mix(int a, float b, int c, int d, float e, int f, int g, int h, int i,
+                float j, float k, float l, float m, float n, float o, float p, int q) {
+    return a + b * 2 + c - d + e + f * g + h - i + j + k + l + m + n + o + p + q % 5;
+}
+func int main() {
+    float r = mix(1, 0.5, 3, 4, 1.25, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17 * 3);
+    print(r);
+    if (r > 100) { return 1; }
+    return 2;
+}
+"""
+
+# calls inside pending operations, with floats printed at odd stack depths
+CALLS = """float gd = 1.5;
+int gi = 2;
+func float h(float x) { print(x); print(x * gd); return x / 2; }
+func int k(int a, int b) { print(a % b); return a * b; }
+func int fib(int n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); }
+func int main() {
+    float r = 1 + (gd + h(3 + h(gi + h(0.5))));
+    int q = 1 + (2 * (3 - k(7, 1 + k(-7, 3))));
+    print(r);
+    print(q);
+    print(fib(20));
+    int i = 0;
+    while (i < 50) { i = i + 1; if (i >= 10 || !(i < 100)) { gi = i; } }
+    return gi + fib(10);
+}
+"""
+
+FLOATS = """func bool between(float x, float lo, double hi) { return lo <= x && x < hi; }
+func int main() {
+    float z = 0;
+    float nan = z / 1;
+    float x = 2.5;
+    print(between(x, 1, 3));
+    print(between(x, 2.5, 2.5));
+    print(x == 2.5);
+    print(x != 2.5 || x > 3 || -x >= -2.5);
+    print(-x % 2);
+    print(7 / 2);
+    print(-z);
+    if (x) { print(1); }
+    return 3;
+}
+"""
+
+
+def native(source, stdin=''):
+    program, analyzer, errors = analyze(source)
+    assert errors == []
+    with tempfile.TemporaryDirectory() as directory:
+        executable = codegen.build(codegen.generate(program, analyzer), os.path.join(directory, 'program'))
+        proc = subprocess.run([executable], input=stdin, capture_output=True, text=True)
+    return proc.returncode, proc.stdout.splitlines(), proc.stderr
+
+
+def interpreted(source, stdin=''):
+    program, analyzer, _ = analyze(source)
+    out = io.StringIO()
+    result = interpreter.run(program, analyzer, io.StringIO(stdin), out)
+    return int(result) & 0xFF, out.getvalue().splitlines()
+
+
+def test_test_programs():
+    ran = set()
+    for path in sorted(glob.glob(os.path.join(HERE, 'Test Programs', '*.c'))):
+        name = os.path.basename(path)
+        if name not in EXPECTED:
+            continue
+        with open(path) as f:
+            status, out, _ = native(f.read())
+        result, expected = EXPECTED[name]
+        assert (status, out) == (result & 0xFF, expected), name
+        ran.add(name)
+    assert ran == set(EXPECTED)
+
+
+def test_matches_the_interpreter():
+    for source, stdin in [(SEMANTICS, '12\n 0.25 '), (CONDITIONS, ''), (ARGUMENTS, ''), (CALLS, ''),
+                          (FLOATS, ''), (DEEP % 5000, ''), (SHADOWED, ''),
+                          ('func int main() { bool b = false; bool c = true; read(b); read(c);'
+                           ' print(b); print(c); return 0; }', ' true\n0 ')]:
+        assert native(source, stdin)[:2] == interpreted(source, stdin), source
+
+
+def test_assembly():
+    program, analyzer, _ = analyze('int g = 3;\nfunc int main() { int x = g; return x + 1; }')
+    text = codegen.generate(program, analyzer)
+    assert '.globl main' in text and 'f_main:' in text
+    data = text[text.index('.data'):]
+    assert data.startswith('.data') and 'g_g:' in data
+    # x is main's first slot
+    assert 'mov %rax, -8(%rbp)' in text
+
+
+def test_runtime_errors():
+    for source, stdin, message in [
+        ('func int main() { int z = 0; return 1 % z; }', '', 'Division by zero'),
+        ('func int main() { float z = 0; float r = 1 / z; return 0; }', '', 'Division by zero'),
+        ('func int main() { int x = 0; read(x); return x; }', '', 'end of input'),
+        ('func int main() { int x = 0; read(x); return x; }', 'abc', 'expected int'),
+        ('func int main() { bool x = false; read(x); return 0; }', 'maybe', 'expected bool'),
+    ]:
+        status, out, err = native(source, stdin)
+        assert status == 4 and message in err, (source, err)
+    program, analyzer, _ = analyze('func int helper() { return 0; }')
+    try:
+        codegen.generate(program, analyzer)
+    except codegen.CodegenError as err:
+        assert 'No main()' in str(err)
+    else:
+        assert False
+
+
+def test_main_builds_native_code():
+    path = os.path.join(HERE, 'Test Programs', 'global_mutation.c')
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, MINIC_CACHE_DIR=directory)
+        main = os.path.join(HERE, 'main.py')
+        proc = subprocess.run([sys.executable, main, '--run', '--engine', 'native', path],
+                              capture_output=True, text=True, env=env)
+        assert (proc.returncode, proc.stdout) == (11, '10\n11\n')
+        output = os.path.join(directory, 'assembly.s')
+        proc = subprocess.run([sys.executable, main, '-S', output, path], capture_output=True, text=True, env=env)
+        assert proc.returncode == 0
+        subprocess.run(['gcc', output, '-o', os.path.join(directory, 'out'), '-lm'], check=True)
+        assert subprocess.run([os.path.join(directory, 'out')]).returncode == 11
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'{name}: ok')
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Checks for incremental.CompileSession: every compile must match a fresh one."""
+
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+import ASTNodes as AST
+import incremental
+import lexer
+import lookaheadparser
+import semantic
+from diagnostics import Diagnostic
+
+BASE = """int limit = 10;
+func int helper(int a) {
+    int twice = a * 2;
+    return twice;
+}
+func int main() {
+    int x = helper(3);
+    for (int i = 0; i < limit; i = i + 1) {
+        x = x + helper(i);
+    }
+    return x;
+}
+func float other(float f) {
+    float g = f / 2;
+    return g;
+}
+"""
+
+
+def snapshot(program, analyzer, errors):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        analyzer.print_symbol_tables()
+    nodes = list(semantic.walk_nodes(program))
+    return (
+        repr(program),
+        out.getvalue(),
+        [(e.line, e.message) for e in errors],
+        [node.line for node in nodes],
+        [analyzer.expr_types.get(node) for node in nodes],
+        [node.symbol_ref['entry']['addr'] if node.symbol_ref else None
+         for node in nodes if isinstance(node, (AST.Identifier, AST.FuncCall))],
+    )
+
+
+def fresh(source):
+    program = lookaheadparser.parse(lexer.lex_compact(source))
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer, errors = semantic.analyze_with_diagnostics(program)
+    return snapshot(program, analyzer, errors)
+
+
+def compile_with(session, source):
+    program, errors = session.parse(lexer.lex_compact(source))
+    assert errors == []
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer, errors = session.analyze(program)
+    return snapshot(program, analyzer, errors)
+
+
+def test_edits_match_a_fresh_compile():
+    edits = [
+        BASE,
+        BASE,
+        # body edit in the last function
+        BASE.replace('float g = f / 2;', 'float g = f / 4;'),
+        # lines shift for everything below
+        '\n\n' + BASE,
+        # an extra local moves the addresses of every later function
+        BASE.replace('int twice = a * 2;', 'int twice = a * 2;\n    int spare = 0;'),
+        # a signature change invalidates its callers
+        BASE.replace('func int helper(int a)', 'func float helper(int a)'),
+        # removing a global its user depends on
+        BASE.replace('int limit = 10;\n', ''),
+        BASE,
+    ]
+    session = incremental.CompileSession()
+    for source in edits:
+        assert compile_with(session, source) == fresh(source)
+
+
+def test_reused_functions_move_every_local():
+    import interpreter
+    source = BASE + """func int shadow(int n) {
+    if (n > 0) { int x = n; for (int i = 0; i < x; i = i + 1) { n = n + i; } }
+    int x = n * 2;
+    while (x < 0) { int i = x; x = i + 1; }
+    return x;
+}
+"""
+    edits = [source, source.replace('int twice = a * 2;', 'int twice = a * 2;\n    int spare = 0;'),
+             source.replace('float g = f / 2;', 'float g = f / 2;\n    float h = g;'), source]
+    session = incremental.CompileSession()
+    for text in edits:
+        program, _ = session.parse(lexer.lex_compact(text))
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyzer, errors = session.analyze(program)
+        assert snapshot(program, analyzer, errors) == fresh(text)
+        expected = lookaheadparser.parse(lexer.lex_compact(text))
+        with contextlib.redirect_stdout(io.StringIO()):
+            fresh_analyzer = semantic.SemanticAnalyzer(collect_errors=True)
+            fresh_analyzer.declared = []
+            fresh_analyzer.analyze(expected)
+        entries = [entry for item in session.cache.values() if item.analysis is not None
+                   for entry in item.analysis.entries]
+        assert sorted(entry['addr'] for entry in entries) == sorted(entry['addr'] for entry in fresh_analyzer.declared)
+        layout = interpreter.Layout(program, analyzer)
+        fresh_layout = interpreter.Layout(expected, fresh_analyzer)
+        assert [layout.slots.get(node) for node in semantic.walk_nodes(program)] == \
+            [fresh_layout.slots.get(node) for node in semantic.walk_nodes(expected)]
+
+
+def test_only_changed_items_are_redone():
+    session = incremental.CompileSession()
+    compile_with(session, BASE)
+    assert (session.parsed, session.analyzed) == (4, 3)
+    compile_with(session, '// moved down\n' + BASE.replace('float g = f / 2;', 'float g = f / 4;'))
+    assert (session.parsed, session.analyzed) == (5, 4)
+    compile_with(session, BASE.replace('func int helper(int a)', 'func int helper(int b)').replace('a * 2', 'b * 2'))
+    # helper's body changed; main depends only on helper's unchanged signature
+    assert session.analyzed == 6
+
+
+def test_syntax_errors_fall_back_to_a_whole_file_parse():
+    session = incremental.CompileSession()
+    source = BASE.replace('return twice;', 'return twice')
+    program, errors = session.parse(lexer.lex_compact(source))
+    expected = lookaheadparser.parse_with_diagnostics(lexer.lex_compact(source))
+    assert [(e.line, e.message) for e in errors] == [(e.line, e.message) for e in expected[1]]
+    assert repr(program) == repr(expected[0])
+
+
+def test_reused_diagnostics_keep_a_missing_line():
+    session = incremental.CompileSession()
+    source = BASE.replace('return g;', 'return h;')
+    compile_with(session, source)
+    # diagnostics reported without a node have no line to shift
+    cached = next(item for item in session.cache.values() if item.analysis is not None and item.analysis.errors)
+    line = cached.analysis.errors[0].line
+    cached.analysis.errors.append(Diagnostic('no line'))
+    program, _ = session.parse(lexer.lex_compact('\n\n' + source))
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, errors = session.analyze(program)
+    assert [e.line for e in errors] == [line + 2, None]
+
+
+def test_main_watch_redoes_only_edits():
+    here = os.path.dirname(os.path.abspath(__file__))
+    source = 'int g = 1;\nfunc int helper() { return g; }\nfunc int main() { print(helper()); return 0; }\n'
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'watched.c')
+        with open(path, 'w') as f:
+            f.write(source)
+        proc = subprocess.Popen([sys.executable, os.path.join(here, 'main.py'), '--watch', '--run', path],
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                env=dict(os.environ, MINIC_CACHE_DIR=directory))
+        try:
+            def until_watching():
+                lines = []
+                while not lines or 'watching' not in lines[-1]:
+                    lines.append(proc.stdout.readline())
+                    assert lines[-1], lines
+                return lines
+
+            first = until_watching()
+            assert first[0] == '1\n' and 're-parsed 3 and re-analyzed 2 of 3 top-level items' in first[-1]
+            with open(path, 'w') as f:
+                f.write(source.replace('print(helper())', 'print(helper() + 1)'))
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            second = until_watching()
+            assert second[0] == '2\n' and 're-parsed 1 and re-analyzed 1 of 3 top-level items' in second[-1]
+        finally:
+            proc.kill()
+            proc.wait()
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'{name}: ok')
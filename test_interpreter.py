@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Checks for interpreter."""
+
+import contextlib
+import glob
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+import ASTNodes as AST
+import interpreter
+import lexer
+import lookaheadparser
+import semantic
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# program -> (main's result, printed lines) for every test program that passes analysis
+EXPECTED = {
+    'comprehensive_globals.c': (30, ['30']),
+    'control_structures.c': (0, ['10']),
+    'func_add.c': (0, ['0']),
+    'global_mutation.c': (11, ['10', '11']),
+    'global_variables.c': (42, []),
+    'globals_with_functions.c': (30, []),
+    'neg.c': (-5, []),
+    'neg_neg.c': (5, []),
+    'nested_negation.c': (4, []),
+    'newlines.c': (0, []),
+    'newlines_and_spaces.c': (5, []),
+    'no_newlines_and_no_spaces.c': (0, []),
+    'ones_complement.c': (-1, []),
+    'return_1.c': (0, []),
+    'return_500.c': (500, []),
+    'void_func.c': (0, []),
+}
+
+SEMANTICS = """int counter = 2;
+float scale = counter * 1.5;
+func float half(float x) { return x / 2; }
+func int bump() { counter = counter + 1; return counter; }
+func int fact(int n) {
+    if (n <= 1) { return 1; }
+    return n * fact(n - 1);
+}
+func int main() {
+    int a = 7;
+    int b = -7;
+    print(a / 2);
+    print(a % 3);
+    print(b % 3);
+    print(half(a));
+    print(scale);
+    bool flag = a > 3 && !(b > 0);
+    print(flag);
+    print(~a);
+    if (a > 0) {
+        int a = 100;
+        print(a);
+    }
+    print(a);
+    for (int i = 0; i < 3; i = i + 1) { a = a + i; }
+    print(a);
+    if (a < 0 && bump() > 0) { print(0); }
+    print(counter);
+    int got = 0;
+    float f = 0;
+    read(got);
+    read(f);
+    print(got + f);
+    return fact(5);
+}
+"""
+
+# recursion deeper than Python's default limit, with more arguments than
+# the engines pass specially
+DEEP = """func int depth(int n, int a, float b) {
+    if (n == 0) { return a; }
+    return depth(n - 1, a, b) + 1;
+}
+func int main() { print(depth(%d, 0, 1.5)); return 0; }
+"""
+
+# an outer local declared after a nested block's local of the same name
+SHADOWED = """func int main() {
+    if (true) { int x = 1; print(x); }
+    int x = 2;
+    print(x);
+    return x;
+}
+"""
+
+
+def analyze(source):
+    program = lookaheadparser.parse(lexer.lex_compact(source))
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer, errors = semantic.analyze_with_diagnostics(program)
+    return program, analyzer, errors
+
+
+def execute(source, stdin=''):
+    program, analyzer, errors = analyze(source)
+    assert errors == []
+    out = io.StringIO()
+    result = interpreter.run(program, analyzer, io.StringIO(stdin), out)
+    return result, out.getvalue().splitlines()
+
+
+def test_test_programs():
+    ran = set()
+    for path in sorted(glob.glob(os.path.join(HERE, 'Test Programs', '*.c'))):
+        with open(path) as f:
+            program, analyzer, errors = analyze(f.read())
+        if errors:
+            continue
+        out = io.StringIO()
+        result = interpreter.run(program, analyzer, io.StringIO(), out)
+        name = os.path.basename(path)
+        assert (result, out.getvalue().splitlines()) == EXPECTED[name], name
+        ran.add(name)
+    assert ran == set(EXPECTED)
+
+
+def test_semantics():
+    result, lines = execute(SEMANTICS, '12\n 0.25 ')
+    assert result == 120
+    assert lines == ['3.5', '1', '-1', '3.5', '3', 'true', '-8', '100', '7', '10', '2', '12.25']
+
+
+def test_slots_follow_the_addresses():
+    program, analyzer, _ = analyze(SEMANTICS)
+    layout = interpreter.Layout(program, analyzer)
+    main = program.getFunction()[5]
+    scopes = analyzer.function_symbols['main']
+    base = int(scopes[0]['symbols']['a']['addr'], 16)
+    declared = []
+    for node in semantic.walk_nodes(main):
+        if type(node) is AST.VarDecl:
+            declared.append(layout.slots[node])
+        elif type(node) is AST.Identifier and node.symbol_ref['entry']['additional']['kind'] != 'global':
+            assert layout.slots[node] == (int(node.symbol_ref['entry']['addr'], 16) - base) // 4
+    assert sorted(declared) == list(range(7))
+    assert layout.frame_sizes[main] == semantic.count_declarations(main) == 7
+
+
+def test_runtime_errors():
+    for source, stdin, message in [
+        ('func int main() { int z = 0; return 1 % z; }', '', 'Division by zero'),
+        ('func int main() { int x = 0; read(x); return x; }', '', 'end of input'),
+        ('func int main() { int x = 0; read(x); return x; }', 'abc', "expected int, got 'abc'"),
+        ('func int f(int n) { return f(n + 1); }\nfunc int main() { return f(0); }', '', 'Call stack overflow'),
+        ('func int helper() { return 0; }', '', 'No main()'),
+    ]:
+        try:
+            execute(source, stdin)
+        except interpreter.ExecutionError as err:
+            assert message in str(err), (source, err)
+        else:
+            assert False, source
+    program, analyzer, errors = analyze('func int main() { return y; }')
+    assert errors
+    try:
+        interpreter.run(program, analyzer)
+    except interpreter.ExecutionError:
+        pass
+    else:
+        assert False
+
+
+def test_call_depth_is_shared_by_every_engine():
+    import bytecode
+    import closures
+    import transpile
+    # depth(n) makes n + 1 calls, and main is one more
+    program, analyzer, _ = analyze(DEEP % (interpreter.MAX_CALL_DEPTH - 2))
+    for engine in (interpreter, bytecode, closures, transpile):
+        out = io.StringIO()
+        assert engine.run(program, analyzer, io.StringIO(), out) == 0
+        assert out.getvalue() == f'{interpreter.MAX_CALL_DEPTH - 2}\n', engine.__name__
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'deep.c')
+        with open(path, 'w') as f:
+            f.write(DEEP % 5000)
+        env = dict(os.environ, MINIC_CACHE_DIR=directory)
+        for engine in ('tree', 'vm', 'closures', 'python'):
+            proc = subprocess.run([sys.executable, os.path.join(HERE, 'main.py'), '--run', '--engine', engine, path],
+                                  capture_output=True, text=True, env=env)
+            assert (proc.returncode, proc.stdout, proc.stderr) == (0, '5000\n', ''), engine
+
+
+def test_block_local_reused_by_a_later_declaration():
+    import bytecode
+    import closures
+    import transpile
+    program, analyzer, _ = analyze(SHADOWED)
+    outer, block = analyzer.function_symbols['main']
+    # each x is kept under its own scope, the block's first
+    assert int(block['symbols']['x']['addr'], 16) < int(outer['symbols']['x']['addr'], 16)
+    for engine in (interpreter, bytecode, closures, transpile):
+        out = io.StringIO()
+        assert engine.run(program, analyzer, io.StringIO(), out) == 2, engine.__name__
+        assert out.getvalue() == '1\n2\n', engine.__name__
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'shadowed.c')
+        with open(path, 'w') as f:
+            f.write(SHADOWED)
+        env = dict(os.environ, MINIC_CACHE_DIR=directory)
+        for engine in ('tree', 'vm', 'closures', 'python'):
+            proc = subprocess.run([sys.executable, os.path.join(HERE, 'main.py'), '--run', '--engine', engine, path],
+                                  capture_output=True, text=True, env=env)
+            assert (proc.returncode, proc.stdout, proc.stderr) == (2, '1\n2\n', ''), engine
+
+
+def test_main_runs_programs():
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, MINIC_CACHE_DIR=directory)
+        proc = subprocess.run([sys.executable, os.path.join(HERE, 'main.py'), '--run',
+                               os.path.join(HERE, 'Test Programs', 'global_mutation.c')],
+                              capture_output=True, text=True, env=env)
+    assert (proc.returncode, proc.stdout) == (11, '10\n11\n')
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'{name}: ok')
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Checks for the token stream produced by lexer.lex."""
+
+import glob
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import lexer
+
+PROGRAMS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'Test Programs', '*.c')))
+
+
+def lex(source):
+    return lexer.lex(source)
+
+
+def test_operators_and_punctuation():
+    tokens = lex('a<=b&&c!=d||!e==f>g<h=-i+j*k/l%m~;(){},\n')
+    assert [t[1] for t in tokens] == [
+        'a', '<=', 'b', '&&', 'c', '!=', 'd', '||', '!', 'e', '==', 'f', '>', 'g',
+        '<', 'h', '=', '-', 'i', '+', 'j', '*', 'k', '/', 'l', '%', 'm', '~',
+        ';', '(', ')', '{', '}', ',',
+    ]
+    assert [t[0] for t in tokens[:4]] == ['identifier', 'relop', 'identifier', 'logop']
+
+
+def test_words_numbers_and_lines():
+    tokens = lex('func int main() {\n  float x = 2.5; // note = 1\n  return 42;\n}')
+    assert tokens == [
+        ('func', 'func', 1), ('int', 'int', 1), ('identifier', 'main', 1, {}),
+        ('lparen', '(', 1), ('rparen', ')', 1), ('lbrace', '{', 1),
+        ('float', 'float', 2), ('identifier', 'x', 2, {}), ('assign', '=', 2),
+        ('number', 2.5, 2), ('semicolon', ';', 2),
+        ('return', 'return', 3), ('number', 42, 3), ('semicolon', ';', 3),
+        ('rbrace', '}', 4),
+    ]
+
+
+def test_unknown_characters_split_words():
+    tokens = lex('a@b "c" 1.2.3 ')
+    assert tokens == [
+        ('identifier', 'a', 1, {}), ('identifier', 'b', 1, {}),
+        ('identifier', 'c', 1, {}), ('identifier', '1.2.3', 1, {}),
+    ]
+
+
+def test_trailing_word_at_end_of_input_is_dropped():
+    assert lex('x = y') == [('identifier', 'x', 1, {}), ('assign', '=', 1)]
+
+
+def test_test_programs_lex():
+    for path in PROGRAMS:
+        with open(path) as f:
+            tokens = lex(f.read())
+        assert tokens, path
+        assert all(len(t) in (3, 4) for t in tokens), path
+
+
+def test_lex_iter_chunk_boundaries():
+    source = 'func int main() {\n  int long_name = 1; // a comment\n  if (long_name <= 2 && 1 >= 0) {}\n  return 0;\n}\n'
+    expected = lex(source)
+    for chunk_size in (1, 2, 3, 5, 8, 64):
+        assert list(lexer.lex_iter(io.StringIO(source), chunk_size)) == expected, chunk_size
+
+
+def test_lex_iter_is_lazy():
+    tokens = lexer.lex_iter(io.StringIO('a = 1;\n' * 100000), chunk_size=16)
+    assert next(tokens) == ('identifier', 'a', 1, {})
+    assert next(tokens) == ('assign', '=', 1)
+
+
+def test_long_line_is_lexed_a_chunk_at_a_time():
+    # one 3.7MB line, with words, operators and a comment across chunk boundaries
+    line = 'int long_name = 12.5 + x1 <= y && z; ' * 100000 + '// the end'
+    source = io.StringIO(line)
+    tokens = lexer.lex_iter(source, chunk_size=4096)
+    assert next(tokens) == ('int', 'int', 1)
+    # the first tokens come before the rest of the line has been read
+    assert source.tell() <= 2 * 4096
+    assert sum(1 for _ in tokens) == 11 * 100000 - 1
+    assert list(lexer.lex_iter(io.StringIO(line[:5000]), chunk_size=7)) == lex(line[:5000])
+
+
+def test_repeated_lex_restarts_line_numbers():
+    source = 'int x;\nint y;\n'
+    assert lex(source) == lex(source)
+    assert lex(source)[-1] == ('semicolon', ';', 2)
+
+
+def test_concurrent_lexers_do_not_share_state():
+    sources = []
+    for path in PROGRAMS:
+        with open(path) as f:
+            sources.append(f.read())
+    expected = [lex(s) for s in sources]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lex, sources * 20))
+    assert results == expected * 20
+
+
+def test_lexer_tracks_line_and_column():
+    scanner = lexer.Lexer('int a;\n  b = 10;')
+    positions = [(tok[1], scanner.line, scanner.column, scanner.position) for tok in scanner]
+    assert positions == [
+        ('int', 1, 1, 0), ('a', 1, 5, 4), (';', 1, 6, 5),
+        ('b', 2, 3, 9), ('=', 2, 5, 11), (10, 2, 7, 13), (';', 2, 9, 15),
+    ]
+
+
+def test_token_array_matches_tuples():
+    for path in PROGRAMS:
+        with open(path) as f:
+            source = f.read()
+        compact = lexer.lex_compact(source)
+        expected = [t[:3] + (None,) if len(t) == 4 else t for t in lex(source)]
+        assert list(compact) == expected, path
+        for i in range(len(compact)):
+            start, end = compact.span(i)
+            assert source[start:end] == compact.text(i)
+
+
+def test_token_array_allocates_symbol_refs_on_demand():
+    tokens = lexer.lex_compact('int x = y;\n')
+    assert tokens.symbol_refs == {}
+    assert tokens[1] == ('identifier', 'x', 1, None)
+    ref = tokens.symbol_ref(1)
+    assert tokens.symbol_ref(1) is ref and tokens[1][3] is ref
+    assert list(tokens.symbol_refs) == [1]
+    assert (tokens.kind(3), tokens.line(3), tokens.column(3)) == ('identifier', 1, 9)
+
+
+def test_classify_words():
+    assert lexer.classify('while') == ('while', 'while')
+    assert lexer.classify('float') == ('float', 'float')
+    assert lexer.classify('42') == ('number', 42)
+    assert lexer.classify('.5') == ('number', 0.5)
+    assert lexer.classify('3.') == ('number', 3.0)
+    assert lexer.classify('.') == ('identifier', '.')
+    assert lexer.classify('1.2.3') == ('identifier', '1.2.3')
+    assert lexer.classify('9lives') == ('identifier', '9lives')
+    assert lexer.classify('x' * 31) == ('identifier', 'x' * 31)
+    assert lexer.classify('x' * 32) is None
+    assert lexer.classify('') is None
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'{name}: ok')
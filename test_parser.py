@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Checks for lookaheadparser."""
+
+import glob
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import ASTNodes as AST
+import lexer
+import lookaheadparser
+
+PROGRAMS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'Test Programs', '*.c')))
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_test_programs_parse():
+    for path in PROGRAMS:
+        ast = lookaheadparser.parse(lexer.lex(read(path)))
+        assert isinstance(ast, AST.Program), path
+        assert ast.getFunction(), path
+
+
+def test_token_sources_give_the_same_tree():
+    for path in PROGRAMS:
+        source = read(path)
+        expected = repr(lookaheadparser.parse(lexer.lex(source)))
+        assert repr(lookaheadparser.parse(lexer.lex_compact(source))) == expected, path
+        assert repr(lookaheadparser.parse(lexer.lex_iter(source))) == expected, path
+
+
+def test_for_header_lookahead():
+    ast = lookaheadparser.parse(lexer.lex('func int main() { for (i = 0; i < 3; i = i + 1) { } for (;;) { } return 0; }'))
+    first, second = ast.getFunction()[0].getStatement().statements[:2]
+    assert repr(first.init) == "Assign(Identifier('i'), Constant(0))"
+    assert repr(first.step) == "Assign(Identifier('i'), BinOp(Identifier('i'), '+', Constant(1)))"
+    assert (second.init, second.cond, second.step) == (None, None, None)
+
+
+def test_parsers_run_concurrently():
+    sources = [read(path) for path in PROGRAMS]
+    expected = [repr(lookaheadparser.parse(lexer.lex(s))) for s in sources]
+
+    def parse(source):
+        return repr(lookaheadparser.Parser().parse(lexer.lex(source)))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(parse, sources * 10)) == expected * 10
+
+
+def test_parser_instances_are_reusable():
+    parser = lookaheadparser.Parser()
+    parser.parse(lexer.lex('func int main() { return 0 }'))
+    assert [(e.message, e.line, e.token) for e in parser.errors] == [('Missing ; after return', 1, ('rbrace', '}', 1))]
+    ast = parser.parse(lexer.lex('func int main() { return 0; }'))
+    assert parser.errors == []
+    assert repr(ast) == "Program([Function(name='main', return_type='int', params=[], stmt=Block([Return(Constant(0))]))])"
+
+
+def test_token_iterators_are_read_as_parsing_goes():
+    parser = lookaheadparser.Parser()
+    read_before = []
+
+    def tokens():
+        for token in lexer.lex_iter(read(PROGRAMS[0])):
+            read_before.append(len(parser.tokens))
+            yield token
+
+    ast = parser.parse(tokens())
+    # one token at a time, each only once the parser needs it
+    assert read_before == list(range(len(read_before)))
+    assert repr(ast) == repr(lookaheadparser.parse(lexer.lex(read(PROGRAMS[0]))))
+    # running out of tokens is reported as for a list
+    parser.parse(iter(lexer.lex('func int main() {\n    return 0;')))
+    assert [(e.message, e.line) for e in parser.errors] == [('Unexpected end of input (no more tokens)', 2)]
+
+
+def test_recovers_and_reports_every_syntax_error():
+    source = """int g = ;
+func int main() {
+    int x = 1
+    x = x + ;
+    if (x > 1 {
+        print(x);
+    }
+    print(x);
+    while (x) { x = x - 1 }
+    return x;
+}
+func int ok() { return 1; }
+"""
+    program, errors = lookaheadparser.parse_with_diagnostics(lexer.lex(source))
+    assert [(e.line, e.message) for e in errors] == [
+        (1, 'Unexpected token (\'semicolon\', \';\', 1) in primary'),
+        (4, 'Missing ; after variable declaration'),
+        (5, 'Missing ) after if'),
+        (9, 'Missing ; after assignment'),
+    ]
+    functions = program.getFunction()
+    assert [f.getName() for f in functions] == ['main', 'ok']
+    body = functions[0].getStatement().statements
+    assert [type(s).__name__ for s in body] == ['Print', 'While', 'Return']
+
+
+def test_precedence_and_associativity():
+    ast = lookaheadparser.parse(lexer.lex('func int main() { return a || b && c == d < e + f * -!g - h; }'))
+    expr = ast.getFunction()[0].getStatement().statements[0].getExpression()
+    assert repr(expr) == ("BinOp(Identifier('a'), '||', BinOp(Identifier('b'), '&&', "
+                          "BinOp(Identifier('c'), '==', BinOp(Identifier('d'), '<', "
+                          "BinOp(BinOp(Identifier('e'), '+', BinOp(Identifier('f'), '*', "
+                          "UnOp('-', UnOp('!', Identifier('g'))))), '-', Identifier('h'))))))")
+
+
+def test_ast_nodes_have_no_instance_dict():
+    ast = lookaheadparser.parse(lexer.lex(read(PROGRAMS[0])))
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+        elif type(node).__module__ == AST.__name__:
+            assert not hasattr(node, '__dict__'), type(node).__name__
+            stack.extend(getattr(node, name) for name in type(node).__slots__)
+
+
+def test_nodes_record_their_line():
+    ast = lookaheadparser.parse(lexer.lex('func int main(int a) {\n    int x =\n        a\n        + 1;\n    if (x > 0) {\n        print(-x);\n    }\n    return f(x);\n}\n'))
+    func = ast.getFunction()[0]
+    decl, if_stmt, ret = func.getStatement().statements
+    assert (func.line, func.getStatement().line) == (1, 1)
+    assert (decl.line, decl.init.line, decl.init.left.line, decl.init.right.line) == (2, 4, 3, 4)
+    assert (if_stmt.line, if_stmt.cond.line, if_stmt.then_branch.line) == (5, 5, 5)
+    printed = if_stmt.then_branch.statements[0]
+    assert (printed.line, printed.expr.line, printed.expr.inner_exp.line) == (6, 6, 6)
+    assert (ret.line, ret.expression.line, ret.expression.args[0].line) == (8, 8, 8)
+
+
+def test_long_expressions_do_not_recurse_per_operator():
+    terms = 100_000
+    source = 'func int main() { return ' + ' + '.join(['x'] * terms) + ' - ' + '-' * terms + '1; }'
+    limit = sys.getrecursionlimit()
+    ast = lookaheadparser.parse(lexer.lex(source))
+    assert sys.getrecursionlimit() == limit
+    node = ast.getFunction()[0].getStatement().statements[0].getExpression()
+    assert node.oper == '-'
+    unary_depth = 0
+    inner = node.right
+    while isinstance(inner, AST.UnOp):
+        inner, unary_depth = inner.getExpression(), unary_depth + 1
+    assert unary_depth == terms
+    depth = 0
+    node = node.left
+    while isinstance(node, AST.BinOp):
+        assert node.oper == '+' and isinstance(node.right, AST.Identifier)
+        node, depth = node.left, depth + 1
+    assert depth == terms - 1
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'{name}: ok')
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Checks for semantic.SemanticAnalyzer."""
+
+import contextlib
+import io
+
+import ASTNodes as AST
+import lexer
+import lookaheadparser
+import semantic
+
+
+def analyze(source, workers=None):
+    program = lookaheadparser.parse(lexer.lex(source))
+    analyzer = semantic.SemanticAnalyzer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.analyze(program, workers)
+    return program, analyzer
+
+
+def test_expression_types_are_computed_once():
+    program, analyzer = analyze("""
+func int twice(int x) { return x * 2; }
+func int main() {
+    int h = twice(twice(1) + 1);
+    print(h);
+    return 0;
+}
+""")
+    decl = program.getFunction()[1].getStatement().statements[0]
+    outer = decl.init
+    assert analyzer.expr_types[outer] == semantic.INT
+    assert analyzer.expr_types[outer.args[0]] == semantic.INT
+    calls = []
+    original = analyzer.compute_type
+    analyzer.compute_type = lambda expr: calls.append(expr) or original(expr)
+    assert analyzer.type_of(outer) == semantic.INT
+    assert calls == []
+    assert isinstance(outer.args[0].left, AST.FuncCall)
+
+
+def test_symbol_refs_bind_to_the_visible_declaration():
+    program, analyzer = analyze("""
+int x = 1;
+func int main(int y) {
+    int r = x;
+    if (y > 0) {
+        int x = 2;
+        r = x + f(y);
+    }
+    read(x);
+    return r;
+}
+func int f(int a) { return a; }
+""")
+    body = program.getFunction()[1].getStatement().statements
+    outer_x = body[0].init
+    inner_x = body[1].then_branch.statements[1].expr.left
+    call = body[1].then_branch.statements[1].expr.right
+    read_x = body[2].target
+    assert outer_x.symbol_ref['entry'] is analyzer.global_symbols['x']
+    assert read_x.symbol_ref['entry'] is analyzer.global_symbols['x']
+    assert inner_x.symbol_ref['entry']['additional']['kind'] == 'local'
+    assert inner_x.symbol_ref['entry'] is analyzer.function_symbols['main'][1]['symbols']['x']
+    assert call.symbol_ref['entry'] is analyzer.global_symbols['f']
+    assert call.args[0].symbol_ref['entry']['additional']['kind'] == 'param'
+
+
+def test_parallel_analysis_matches_serial():
+    source = """
+int g = 3;
+func int f(int a) {
+    int x = a;
+    if (x > g) { int g = 1; x = x + g; }
+    for (int i = 0; i < 3; i = i + 1) { x = x + f(i); }
+    return x;
+}
+func float h(float b) { float y = b / 2; return y; }
+func int main() { int x = f(1); print(h(x)); return 0; }
+"""
+    results = []
+    for workers in (None, 2):
+        program, analyzer = analyze(source, workers)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            analyzer.print_symbol_tables()
+        nodes = list(semantic.walk_nodes(program))
+        refs = [node.symbol_ref['entry'] for node in nodes if isinstance(node, (AST.Identifier, AST.FuncCall))]
+        assert analyzer.global_symbols['g'] in refs
+        results.append((out.getvalue(), [ref['addr'] for ref in refs],
+                        [analyzer.expr_types.get(node) for node in nodes]))
+    assert results[0] == results[1]
+
+
+def test_parallel_analysis_reports_the_first_error():
+    source = """
+func int ok() { return 1; }
+func int bad() { return y; }
+func int worse() { return z; }
+"""
+    program = lookaheadparser.parse(lexer.lex(source))
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            semantic.SemanticAnalyzer().analyze(program, workers=2)
+        except semantic.SemanticError as err:
+            assert str(err) == "Use of undeclared variable 'y'"
+        else:
+            assert False, 'expected a SemanticError'
+
+
+def test_collects_every_error_without_cascades():
+    source = """func int add(int a, int b) { return a + b; }
+func int main() {
+    int x = 1;
+    int x = 2;
+    int y = missing + 1;
+    y = -(missing * 2) + add(y);
+    if (undefined(missing, y)) { print(y); }
+    bool b = y > 0;
+    y = b + 1;
+    return y;
+}
+"""
+    program = lookaheadparser.parse(lexer.lex(source))
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        analyzer, errors = semantic.analyze_with_diagnostics(program)
+    assert out.getvalue() == ''
+    assert [(e.line, e.message) for e in errors] == [
+        (4, "Duplicate declaration of variable 'x' in the same scope"),
+        (5, "Use of undeclared variable 'missing'"),
+        (6, "Use of undeclared variable 'missing'"),
+        (6, "Function 'add' expects 2 args, got 1"),
+        (7, "Call to undefined function 'undefined'"),
+        (7, "Use of undeclared variable 'missing'"),
+        (9, 'Operator + requires numeric operands'),
+    ]
+    assert analyzer.function_symbols['main'][0]['symbols']['x']['addr'] == '0x1010'
+    assert analyzer.function_symbols['main'][0]['symbols']['y']['addr'] == '0x1018'
+
+
+def test_default_mode_stops_at_the_first_error():
+    program = lookaheadparser.parse(lexer.lex('func int main() {\n    return x + y;\n}\n'))
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        try:
+            semantic.SemanticAnalyzer().analyze(program)
+        except semantic.SemanticError as err:
+            assert (err.diagnostic.line, str(err)) == (2, "Use of undeclared variable 'x'")
+        else:
+            assert False, 'expected a SemanticError'
+    assert out.getvalue() == "Semantic ERROR: Use of undeclared variable 'x'\n"
+
+
+def test_parallel_analysis_collects_the_same_errors():
+    source = """func int f() { return a; }
+func int g() { int b = 1; int b = 2; return c; }
+func int h() { return f() + g(); }
+"""
+    expected = None
+    for workers in (None, 2):
+        program = lookaheadparser.parse(lexer.lex(source))
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, errors = semantic.analyze_with_diagnostics(program, workers)
+        result = [(e.line, e.message) for e in errors]
+        assert len(result) == 3
+        expected = expected or result
+        assert result == expected
+
+
+def test_type_lattice():
+    program, analyzer = analyze("""
+func double widen(char c, short s, long l, float f) {
+    long a = c + s;
+    double d = l * f;
+    int i = l;
+    float q = s / c;
+    return a - d;
+}
+""")
+    body = program.getFunction()[0].getStatement().statements
+    types = [analyzer.expr_types[stmt.init] for stmt in body[:4]]
+    assert types == [semantic.INT, semantic.FLOAT, semantic.LONG, semantic.FLOAT]
+    assert analyzer.expr_types[body[4].expression] == semantic.DOUBLE
+    _, errors = semantic.analyze_with_diagnostics(lookaheadparser.parse(lexer.lex("""
+func int narrow(double d, float f, bool b) {
+    float x = d;
+    int y = f;
+    int z = b;
+    return b % 2;
+}
+""")))
+    assert [e.message for e in errors] == [
+        "Cannot initialize variable 'x' of type float with double",
+        "Cannot initialize variable 'y' of type int with float",
+        "Cannot initialize variable 'z' of type int with bool",
+        'Operator % requires numeric operands',
+    ]
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'{name}: ok')
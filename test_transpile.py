@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Checks for the Python translator."""
+
+import contextlib
+import glob
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+import interpreter
+import main
+import transpile
+from test_bytecode import CONDITIONS
+from test_interpreter import EXPECTED, SEMANTICS, analyze
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def execute(source, stdin=''):
+    program, analyzer, errors = analyze(source)
+    assert errors == []
+    out = io.StringIO()
+    result = transpile.run(program, analyzer, io.StringIO(stdin), out)
+    return result, out.getvalue().splitlines()
+
+
+def test_test_programs():
+    ran = set()
+    for path in sorted(glob.glob(os.path.join(HERE, 'Test Programs', '*.c'))):
+        with open(path) as f:
+            program, analyzer, errors = analyze(f.read())
+        if errors:
+            continue
+        out = io.StringIO()
+        result = transpile.run(program, analyzer, io.StringIO(), out)
+        name = os.path.basename(path)
+        assert (result, out.getvalue().splitlines()) == EXPECTED[name], name
+        ran.add(name)
+    assert ran == set(EXPECTED)
+
+
+def test_matches_the_interpreter():
+    for source, stdin in [(SEMANTICS, '12\n 0.25 '), (CONDITIONS, '')]:
+        program, analyzer, _ = analyze(source)
+        out = io.StringIO()
+        expected = (interpreter.run(program, analyzer, io.StringIO(stdin), out), out.getvalue())
+        out = io.StringIO()
+        assert (transpile.run(program, analyzer, io.StringIO(stdin), out), out.getvalue()) == expected
+
+
+def test_translation():
+    program, analyzer, _ = analyze("""int total = 0;
+func float mean(int a, int b) { return (a + b) / 2; }
+func int main() {
+    for (int i = 0; i < 3; i = i + 1) { total = total + i; }
+    while (total > 100) { }
+    print(mean(total, 1) > 1.5 && !(total == 0));
+    return total - (1 - 2) * 3;
+}
+""")
+    source = transpile.translate(program, analyzer)
+    assert 'def f_mean(v0_a, v1_b):\n    return (v0_a + v1_b) / 2.0\n' in source
+    assert '    global g_total\n    v0_i = 0\n    while v0_i < 3:\n' in source
+    assert '    while g_total > 100:\n        pass\n' in source
+    assert "_write('true\\n' if f_mean(g_total, 1) > 1.5 and not g_total == 0 else 'false\\n')" in source
+    assert 'return g_total - (1 - 2) * 3' in source
+    # a long chain needs no parentheses, so CPython's nesting limit is no bar
+    chain = ' + '.join(['x'] * 400)
+    assert execute(f'func int main() {{ int x = 1; return {chain}; }}')[0] == 400
+
+
+def test_code_object_cached_beside_the_source():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'prog.c')
+        source = 'func int main() { print(42); return 7; }'
+        with open(path, 'w') as f:
+            f.write(source)
+        program, analyzer, _ = analyze(source)
+        code = transpile.compile_program(program, analyzer)
+        assert transpile.load(path, source) is None
+        assert transpile.store(path, source, code)
+        assert os.path.dirname(transpile.cache_path(path)) == os.path.join(directory, '__pycache__')
+        out = io.StringIO()
+        assert transpile.execute(transpile.load(path, source), stdout=out) == 7 and out.getvalue() == '42\n'
+        assert transpile.load(path, source.replace('7', '8')) is None
+        # a hit skips the front end altogether
+        front_end = main.load_or_compile
+        main.load_or_compile = None
+        out = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(out):
+                assert main.run(source, 'python', source_file=path) == 7
+        finally:
+            main.load_or_compile = front_end
+        assert out.getvalue() == '42\n'
+        with open(transpile.cache_path(path), 'r+b') as f:
+            f.truncate(40)
+        assert transpile.load(path, source) is None
+
+
+def test_runtime_errors():
+    for source, stdin, message in [
+        ('func int main() { int z = 0; return 1 % z; }', '', 'Division by zero'),
+        ('func int main() { float z = 0; float r = 1 / z; return 0; }', '', 'Division by zero'),
+        ('func int main() { int x = 0; read(x); return x; }', '', 'end of input'),
+        ('func int main() { int x = 0; read(x); return x; }', 'abc', "expected int, got 'abc'"),
+        ('func int f(int n) { return f(n + 1); }\nfunc int main() { return f(0); }', '', 'Call stack overflow'),
+        ('func int helper() { return 0; }', '', 'No main()'),
+        ('func int main() { int x = 1; int i = 0; while (i < 400) { x = x * 10; i = i + 1; }'
+         ' float f = x; return 0; }', '', 'Overflow'),
+    ]:
+        try:
+            execute(source, stdin)
+        except interpreter.ExecutionError as err:
+            assert message in str(err), (source, err)
+        else:
+            assert False, source
+
+
+def test_main_runs_python():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'global_mutation.c')
+        with open(os.path.join(HERE, 'Test Programs', 'global_mutation.c')) as f, open(path, 'w') as g:
+            g.write(f.read())
+        env = dict(os.environ, MINIC_CACHE_DIR=directory)
+        for _ in range(2):
+            proc = subprocess.run([sys.executable, os.path.join(HERE, 'main.py'), '--run', '--engine', 'python', path],
+                                  capture_output=True, text=True, env=env)
+            assert (proc.returncode, proc.stdout) == (11, '10\n11\n')
+            assert os.path.exists(transpile.cache_path(path))
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'{name}: ok')
@@ -0,0 +1,381 @@
+"""Translator from analyzed MiniC programs to Python.
+
+translate() writes a program as Python source: a MiniC function becomes a
+def, locals become Python locals, globals become module globals, and while
+and for become Python while loops. compile_program() compiles that source
+to a code object, which execute() runs, so CPython's own interpreter does
+the work. Run-time behaviour is the interpreter's: print formatting is
+picked from the analyzer's types, and the few operations Python does
+differently (C's '%', division by zero) call helpers.
+
+Names cannot clash: locals are v<slot>_<name>, globals g_<name>, functions
+f_<name> and helpers start with an underscore; no MiniC name does.
+
+Code objects are cached beside their source, in the __pycache__ directory
+next to it, keyed on the source text and the translator's version."""
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+import tempfile
+
+import ASTNodes as AST
+import cache
+import semantic
+from interpreter import (MAX_CALL_DEPTH, ExecutionError, InputReader, Layout, float_divide, float_remainder,
+                         format_value, int_remainder, parse_input, zero)
+
+FLOATING_NAMES = ('float', 'double')
+# Python frames the deepest helper, _read, can take
+HELPER_FRAMES = 3
+
+# Python precedence, loosest first; an operand binding more loosely than
+# its context gets parentheses
+OR, AND, NOT, COMPARE, ADD, MUL, UNARY, ATOM = range(8)
+BINARY = {'||': OR, '&&': AND, '==': COMPARE, '!=': COMPARE, '<': COMPARE, '>': COMPARE,
+          '<=': COMPARE, '>=': COMPARE, '+': ADD, '-': ADD, '*': MUL, '/': MUL, '%': MUL}
+
+
+# modules whose code decides what a cached translation does when it runs:
+# this one, and the run-time helpers and semantics it shares with the
+# other engines
+TRANSLATOR_SOURCES = ('transpile.py', 'interpreter.py', 'closures.py')
+
+
+def translator_version():
+    digest = hashlib.blake2b(cache.COMPILER_VERSION.encode(), digest_size=16)
+    for name in TRANSLATOR_SOURCES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), 'rb') as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+VERSION = translator_version()
+
+
+class Translator:
+    def __init__(self, program, analyzer):
+        if analyzer.errors:
+            raise ExecutionError('Cannot run a program with semantic errors')
+        self.program = program
+        self.types = analyzer.expr_types
+        self.layout = Layout(program, analyzer)
+        self.slots = self.layout.slots
+        self.lines = []
+        self.depth = 0
+
+    def translate(self):
+        items = self.program.getFunction()
+        if 'main' not in self.layout.functions:
+            raise ExecutionError("No main() function")
+        for item in items:
+            if type(item) is AST.Function:
+                self.function(item)
+        # entry point: initialize the globals, then call main
+        self.line('def _main():')
+        self.depth += 1
+        names = ['g_' + item.name for item in items if type(item) is AST.VarDecl]
+        if names:
+            self.line('global ' + ', '.join(names))
+        for item in items:
+            if type(item) is AST.VarDecl:
+                self.line(f'g_{item.name} = {self.converted(item.typ, item.init)}')
+        self.line('return f_main()')
+        self.depth -= 1
+        return '\n'.join(self.lines) + '\n'
+
+    def line(self, text):
+        self.lines.append('    ' * self.depth + text)
+
+    def variable(self, node):
+        slot = self.slots[node]
+        if slot < 0:
+            return 'g_' + node.name
+        return f'v{slot}_{node.name}'
+
+    def function(self, func):
+        self.return_type = func.getReturnType()
+        params = [f'v{slot}_{name}' for slot, (_, name) in enumerate(func.getParams())]
+        self.line(f"def f_{func.getName()}({', '.join(params)}):")
+        self.depth += 1
+        assigned = sorted({'g_' + node.target.name for node in semantic.walk_nodes(func)
+                           if type(node) in (AST.Assign, AST.Read) and self.slots[node.target] < 0})
+        if assigned:
+            self.line('global ' + ', '.join(assigned))
+        statements = func.getStatement().statements
+        self.statements(statements)
+        if not statements or type(statements[-1]) is not AST.Return:
+            self.line(f'return {zero(self.return_type)!r}')
+        self.depth -= 1
+        self.line('')
+
+    def statements(self, statements):
+        if not statements:
+            self.line('pass')
+        for stmt in statements:
+            self.statement(stmt)
+
+    def statement(self, stmt):
+        t = type(stmt)
+        if t is AST.VarDecl:
+            self.line(f'v{self.slots[stmt]}_{stmt.name} = {self.converted(stmt.typ, stmt.init)}')
+        elif t is AST.Assign:
+            target = stmt.target
+            self.line(f"{self.variable(target)} = {self.converted(target.symbol_ref['entry']['type'], stmt.expr)}")
+        elif t is AST.Return:
+            expr = stmt.getExpression()
+            self.line('return None' if expr is None else 'return ' + self.converted(self.return_type, expr))
+        elif t is AST.IfElse:
+            self.line(f'if {self.condition(stmt.cond)}:')
+            self.block(stmt.then_branch.statements)
+            if stmt.else_branch is not None:
+                self.line('else:')
+                self.block(stmt.else_branch.statements)
+        elif t is AST.While:
+            self.line(f'while {self.condition(stmt.cond)}:')
+            self.block(stmt.body.statements)
+        elif t is AST.For:
+            if stmt.init is not None:
+                self.statement(stmt.init)
+            self.line('while True:' if stmt.cond is None else f'while {self.condition(stmt.cond)}:')
+            self.block(stmt.body.statements + ([] if stmt.step is None else [stmt.step]))
+        elif t is AST.Block:
+            for inner in stmt.statements:
+                self.statement(inner)
+        elif t is AST.Print:
+            self.line(self.print_call(stmt.expr))
+        elif t is AST.Read:
+            target = stmt.target
+            self.line(f"{self.variable(target)} = _read({target.symbol_ref['entry']['type']!r})")
+        elif t is AST.FuncCall or t is AST.Identifier:
+            self.line(self.expression(stmt))
+        else:
+            raise ExecutionError(f'Cannot translate {t.__name__}')
+
+    def block(self, statements):
+        self.depth += 1
+        self.statements(statements)
+        self.depth -= 1
+
+    def print_call(self, expr):
+        code = self.types[expr]
+        if code == semantic.BOOL:
+            return f"_write('true\\n' if {self.condition(expr)} else 'false\\n')"
+        if code in semantic.INTEGER_TYPES:
+            return f"_write('%d\\n' % {self.expression(expr, UNARY)})"
+        if code in semantic.FLOATING_TYPES:
+            return f"_write('%g\\n' % {self.expression(expr, UNARY)})"
+        return f"_write(_format({self.expression(expr)}) + '\\n')"
+
+    def converted(self, type_name, expr):
+        """`expr` as stored in a variable (or returned) of `type_name`."""
+        if expr is None:
+            return repr(zero(type_name))
+        if type_name in FLOATING_NAMES and self.types[expr] in semantic.INTEGER_TYPES:
+            if type(expr) is AST.Constant:
+                return repr(float(expr.value))
+            return f'float({self.expression(expr)})'
+        return self.expression(expr)
+
+    def condition(self, expr, context=OR):
+        """`expr` where only its truth matters: && and || need no bool()."""
+        t = type(expr)
+        if t is AST.BinOp and expr.oper in ('&&', '||'):
+            level = BINARY[expr.oper]
+            word = ' and ' if level == AND else ' or '
+            text = self.condition(expr.left, level) + word + self.condition(expr.right, level + 1)
+            return text if level >= context else f'({text})'
+        if t is AST.UnOp and expr.oper == '!':
+            text = 'not ' + self.condition(expr.inner_exp, NOT)
+            return text if NOT >= context else f'({text})'
+        return self.expression(expr, context)
+
+    def truth(self, expr, context):
+        # an operand of && or || as a value: it must come out a bool
+        if self.types[expr] == semantic.BOOL:
+            return self.expression(expr, context)
+        return f'bool({self.expression(expr)})'
+
+    def expression(self, expr, context=OR):
+        """Python source for `expr`, parenthesized if it binds more loosely
+        than `context`."""
+        t = type(expr)
+        if t is AST.Constant:
+            return repr(expr.value)
+        if t is AST.Identifier:
+            return self.variable(expr)
+        if t is AST.FuncCall:
+            params = expr.symbol_ref['entry']['additional']['params']
+            args = [self.converted(typ, arg) for (typ, _), arg in zip(params, expr.args)]
+            return f"f_{expr.name}({', '.join(args)})"
+        if t is AST.UnOp:
+            if expr.oper == '!':
+                text, level = 'not ' + self.expression(expr.inner_exp, NOT), NOT
+            else:
+                text, level = expr.oper + self.expression(expr.inner_exp, UNARY), UNARY
+        elif t is AST.BinOp:
+            text, level = self.binop(expr)
+        else:
+            raise ExecutionError(f'Cannot translate {t.__name__}')
+        return text if level >= context else f'({text})'
+
+    def binop(self, expr):
+        op = expr.oper
+        left, right = expr.left, expr.right
+        if op in ('&&', '||'):
+            level = BINARY[op]
+            word = ' and ' if op == '&&' else ' or '
+            return self.truth(left, level) + word + self.truth(right, level + 1), level
+        floating = self.types[expr] in semantic.FLOATING_TYPES
+        if op == '%':
+            if floating:
+                return f'_fmod({self.expression(left)}, {self.expression(right)})', ATOM
+            if type(right) is AST.Constant and right.value > 0 and type(left) is AST.Identifier:
+                # C's remainder, inline for the common `x % positive constant`
+                x, c = self.variable(left), right.value
+                return f'({x} % {c} if {x} >= 0 else -(-{x} % {c}))', ATOM
+            return f'_imod({self.expression(left)}, {self.expression(right)})', ATOM
+        if op == '/':
+            if type(right) is AST.Constant and right.value != 0:
+                return f'{self.expression(left, MUL)} / {float(right.value)!r}', MUL
+            return f'_fdiv({self.expression(left)}, {self.expression(right)})', ATOM
+        level = BINARY[op]
+        if floating and type(right) is AST.Constant:
+            # keep float arithmetic in floats, as the analyzer typed it
+            right_text = repr(float(right.value))
+        else:
+            # comparisons do not chain: both sides bind tighter
+            right_text = self.expression(right, level + 1)
+        left_level = level + 1 if level == COMPARE else level
+        return f'{self.expression(left, left_level)} {op} {right_text}', level
+
+
+def translate(program, analyzer):
+    """Python source for an analyzed program; _main() runs it."""
+    return Translator(program, analyzer).translate()
+
+
+def compile_program(program, analyzer, filename='<minic>'):
+    """Translate an analyzed program and compile it to a code object."""
+    source = translate(program, analyzer)
+    try:
+        return compile(source, filename, 'exec')
+    except (SyntaxError, RecursionError, MemoryError):
+        # CPython caps how deeply expressions may nest
+        raise ExecutionError('Program is nested too deeply to translate to Python') from None
+
+
+def stack_depth():
+    """How deep the caller's stack is, as the recursion limit counts it.
+    That is more than its Python frames (C calls into Python count too),
+    so it is measured: recurse under a small limit until it is hit."""
+    frames = 0
+    frame = sys._getframe(1)
+    while frame is not None:
+        frames += 1
+        frame = frame.f_back
+    limit = sys.getrecursionlimit()
+    probe_limit = 3 * frames + 50
+    sys.setrecursionlimit(probe_limit)
+    calls = 0
+
+    def probe():
+        nonlocal calls
+        calls += 1
+        probe()
+
+    try:
+        probe()
+    except RecursionError:
+        pass
+    finally:
+        sys.setrecursionlimit(limit)
+    # probe() ran as deep as the limit allowed, one level below this call
+    return probe_limit - calls - 1
+
+
+def execute(code, stdin=None, stdout=None):
+    """Run a compiled program and return main's result."""
+    reader = InputReader(stdin or sys.stdin)
+    namespace = {
+        '__name__': '__minic__',
+        '_write': (stdout or sys.stdout).write,
+        '_read': lambda type_name: parse_input(reader.next_word(), type_name),
+        '_imod': int_remainder,
+        '_fmod': float_remainder,
+        '_fdiv': float_divide,
+        '_format': format_value,
+    }
+    exec(code, namespace)
+    # every MiniC call is one Python frame, so the recursion limit is the
+    # call depth limit: the stack in use, _main, the calls, and room for a
+    # helper called at the deepest level (which lets a program without
+    # one go HELPER_FRAMES calls further)
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(stack_depth() + 1 + MAX_CALL_DEPTH + HELPER_FRAMES)
+    try:
+        return namespace['_main']()
+    except RecursionError:
+        raise ExecutionError('Call stack overflow') from None
+    except OverflowError as err:
+        # integers do not wrap, so one can outgrow a float
+        raise ExecutionError(f'Overflow: {err}') from None
+    except MemoryError:
+        raise ExecutionError('Out of memory') from None
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def run(program, analyzer, stdin=None, stdout=None):
+    """Translate, compile and execute an analyzed program; returns main's result."""
+    return execute(compile_program(program, analyzer), stdin, stdout)
+
+
+# the code object cache
+
+def cache_path(source_path):
+    directory, name = os.path.split(os.path.abspath(source_path))
+    return os.path.join(directory, '__pycache__', f'{name}.minic.{sys.implementation.cache_tag}.pyc')
+
+
+def _key(source):
+    digest = hashlib.blake2b(VERSION, digest_size=16)
+    digest.update(source.encode())
+    return importlib.util.MAGIC_NUMBER + digest.digest()
+
+
+def load(source_path, source):
+    """The cached code object for `source`, read from `source_path`, or None."""
+    key = _key(source)
+    try:
+        with open(cache_path(source_path), 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:len(key)] != key:
+        return None
+    try:
+        return marshal.loads(data[len(key):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def store(source_path, source, code):
+    """Cache a code object beside its source; False if it could not be
+    written (a read-only directory, say)."""
+    path = cache_path(source_path)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_key(source) + marshal.dumps(code))
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+    except OSError:
+        return False
+    return True